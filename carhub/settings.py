@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,7 +32,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    'core.apps.AdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -53,16 +54,38 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.apikeys.ApiKeyAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
+        'core.apikeys.HasTokenScope',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.TokenBucketThrottle',
+    ],
+    # IP анонимного клиента для ограничителя: X-Forwarded-For учитывается только от стольких
+    # доверенных прокси перед приложением (0 — только REMOTE_ADDR, заголовок не подделать)
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # HTML — GZipMiddleware (защита от BREACH), JSON — CompressionMiddleware (br, кэш по ETag)
+    'django.middleware.gzip.GZipMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.LoadSheddingMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -98,7 +121,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Реплика для чтения (локально — копия файла основной базы):
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': BASE_DIR / 'db_replica.sqlite3',
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+}
+
+# Алиасы реплик из DATABASES; пустой список — всё идёт в default
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# После записи клиент читает с основной базы столько секунд (read-your-writes)
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'carhub_primary'
+# Как часто перепроверять доступность реплики
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+# Кэши: 'throttle' хранит вёдра токенов и счётчики отказов. С REDIS_URL (docker-compose) он общий
+# для всех процессов и хостов; без него — LocMemCache, и лимиты THROTTLE_BUCKETS действуют
+# в каждом процессе отдельно (при N процессах клиент получает до N вёдер)
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'throttle',
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    },
 }
 
 
@@ -142,3 +198,121 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 AUTH_USER_MODEL = 'core.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Условные GET: сколько секунд CDN/прокси может отдавать ответ без проверки
+CONDITIONAL_GET_MAX_AGE = 60
+
+# Кэш страниц каталога для анонимных пользователей, секунд
+CATALOG_PAGE_CACHE_TIMEOUT = 300
+
+# Зеркало внешних фотографий (manage.py mirror_photos)
+PHOTO_MIRROR_CONCURRENCY = 16
+PHOTO_MIRROR_PER_HOST = 4
+PHOTO_MIRROR_TIMEOUT = 10
+PHOTO_MIRROR_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_MIRROR_MAX_ATTEMPTS = 3
+# Сети, куда зеркалу можно ходить помимо публичных адресов (например, ['10.0.5.0/24'] для своего CDN)
+PHOTO_MIRROR_ALLOWED_NETWORKS = []
+
+# Sitemap и RSS/Atom (manage.py build_sitemaps)
+SITE_URL = 'http://localhost:8000'
+SITEMAP_ROOT = BASE_DIR / 'sitemaps'
+
+# Админка больших таблиц: до этого числа строк считается точный COUNT
+ADMIN_EXACT_COUNT_LIMIT = 100000
+# Кэш ссылок date_hierarchy и списков значений фильтров, секунд
+ADMIN_DATE_BUCKETS_CACHE_TIMEOUT = 3600
+
+# Фоновые задачи (manage.py run_workers)
+TASK_WORKER_PROCESSES = 2
+TASK_POLL_INTERVAL = 1.0
+TASK_MAX_ATTEMPTS = 5
+# Задержка перед повтором: TASK_RETRY_BACKOFF * 2^(попытка - 1) секунд
+TASK_RETRY_BACKOFF = 10
+# Задача без отметки воркера (heartbeat раз в треть срока) дольше этого (сек) считается зависшей
+TASK_LOCK_TIMEOUT = 600
+# True — задачи выполняются сразу в процессе (без воркеров)
+TASKS_ALWAYS_EAGER = False
+# Просмотры сбрасываются в Car.views не чаще раза в столько секунд
+VIEWS_FLUSH_DELAY = 10
+
+# Поиск дублей объявлений (core.dedupe): оценка сходства Жаккара по MinHash
+DEDUPE_THRESHOLD = 0.8
+# Повтор собственного объявления объединяется с ним; похожие чужие уходят на модерацию
+DEDUPE_MERGE = True
+
+# Ключи API: проверенный ключ кэшируется в процессе на столько секунд
+API_KEY_CACHE_TTL = 60
+# Как часто процесс проверяет, не отозваны ли ключи (секунд)
+API_KEY_REVOCATION_CHECK = 2
+
+# Процессов параллельного экспорта объявлений (None — по числу ядер)
+EXPORT_WORKERS = None
+
+# Архив проданных объявлений (manage.py archive_cars): через столько дней после продажи
+ARCHIVE_SOLD_AFTER_DAYS = 30
+# Объявлений в одной транзакции переноса
+ARCHIVE_BATCH_SIZE = 500
+
+# Уникальные посетители (HyperLogLog): буфер PendingVisit сбрасывается задачей flush_visitors
+# через столько секунд после первого просмотра
+VISITOR_SKETCH_FLUSH_DELAY = 10
+# Просмотров в одной транзакции сброса
+VISITOR_SKETCH_BATCH_SIZE = 5000
+
+# Сжатие JSON (core.middleware.CompressionMiddleware); br — пакетом Brotli из requirements.txt
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+# Сколько секунд хранится сжатое тело публичного ответа с ETag
+COMPRESSION_CACHE_TIMEOUT = 600
+
+# Ограничение частоты API (core.throttling): (токенов в секунду, объём ведра) на клиента —
+# во всём кластере с общим кэшем 'throttle' (REDIS_URL), иначе на каждый процесс
+THROTTLE_ENABLED = True
+THROTTLE_CACHE = 'throttle'
+THROTTLE_BUCKETS = {
+    'anon': (2, 60),
+    'user': (5, 120),
+    'key': (20, 400),
+}
+# Доплата за ?search= (icontains по описаниям)
+THROTTLE_SEARCH_COST = 4
+
+# Сброс нагрузки (core.middleware.LoadSheddingMiddleware): предел одновременных запросов процесса
+# уменьшается, пока средняя задержка запроса к базе выше SHED_DB_LATENCY секунд
+SHED_ENABLED = True
+SHED_MIN_CONCURRENCY = 2
+SHED_MAX_CONCURRENCY = 64
+SHED_DB_LATENCY = 0.05
+SHED_RETRY_AFTER = 5
+SHED_EXEMPT_PATHS = ('/admin/', '/static/', '/media/')
+
+# Поток новых объявлений (SSE, core.stream): опрос ListingEvent, секунд
+STREAM_POLL_INTERVAL = 2
+# Событий в очереди подписчика; при переполнении поток закрывается (клиент догонит по Last-Event-ID)
+STREAM_QUEUE_SIZE = 100
+STREAM_BATCH_SIZE = 500
+STREAM_MAX_SUBSCRIBERS = 10000
+# Комментарий-пинг в простаивающем потоке, секунд; пауза перед переподключением клиента, мс
+STREAM_HEARTBEAT = 15
+STREAM_RETRY_MS = 3000
+
+# Загрузка фото по частям (core.uploads): части пишутся во временные файлы UPLOAD_TEMP_DIR
+# (на той же файловой системе, что MEDIA_ROOT, — готовый файл переносится переименованием)
+UPLOAD_TEMP_DIR = BASE_DIR / 'uploads'
+UPLOAD_MAX_SIZE = 30 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 5 * 1024 * 1024
+# Часть, которая принимается дольше (процесс упал посреди записи), перестаёт держать загрузку
+UPLOAD_CHUNK_TIMEOUT = 600
+# Незавершённые загрузки удаляются через столько часов без новых частей
+UPLOAD_EXPIRE_HOURS = 24
+
+# Пакетная выдача объявлений api/cars/batch/?ids= и страница сравнения (core.batch)
+CAR_BATCH_MAX_IDS = 200
+CAR_COMPARE_MAX_IDS = 6
+# Сериализованные объявления в кэше по ETag, секунд
+CAR_DATA_CACHE_TIMEOUT = 600
+
+# Недавно просмотренные объявления (core.recent): последние N id на пользователя или сессию
+RECENTLY_VIEWED_SIZE = 50
@@ -1,20 +1,23 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from django.http import HttpResponse
-from .models import User, Brand, Model, Car, CarPhoto, Favorite, ForumPost
-from import_export.admin import ImportExportModelAdmin
-from .resources import CarResource
-from import_export.formats import base_formats
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from .models import (User, Brand, Model, Car, CarPhoto, Favorite, ForumPost, SellerStats, MirroredPhoto, Task,
+                     CarSignature, ApiKey, ArchivedCar, ArchivedCarPhoto)
+from .apikeys import create_key, revoke
+from .admin_utils import AutocompleteFilter, CachedValuesFilter, LargeTableAdminMixin, LazyImportExportMixin
+from .jobs import dump_query, export_cars
+from .tasks import enqueue
 
 
 class CarPhotoInline(admin.TabularInline):
     model = CarPhoto
     extra = 1
     readonly_fields = ('created_at',)
-    fields = ('image_url', 'is_main', 'created_at')
+    fields = ('image_url', 'image', 'is_main', 'created_at')
 
 
 @admin.register(User)
@@ -42,67 +45,68 @@ class ModelAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
+class BrandFilter(AutocompleteFilter):
+    title = _('Марка')
+    field_name = 'brand'
+    parameter_name = 'brand'
+
+
+class ModelFilter(AutocompleteFilter):
+    title = _('Модель')
+    field_name = 'model'
+    parameter_name = 'model'
+
+
+class YearFilter(CachedValuesFilter):
+    title = _('Год выпуска')
+    field_name = 'year'
+    parameter_name = 'year'
+
+
 @admin.register(Car)
-class CarAdmin(ImportExportModelAdmin):
-    resource_class = CarResource
+class CarAdmin(LazyImportExportMixin, LargeTableAdminMixin, admin.ModelAdmin):
+    resource_path = 'core.resources.CarResource'
 
     list_display = ('id', 'full_name', 'year', 'price_formatted', 'status', 'views', 'created_at')
-    list_filter = ('status', 'brand', 'year', 'created_at')
+    list_select_related = ('brand', 'model')
+    list_filter = ('status', BrandFilter, ModelFilter, YearFilter, 'created_at')
     search_fields = ('description', 'brand__name', 'model__name')
-    readonly_fields = ('views', 'created_at', 'updated_at')
+    readonly_fields = ('views', 'previous_price', 'price_changed_at', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
     inlines = [CarPhotoInline]
     raw_id_fields = ('user', 'created_by')
     list_display_links = ('id', 'full_name')
+    actions = ('export_admin_action', 'export_csv_action')
 
     def get_export_formats(self):
+        from import_export.formats import base_formats
         return [
             base_formats.XLSX,
             base_formats.CSV,
             base_formats.JSON,
         ]
 
+    # Экспорт выполняется фоновой задачей (параллельно по шардам), файл появляется в MEDIA
+    @admin.action(description=_('Экспорт выбранных в XLSX'))
     def export_admin_action(self, request, queryset):
-        resource = self.resource_class()
-        dataset = resource.export(queryset)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Объявления"
-
-        # Жирные заголовки
-        bold_font = Font(bold=True, size=12)
-        for col_num, column_title in enumerate(dataset.headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = column_title
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal='center')
-
-        # Данные
-        for row_num, row in enumerate(dataset.dict, 2):
-            for col_num, value in enumerate(row.values(), 1):
-                ws.cell(row=row_num, column=col_num).value = value
-
-        # Автоширина столбцов
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except (TypeError, AttributeError):
-                    pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column].width = adjusted_width
-
-        # Заморозка первой строки
-        ws.freeze_panes = 'A2'
-
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="Объявления_CarHub.xlsx"'
-        wb.save(response)
-        return response
+        self.queue_export(request, queryset, 'xlsx')
+
+    @admin.action(description=_('Экспорт выбранных в CSV'))
+    def export_csv_action(self, request, queryset):
+        self.queue_export(request, queryset, 'csv')
+
+    def queue_export(self, request, queryset, fmt):
+        path = f'exports/cars-{timezone.now():%Y%m%d-%H%M%S}-{get_random_string(12)}.{fmt}'
+        # В задачу уходят условия выборки и граница id на момент выбора: строки перебирает воркер,
+        # объявления, добавленные после нажатия, в файл не попадут
+        bound = queryset.order_by('-pk').values_list('pk', flat=True).first()
+        if bound is None:
+            return
+        enqueue(export_cars, path, fmt, query=dump_query(queryset.filter(pk__lte=bound)))
+        self.message_user(request, format_html(
+            'Экспорт поставлен в очередь. Файл будет доступен по ссылке: <a href="{}">{}</a>',
+            default_storage.url(path), path,
+        ))
 
     @admin.display(description=_('Полное название'))
     def full_name(self, obj):
@@ -114,9 +118,109 @@ class CarAdmin(ImportExportModelAdmin):
     price_formatted.short_description = _('Цена')
 
 
+@admin.register(SellerStats)
+class SellerStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'active_count', 'moderation_count', 'sold_count', 'total_views', 'favorites_received')
+    search_fields = ('user__username',)
+    readonly_fields = ('active_count', 'moderation_count', 'sold_count', 'total_views',
+                       'favorites_received', 'updated_at')
+    raw_id_fields = ('user',)
+
+
+@admin.register(MirroredPhoto)
+class MirroredPhotoAdmin(admin.ModelAdmin):
+    list_display = ('source_url', 'status', 'width', 'height', 'size', 'attempts', 'fetched_at')
+    list_filter = ('status',)
+    search_fields = ('source_url', 'sha256')
+    readonly_fields = ('sha256', 'file', 'content_type', 'size', 'width', 'height',
+                       'error', 'attempts', 'fetched_at', 'created_at')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+
+
+# Помеченные дубли (индекс строит core.dedupe)
+@admin.register(CarSignature)
+class CarSignatureAdmin(admin.ModelAdmin):
+    list_display = ('car', 'duplicate_of', 'similarity', 'updated_at')
+    list_select_related = ('car__model', 'duplicate_of__model')
+    raw_id_fields = ('car', 'duplicate_of')
+    exclude = ('signature',)
+    readonly_fields = ('similarity', 'updated_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(duplicate_of__isnull=False)
+
+
+class ArchivedCarPhotoInline(admin.TabularInline):
+    model = ArchivedCarPhoto
+    extra = 0
+    fields = ('image_url', 'image', 'is_main', 'created_at')
+    readonly_fields = fields
+
+
+# Архив только для просмотра: строки переносит archive_cars
+@admin.register(ArchivedCar)
+class ArchivedCarAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'model', 'year', 'price', 'user', 'created_at', 'archived_at')
+    list_select_related = ('model', 'user')
+    list_filter = (BrandFilter, 'archived_at')
+    search_fields = ('description',)
+    raw_id_fields = ('user', 'created_by')
+    inlines = [ArchivedCarPhotoInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ApiKeyAdminForm(forms.ModelForm):
+    scopes = forms.MultipleChoiceField(
+        choices=ApiKey.SCOPE_CHOICES, widget=forms.CheckboxSelectMultiple, label=_('Права'),
+    )
+
+    class Meta:
+        model = ApiKey
+        fields = ('user', 'name', 'scopes', 'expires_at')
+
+
+# Токен показывается один раз при создании ключа — в базе хранится только хэш
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    form = ApiKeyAdminForm
+    list_display = ('name', 'user', 'prefix', 'scopes', 'expires_at', 'revoked_at', 'last_used_at')
+    list_select_related = ('user',)
+    list_filter = (('revoked_at', admin.EmptyFieldListFilter),)
+    search_fields = ('name', 'prefix', 'user__username')
+    raw_id_fields = ('user',)
+    readonly_fields = ('prefix', 'revoked_at', 'last_used_at', 'created_at')
+    actions = ('revoke_keys',)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return super().save_model(request, obj, form, change)
+        key, token = create_key(obj.user, obj.name, obj.scopes, obj.expires_at)
+        obj.pk, obj.prefix = key.pk, key.prefix
+        self.message_user(request, format_html(
+            'Ключ создан. Сохраните токен, повторно он показан не будет: <code>{}</code>', token
+        ), messages.WARNING)
+
+    @admin.action(description=_('Отозвать выбранные ключи'))
+    def revoke_keys(self, request, queryset):
+        self.message_user(request, f'Отозвано ключей: {revoke(queryset)}')
+
+
 @admin.register(CarPhoto)
 class CarPhotoAdmin(admin.ModelAdmin):
     list_display = ('car', 'is_main', 'created_at')
+    list_select_related = ('car__model',)
     list_filter = ('is_main', 'created_at')
     search_fields = ('car__brand__name', 'car__model__name')
     readonly_fields = ('created_at',)
@@ -132,6 +236,7 @@ class FavoriteInline(admin.TabularInline):
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'car_link', 'created_at')
+    list_select_related = ('user', 'car__model')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'car__brand__name')
     date_hierarchy = 'created_at'
@@ -0,0 +1,252 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_permission_codename
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.urls import path
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+# Админка для больших таблиц: оценка COUNT, кэш дат, автодополнение в фильтрах,
+# постраничный переход по курсору (id) вместо OFFSET; ленивый импорт/экспорт
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_count(queryset):
+    # Оценка числа строк без полного COUNT(*) (только для запроса без фильтров)
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        else:
+            pk = connection.ops.quote_name(queryset.model._meta.pk.column)
+            cursor.execute(f'SELECT MAX({pk}) - MIN({pk}) + 1 FROM {connection.ops.quote_name(table)}')
+        row = cursor.fetchone()
+    return max(int(row[0] or 0), 0) if row else 0
+
+
+def estimate_filtered_count(queryset):
+    # Оценка планировщика PostgreSQL для запроса с фильтрами (EXPLAIN без выполнения)
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    # Точный COUNT — только до ADMIN_EXACT_COUNT_LIMIT строк; дальше оценка: по статистике
+    # таблицы без фильтров, по плану запроса (или сам предел) с фильтрами
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate > limit:
+                return estimate
+            return super().count
+        # COUNT по подзапросу с LIMIT: база прекращает сканирование на limit + 1 строке
+        capped = queryset.order_by()[:limit + 1].count()
+        if capped <= limit:
+            return capped
+        return max(estimate_filtered_count(queryset), capped)
+
+
+class BucketCacheQuerySet(QuerySet):
+    # date_hierarchy строит ссылки через dates()/datetimes() — результат кэшируется
+
+    def _cached_buckets(self, method, *args, **kwargs):
+        try:
+            sql = str(self.query)
+        except EmptyResultSet:
+            return method(self, *args, **kwargs)
+        raw = f'{self.model._meta.label}|{sql}|{args}|{kwargs}'
+        key = 'admin-buckets:' + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+        return cache.get_or_set(
+            key, lambda: list(method(self, *args, **kwargs)), settings.ADMIN_DATE_BUCKETS_CACHE_TIMEOUT
+        )
+
+    def dates(self, *args, **kwargs):
+        return self._cached_buckets(QuerySet.dates, *args, **kwargs)
+
+    def datetimes(self, *args, **kwargs):
+        return self._cached_buckets(QuerySet.datetimes, *args, **kwargs)
+
+
+class KeysetChangeList(ChangeList):
+    # ?cursor=<id> — следующая страница через WHERE id < cursor (только при сортировке по -id)
+
+    def get_results(self, request):
+        cursor = getattr(request, 'admin_cursor', None)
+        self.keyset = bool(cursor) and self.is_keyset_ordering()
+        self.first_url = self.get_query_string(remove=[CURSOR_VAR])
+        if not self.keyset:
+            super().get_results(request)
+            last = list(self.result_list)[-1:] if self.multi_page and self.is_keyset_ordering() else []
+            self.set_next(last[0].pk if last and self.paginator.num_pages > self.page_num else None)
+            return
+
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            cursor = 0
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        rows = list(self.queryset.filter(pk__lt=cursor)[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = True
+        self.paginator = paginator
+        self.set_next(self.result_list[-1].pk if len(rows) > self.list_per_page else None)
+
+    def set_next(self, cursor):
+        self.next_cursor = cursor
+        self.next_url = self.get_query_string({CURSOR_VAR: cursor}, ['p']) if cursor else None
+
+    def is_keyset_ordering(self):
+        order_by = set(self.queryset.query.order_by)
+        return bool(order_by) and order_by <= {'-id', '-pk'}
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    # Фильтр по FK без загрузки всех значений: поле select2 с поиском по связанной модели
+    template = 'admin/core/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.field = model._meta.get_field(self.field_name)
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        super().__init__(request, params, model, model_admin)
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        # Только выбранное значение, чтобы select2 показал его подпись
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        related = self.field.related_model.objects.filter(pk=value).first()
+        return [(value, str(related))] if related else []
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{f'{self.field_name}_id': self.value()})
+        return queryset
+
+
+class CachedValuesFilter(admin.SimpleListFilter):
+    # Список значений поля (SELECT DISTINCT) кэшируется
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        key = f'admin-values:{model_admin.model._meta.label}:{self.field_name}'
+        values = cache.get_or_set(key, lambda: list(
+            model_admin.model.objects.order_by(self.field_name)
+            .values_list(self.field_name, flat=True).distinct()
+        ), settings.ADMIN_DATE_BUCKETS_CACHE_TIMEOUT)
+        return [(str(value), str(value)) for value in values if value is not None]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return BucketCacheQuerySet(model=qs.model, query=qs.query.chain(), using=qs._db, hints=qs._hints)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # cursor не является фильтром — убираем его до разбора параметров ChangeList
+        if CURSOR_VAR in request.GET:
+            request.GET = request.GET.copy()
+            request.admin_cursor = request.GET.pop(CURSOR_VAR)[0]
+        return super().changelist_view(request, extra_context)
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, type) and issubclass(list_filter, AutocompleteFilter):
+                field = self.model._meta.get_field(list_filter.field_name)
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+class LazyImportExportMixin:
+    # Импорт/экспорт django-import-export без загрузки пакета при старте процесса:
+    # import_export.admin тянет tablib и openpyxl, поэтому настоящий ImportExportMixin
+    # подключается только при первом открытии страниц импорта или экспорта
+    change_list_template = 'admin/import_export/change_list_import_export.html'
+    resource_path = None
+    _import_export_admin = None
+
+    def get_import_export_admin(self):
+        if self._import_export_admin is None:
+            from import_export.admin import ImportExportMixin
+            admin_class = type(f'{type(self).__name__}ImportExport', (ImportExportMixin, type(self)), {
+                'resource_classes': [import_string(self.resource_path)],
+            })
+            self._import_export_admin = admin_class(self.model, self.admin_site)
+        return self._import_export_admin
+
+    def lazy_view(self, name):
+        def view(request, *args, **kwargs):
+            return getattr(self.get_import_export_admin(), name)(request, *args, **kwargs)
+        return self.admin_site.admin_view(view)
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('process_import/', self.lazy_view('process_import'), name='%s_%s_process_import' % info),
+            path('import/', self.lazy_view('import_action'), name='%s_%s_import' % info),
+            path('export/', self.lazy_view('export_action'), name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+    def has_io_permission(self, request, setting_name):
+        # Те же права, что проверяет ImportExportMixin
+        code = getattr(settings, setting_name, None)
+        if code is None:
+            return True
+        return request.user.has_perm(f'{self.opts.app_label}.{get_permission_codename(code, self.opts)}')
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            'ie_base_change_list_template': 'admin/change_list.html',
+            'has_import_permission': self.has_io_permission(request, 'IMPORT_EXPORT_IMPORT_PERMISSION_CODE'),
+            'has_export_permission': self.has_io_permission(request, 'IMPORT_EXPORT_EXPORT_PERMISSION_CODE'),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
@@ -1,22 +1,56 @@
-from rest_framework import viewsets
+from datetime import date
+
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Car, Brand
-from .serializers import CarSerializer, BrandSerializer
+from rest_framework.views import APIView
+from django.core.files.storage import default_storage
+from django.db.models import F, OuterRef, Q, Subquery
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from . import archive, batch, changefeed, recent, throttling, uploads, visitors
+from .apikeys import HasTokenScope
+from .conditional import ConditionalGetMixin, get_versions
+from .mirror import mirror_map
+from .jobs import buffer_view
+from .models import (Car, CarCard, Brand, MirroredPhoto, PendingViews, PhotoUpload, PriceChange, SellerStats,
+                     User)
+from .serializers import (CarSerializer, CarCardSerializer, CarDetailSerializer, BrandSerializer, CarModelSerializer,
+                          SellerSerializer, SellerCarSerializer, PhotoUploadSerializer)
 
 
 # Api объявления
-class CarViewSet(viewsets.ModelViewSet):
-    queryset = Car.objects.filter(status='active').select_related('brand', 'model', 'user')
+class CarViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_tables = ('car', 'brand')
+    lookup_value_regex = r'\d+'
+    queryset = Car.objects.filter(status='active').select_related('brand', 'model', 'user', 'visitor_total')
     serializer_class = CarSerializer
 
     filterset_fields = ['brand', 'model', 'year', 'status', 'price']
-    search_fields = ['description', 'brand__name', 'model__name']
     ordering_fields = ['price', 'year', 'created_at', 'views']
+    # Списки читаются из карточек каталога (CarCard), остальное — из Car
+    card_actions = ('list', 'cheap')
+    # Токенов за запрос (core.throttling); cheap отдаёт все совпадения без пагинации
+    throttle_costs = {'cheap': 10, 'price_drops': 2, 'batch': 5}
+
+    @property
+    def search_fields(self):
+        if self.action in self.card_actions:
+            return ['description', 'brand_name', 'model_name']
+        return ['description', 'brand__name', 'model__name']
+
+    def get_serializer_class(self):
+        if self.action in self.card_actions:
+            return CarCardSerializer
+        if self.action == 'retrieve':
+            return CarDetailSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = CarCard.objects.all() if self.action in self.card_actions else super().get_queryset()
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related(batch.PHOTOS)
 
         # собственные объявления
         if self.request.user.is_authenticated and 'my' in self.request.query_params:
@@ -36,6 +70,61 @@ class CarViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    # Для списков карты зеркал фото и уникальных посетителей строятся одним запросом на страницу
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            cars = list(args[0])
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context['unique_viewers'] = visitors.estimates(car.pk for car in cars)
+            if self.action not in self.card_actions:
+                context['mirrors'] = mirror_map(car.main_image_url for car in cars)
+            args = (cars, *args[1:])
+        elif self.action == 'retrieve' and args:
+            car = args[0]
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context['mirrors'] = mirror_map([car.main_image_url, *(photo.image_url for photo in car.photos.all())])
+        return super().get_serializer(*args, **kwargs)
+
+    # Найденный дубль возвращается в ответе; при объединении — 200 и исходное объявление
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        data = dict(serializer.data)
+        match = serializer.duplicate
+        if match:
+            data['duplicate'] = {'id': match.car.pk, 'similarity': round(match.similarity, 3), 'merged': match.merged}
+        code = status.HTTP_200_OK if match and match.merged else status.HTTP_201_CREATED
+        return Response(data, status=code, headers=self.get_success_headers(data))
+
+    # ETag карточки: дата изменения, просмотры и уникальные посетители + версия справочника марок
+    def get_object_validators(self, request, pk):
+        try:
+            row = self.get_queryset().filter(pk=pk).values_list(*batch.VALIDATOR_FIELDS).first()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            return None, None
+        brand_version = get_versions('brand')['brand'][0]
+        return batch.object_etag(row, brand_version), row[1]
+
+    # Ответ кэшируется по ETag — его переиспользует batch
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and response.has_header('ETag'):
+            batch.store(request, response['ETag'], response.data)
+        return response
+
+    # Несколько объявлений с фото GET /api/cars/batch/?ids=3,1,2 — в порядке ids, ненайденные в missing
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        try:
+            ids = batch.parse_ids(request.query_params.get('ids', ''))
+        except ValueError as exc:
+            return Response({'detail': f'ids: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        results, missing = batch.load(self.get_queryset(), ids, request)
+        return Response({'results': results, 'missing': missing})
+
     # Дешёвые тачки GET /api/cars/cheap/
     @action(detail=False, methods=['get'])
     def cheap(self, request):
@@ -43,18 +132,174 @@ class CarViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
+    # Подешевевшие объявления GET /api/cars/price-drops/?limit=50 (частичный индекс car_price_drop_idx).
+    # Один запрос: посетители — JOIN visitor_total, локальная копия фото — подзапросом по source_url
+    @action(detail=False, methods=['get'], url_path='price-drops')
+    def price_drops(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 100)
+        except ValueError:
+            limit = 50
+        mirror = MirroredPhoto.objects.filter(source_url=OuterRef('main_image_url'), status='ok').values('file')[:1]
+        cars = list(
+            Car.objects.filter(status='active', previous_price__gt=F('price'))
+            .select_related('brand', 'model', 'user', 'visitor_total')
+            .annotate(mirror_file=Subquery(mirror))
+            .order_by('-price_changed_at')[:max(limit, 1)]
+        )
+        context = self.get_serializer_context()
+        context['mirrors'] = {car.main_image_url: default_storage.url(car.mirror_file) for car in cars if car.mirror_file}
+        serializer = self.get_serializer_class()(cars, many=True, context=context)
+        return Response(serializer.data)
+
+    # Точки для графика цены GET /api/cars/{id}/price-history/ (404, как у самого объявления)
+    @action(detail=True, methods=['get'], url_path='price-history')
+    def price_history(self, request, pk=None):
+        if not self.get_queryset().filter(pk=pk).exists():
+            raise Http404
+        points = PriceChange.objects.filter(car_id=pk).order_by('changed_at').values_list('changed_at', 'price')
+        return Response({
+            'car': int(pk),
+            'points': [{'changed_at': changed_at, 'price': price} for changed_at, price in points],
+        })
+
+    # Уникальные посетители за период GET /api/cars/{id}/unique-viewers/?from=2026-01-01&to=2026-01-31
+    @action(detail=True, methods=['get'], url_path='unique-viewers')
+    def unique_viewers(self, request, pk=None):
+        car = self.get_object()
+        try:
+            start, end = (
+                date.fromisoformat(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('from', 'to')
+            )
+        except ValueError:
+            return Response({'detail': 'Даты в формате ГГГГ-ММ-ДД'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'car': car.pk,
+            'from': start,
+            'to': end,
+            'unique_viewers': visitors.unique_viewers(car.pk, start, end),
+        })
+
     # Увеличить просмотры POST /api/cars/{id}/view/
     @action(detail=True, methods=['post'])
     def view(self, request, pk=None):
         car = self.get_object()
-        car.views += 1
-        car.save(update_fields=['views'])
-        return Response({'message': 'Просмотр засчитан', 'views': car.views})
+        # Просмотры копятся в буфере и переносятся в Car.views задачей flush_views
+        buffer_view(car.pk)
+        visitors.record_view(car.pk, visitors.visitor_id(request))
+        pending = PendingViews.objects.filter(car_id=car.pk).values_list('count', flat=True).first() or 0
+        return Response({'message': 'Просмотр засчитан', 'views': car.views + pending})
 
 
 #  API для марок автомобилей api/brands/
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_tables = ('brand',)
     queryset = Brand.objects.all().order_by('name')
     serializer_class = BrandSerializer
     search_fields = ['name']
     ordering_fields = ['name', 'created_at']
+
+
+# Профиль продавца api/sellers/{id}/ — готовые счётчики без агрегаций
+class SellerViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = SellerStats.objects.select_related('user')
+    serializer_class = SellerSerializer
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # У продавца ещё нет объявлений — нулевая статистика
+            return SellerStats(user=get_object_or_404(User, pk=self.kwargs['pk']))
+
+    # Объявления продавца api/sellers/{id}/cars/; ?archived=1 — вместе с архивом проданных
+    @action(detail=True, methods=['get'])
+    def cars(self, request, pk=None):
+        user = get_object_or_404(User, pk=pk)
+        archived = request.query_params.get('archived') in ('1', 'true')
+        page = self.paginate_queryset(archive.seller_history(user.pk, archived))
+        return self.get_paginated_response(SellerCarSerializer(page, many=True).data)
+
+
+# Загрузка фото по частям api/uploads/ (core.uploads):
+# POST {car, target: main|photo, filename, size, sha256} — начать, ответ с id;
+# PATCH api/uploads/{id}/ с заголовком Upload-Offset и частью файла в теле
+# (необязательный Upload-Checksum — SHA-256 части); HEAD/GET — докуда дошла загрузка
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    serializer_class = PhotoUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, HasTokenScope]
+
+    def get_queryset(self):
+        return PhotoUpload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        try:
+            serializer.instance = uploads.start(self.request.user, **serializer.validated_data)
+        except uploads.UploadError as exc:
+            raise ValidationError({'detail': str(exc)}) from None
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = str(response.data['offset'])
+        return response
+
+    # Тело читается потоком (request.stream), request.data не трогается — файл не буферизуется
+    def partial_update(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'detail': 'Нужны заголовки Upload-Offset и Content-Length'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({'detail': 'Пустая часть'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads.write_chunk(upload, offset, request.stream, length, request.headers.get('Upload-Checksum'))
+        except uploads.UploadError as exc:
+            return Response({'detail': str(exc), 'offset': upload.offset, 'status': upload.status},
+                            status=exc.status, headers={'Upload-Offset': str(upload.offset)})
+        data = self.get_serializer(upload).data
+        return Response(data, headers={'Upload-Offset': str(upload.offset)})
+
+    def perform_destroy(self, instance):
+        uploads.cancel(instance)
+
+
+# Лента изменений api/changes/?since=<токен> — для зеркал каталога у партнёров
+class ChangeFeedView(APIView):
+    permission_classes = [permissions.IsAuthenticated, HasTokenScope]
+    max_limit = 1000
+    required_scope = 'feed'
+
+    def get(self, request):
+        try:
+            since = changefeed.decode_token(request.query_params.get('since', ''))
+            limit = min(int(request.query_params.get('limit', 100)), self.max_limit)
+        except (changefeed.InvalidToken, ValueError):
+            return Response({'detail': 'Некорректный токен или limit'}, status=status.HTTP_400_BAD_REQUEST)
+        if since and since < changefeed.floor():
+            return Response({'detail': 'Токен устарел, требуется полная синхронизация'},
+                            status=status.HTTP_410_GONE)
+        serializers = {'car': CarSerializer, 'brand': BrandSerializer, 'model': CarModelSerializer}
+        return Response(changefeed.fetch_changes(since, max(limit, 1), serializers, {'request': request}))
+
+
+# Недавно просмотренные объявления api/recently-viewed/ (core.recent)
+class RecentlyViewedView(APIView):
+
+    def get(self, request):
+        cards = recent.cards(request)
+        context = {'request': request, 'unique_viewers': visitors.estimates(card.car_id for card in cards)}
+        return Response({'results': CarCardSerializer(cards, many=True, context=context).data})
+
+
+# Отказы ограничителя и состояние сброса нагрузки этого процесса api/throttle-stats/
+class ThrottleStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({'rejected': throttling.rejection_stats(), 'shedder': throttling.shedder.state()})
@@ -0,0 +1,149 @@
+import hashlib
+import hmac
+import secrets
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .conditional import bump_version, get_versions
+from .models import ApiKey
+
+
+# Ключи API вместо Basic-авторизации: секрет случайный, поэтому достаточно HMAC-SHA256
+# (PBKDF2 на каждый запрос не нужен). Проверенные ключи кэшируются в процессе;
+# отзыв поднимает версию 'api_keys', процессы сверяют её раз в API_KEY_REVOCATION_CHECK секунд.
+
+KEYWORD = 'Token'
+TOKEN_PREFIX = 'ch_'
+VERSION = 'api_keys'
+MAX_CACHED = 10000
+
+# {префикс: (hmac секрета, пользователь, права, id ключа, истекает в monotonic)}
+_verified = {}
+_state = {'version': None, 'checked_at': 0.0}
+
+
+def hash_secret(secret):
+    return hmac.new(settings.SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def create_key(user, name, scopes=('read',), expires_at=None):
+    # Возвращает ключ и токен целиком — токен показывается один раз и нигде не хранится
+    prefix = secrets.token_hex(6)
+    secret = secrets.token_urlsafe(32)
+    key = ApiKey.objects.create(
+        user=user, name=name, prefix=prefix, key_hash=hash_secret(secret),
+        scopes=list(scopes), expires_at=expires_at,
+    )
+    return key, f'{TOKEN_PREFIX}{prefix}.{secret}'
+
+
+def parse_token(token):
+    if not token.startswith(TOKEN_PREFIX) or '.' not in token:
+        return None, None
+    prefix, secret = token[len(TOKEN_PREFIX):].split('.', 1)
+    return prefix, secret
+
+
+def revoke(queryset):
+    revoked = queryset.filter(revoked_at__isnull=True).update(revoked_at=timezone.now())
+    if revoked:
+        invalidate()
+    return revoked
+
+
+def invalidate():
+    # Сброс кэшей во всех процессах (не позже чем через API_KEY_REVOCATION_CHECK секунд)
+    bump_version(VERSION)
+    _verified.clear()
+
+
+def _check_revocations():
+    now = time.monotonic()
+    if now - _state['checked_at'] < settings.API_KEY_REVOCATION_CHECK:
+        return
+    version = get_versions(VERSION)[VERSION][0]
+    if version != _state['version']:
+        _verified.clear()
+        _state['version'] = version
+    _state['checked_at'] = now
+
+
+def verify(token):
+    # (пользователь, ключ-в-кэше) или None
+    prefix, secret = parse_token(token)
+    if not prefix:
+        return None
+    _check_revocations()
+    digest = hash_secret(secret)
+    now = time.monotonic()
+    cached = _verified.get(prefix)
+    if cached and cached[4] > now:
+        return cached if hmac.compare_digest(cached[0], digest) else None
+
+    key = ApiKey.objects.select_related('user').filter(
+        prefix=prefix, revoked_at__isnull=True,
+    ).first()
+    if key is None or not hmac.compare_digest(key.key_hash, digest) or not key.user.is_active:
+        return None
+    ttl = settings.API_KEY_CACHE_TTL
+    if key.expires_at:
+        remaining = (key.expires_at - timezone.now()).total_seconds()
+        if remaining <= 0:
+            return None
+        ttl = min(ttl, remaining)
+    # Дата использования пишется при промахе кэша, а не на каждый запрос
+    ApiKey.objects.filter(pk=key.pk).update(last_used_at=timezone.now())
+    if len(_verified) >= MAX_CACHED:
+        _verified.clear()
+    entry = (key.key_hash, key.user, frozenset(key.scopes), key.pk, now + ttl)
+    _verified[prefix] = entry
+    return entry
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    # Authorization: Token ch_<префикс>.<секрет>
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() not in (b'token', b'bearer'):
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Некорректный заголовок Authorization'))
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Некорректный ключ API')) from None
+        entry = verify(token)
+        if entry is None:
+            raise exceptions.AuthenticationFailed(_('Ключ API недействителен или отозван'))
+        return entry[1], ApiKeyAuth(entry[3], entry[2])
+
+    def authenticate_header(self, request):
+        return KEYWORD
+
+
+class ApiKeyAuth:
+    # request.auth при входе по ключу
+    def __init__(self, key_id, scopes):
+        self.key_id = key_id
+        self.scopes = scopes
+
+
+class HasTokenScope(BasePermission):
+    # По ключу: чтение требует 'read', изменение — 'write'; сессия и Basic не ограничиваются.
+    # Представление со своим required_scope доступно только по ключу с этим правом
+    message = _('У ключа API нет нужных прав')
+
+    def has_permission(self, request, view):
+        scope = getattr(view, 'required_scope', None)
+        if not isinstance(request.auth, ApiKeyAuth):
+            return scope is None
+        if scope is None:
+            scope = 'read' if request.method in SAFE_METHODS else 'write'
+        return scope in request.auth.scopes
@@ -1,5 +1,33 @@
-from django.apps import AppConfig
+from importlib import import_module
+
+from django.apps import AppConfig, apps
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.utils.module_loading import module_has_submodule
 
 
 class CoreConfig(AppConfig):
+    # В модуле два AppConfig — без default Django не выберет CoreConfig для 'core'
+    default = True
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+
+class AdminConfig(SimpleAdminConfig):
+    # Как django.contrib.admin, но без import_export.admin: модуль ничего не регистрирует,
+    # а при импорте тянет tablib и openpyxl (см. LazyImportExportMixin)
+    skip_admin_modules = ('import_export',)
+
+    def ready(self):
+        super().ready()
+        from django.contrib.admin.sites import site
+        for app_config in apps.get_app_configs():
+            if app_config.name in self.skip_admin_modules or not module_has_submodule(app_config.module, 'admin'):
+                continue
+            before = site._registry.copy()
+            try:
+                import_module(f'{app_config.name}.admin')
+            except Exception:
+                site._registry = before
+                raise
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import SET_NULL, BooleanField, ForeignObjectRel, Value
+from django.utils import timezone
+
+from . import sellers, uploads, visitors
+from .models import (ArchivedCar, ArchivedCarPhoto, Car, CarPhoto, Favorite, PendingViews, PendingVisit,
+                     PhotoUpload, PriceChange, VisitorTotal)
+
+
+# Горячее/холодное хранение: проданные объявления через ARCHIVE_SOLD_AFTER_DAYS дней
+# переносятся пачками в ArchivedCar/ArchivedCarPhoto, в Car остаются только живые строки.
+# История цен, избранное и посетители переносятся в поля ArchivedCar. Перенос — не удаление
+# объявления: строки удаляются без сигналов, поэтому нет записей истории и ленты изменений,
+# а счётчики продавцов (архив входит в них) не меняются
+
+CAR_FIELDS = [
+    'id', 'user_id', 'brand_id', 'model_id', 'year', 'mileage', 'price', 'description',
+    'main_image_url', 'main_image', 'status', 'views', 'previous_price', 'price_changed_at',
+    'created_at', 'updated_at', 'created_by_id',
+]
+PHOTO_FIELDS = ['id', 'car_id', 'image_url', 'image', 'is_main', 'created_at']
+# Поля истории продавца (общие для Car и ArchivedCar)
+HISTORY_FIELDS = [
+    'id', 'brand__name', 'model__name', 'year', 'mileage', 'price', 'status', 'views', 'created_at',
+]
+
+
+def archive_sold(days=None, batch_size=None):
+    days = settings.ARCHIVE_SOLD_AFTER_DAYS if days is None else days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+
+
+def archive_batch(cutoff, batch_size):
+    # Одна пачка в одной транзакции: копия в архив, затем удаление из Car и зависимых таблиц
+    with transaction.atomic():
+        rows = list(
+            Car.objects.select_for_update().filter(status='sold', updated_at__lt=cutoff)
+            .order_by('pk').values(*CAR_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row['id'] for row in rows]
+        now = timezone.now()
+        dependents = collect_dependents(ids)
+        pending_views = dict(PendingViews.objects.filter(car_id__in=ids).values_list('car_id', 'count'))
+        for row in rows:
+            # Ещё не сброшенные просмотры (flush_views) — в архивный счётчик и статистику продавца
+            row['views'] += pending_views.get(row['id'], 0)
+            sellers.apply_delta(row['user_id'], total_views=pending_views.get(row['id'], 0))
+        ArchivedCar.objects.bulk_create([
+            ArchivedCar(archived_at=now, **row, **dependents[row['id']]) for row in rows
+        ])
+        ArchivedCarPhoto.objects.bulk_create([
+            ArchivedCarPhoto(**row) for row in CarPhoto.objects.filter(car_id__in=ids).values(*PHOTO_FIELDS)
+        ])
+        unfinished = list(PhotoUpload.objects.filter(car_id__in=ids).exclude(status='complete').only('pk'))
+        purge(ids)
+        transaction.on_commit(lambda: [uploads.remove_temp(upload) for upload in unfinished])
+    return len(rows)
+
+
+def collect_dependents(ids):
+    # {id: поля ArchivedCar} из истории цен, избранного и скетчей посетителей
+    dependents = {pk: {'price_history': [], 'favorited_by': []} for pk in ids}
+    prices = PriceChange.objects.filter(car_id__in=ids).order_by('changed_at', 'pk')
+    for car_id, price, changed_at in prices.values_list('car_id', 'price', 'changed_at'):
+        dependents[car_id]['price_history'].append([str(price), changed_at.isoformat()])
+    for car_id, user_id in Favorite.objects.filter(car_id__in=ids).order_by('pk').values_list('car_id', 'user_id'):
+        dependents[car_id]['favorited_by'].append(user_id)
+    # Итоговый скетч вместе с ещё не сброшенными посещениями (visitors.flush)
+    registers = {
+        car_id: visitors.unpack(data)
+        for car_id, data in VisitorTotal.objects.filter(car_id__in=ids).values_list('car_id', 'registers')
+    }
+    for car_id, value in PendingVisit.objects.filter(car_id__in=ids).values_list('car_id', 'visitor_hash'):
+        visitors.add_hash(registers.setdefault(car_id, visitors.new_registers()), value)
+    for car_id, car_registers in registers.items():
+        dependents[car_id]['visitor_registers'] = visitors.pack(car_registers)
+        dependents[car_id]['unique_viewers'] = visitors.estimate(car_registers)
+    return dependents
+
+
+def purge(ids):
+    # Прямой DELETE по всем связям Car (и будущим — иначе нарушится внешний ключ), затем самих строк
+    using = router.db_for_write(Car)
+    for relation in Car._meta.get_fields(include_hidden=True):
+        if not isinstance(relation, ForeignObjectRel):
+            continue
+        related = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': ids})
+        if relation.on_delete is SET_NULL:
+            related.update(**{relation.field.name: None})
+        else:
+            related._raw_delete(using)
+    Car.objects.filter(pk__in=ids)._raw_delete(using)
+
+
+def seller_history(user_id, archived=False):
+    # Публичные объявления продавца; с archived=True — вместе с архивом (UNION ALL)
+    hot = Car.objects.filter(user_id=user_id).exclude(status='moderation').annotate(
+        archived=Value(False, output_field=BooleanField()),
+    ).values(*HISTORY_FIELDS, 'archived').order_by()
+    if not archived:
+        return hot.order_by('-created_at')
+    cold = ArchivedCar.objects.filter(user_id=user_id).annotate(
+        archived=Value(True, output_field=BooleanField()),
+    ).values(*HISTORY_FIELDS, 'archived').order_by()
+    return hot.union(cold, all=True).order_by('-created_at')
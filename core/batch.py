@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .conditional import get_versions, make_etag
+from .mirror import mirror_map
+from .models import CarPhoto
+from .serializers import CarDetailSerializer
+
+
+# Несколько объявлений за один запрос (api/cars/batch/, страница сравнения).
+# Данные объявления кэшируются по его ETag (тот же, что у api/cars/{id}/, с именем продавца),
+# поэтому повторно сериализуются только изменившиеся. На любой список — не больше 5 запросов:
+# версии объявлений, версия марок и одной пачкой для промахов кэша — объявления, фото, зеркала
+
+# Имя продавца выводится в объявлении, но Car.updated_at при его смене не меняется
+VALIDATOR_FIELDS = ('pk', 'updated_at', 'views', 'visitor_total__estimate', 'user__username')
+PHOTOS = Prefetch('photos', queryset=CarPhoto.objects.order_by('-is_main', 'created_at'))
+
+
+def parse_ids(raw, limit=None):
+    # '3,1,3,2' → [3, 1, 2]; ValueError при мусоре или превышении лимита
+    limit = limit or settings.CAR_BATCH_MAX_IDS
+    ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    if not ids or len(ids) > limit:
+        raise ValueError(f'От 1 до {limit} id')
+    return ids
+
+
+def object_etag(row, brand_version):
+    pk, updated_at, views, unique_viewers, seller = row
+    return make_etag('car', pk, updated_at.isoformat(), views, unique_viewers, seller, brand_version)
+
+
+def cache_key(request, etag):
+    # Ссылки на фото абсолютные — ключ зависит от хоста
+    return f'car-data:{request.get_host()}:{etag}'
+
+
+def store(request, etag, data):
+    cache.set(cache_key(request, etag), data, settings.CAR_DATA_CACHE_TIMEOUT)
+
+
+def serialize(cars, request):
+    cars = list(cars)
+    urls = [car.main_image_url for car in cars]
+    urls += [photo.image_url for car in cars for photo in car.photos.all()]
+    context = {'request': request, 'mirrors': mirror_map(urls)}
+    return CarDetailSerializer(cars, many=True, context=context).data
+
+
+def load(queryset, ids, request):
+    # ([данные в порядке ids], [ненайденные id])
+    rows = queryset.filter(pk__in=ids).values_list(*VALIDATOR_FIELDS)
+    brand_version = get_versions('brand')['brand'][0]
+    keys = {row[0]: cache_key(request, object_etag(row, brand_version)) for row in rows}
+    data = cache.get_many(keys.values())
+    misses = [pk for pk, key in keys.items() if key not in data]
+    if misses:
+        cars = queryset.filter(pk__in=misses).prefetch_related(PHOTOS)
+        fresh = {keys[item['id']]: item for item in serialize(cars, request)}
+        cache.set_many(fresh, settings.CAR_DATA_CACHE_TIMEOUT)
+        data.update(fresh)
+    # Объявление могло пропасть между запросами — тогда оно тоже в missing
+    found = [pk for pk in ids if keys.get(pk) in data]
+    return [data[keys[pk]] for pk in found], [pk for pk in ids if keys.get(pk) not in data]
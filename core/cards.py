@@ -0,0 +1,126 @@
+from django.core.files.storage import default_storage
+from django.db.models import Exists, F, OuterRef
+from django.utils.text import Truncator
+
+from .mirror import mirror_map
+from .models import Car, CarCard, CarPhoto
+
+
+# Read-модель каталога: CarCard хранит готовые к выводу поля активных объявлений.
+# Обновляется из сигналов Car/Brand/Model/User/CarPhoto, пересобирается rebuild()
+
+EXCERPT_WORDS = 30
+BATCH_SIZE = 500
+UPDATE_FIELDS = [
+    'brand', 'model', 'user', 'brand_name', 'model_name', 'user_name', 'year', 'mileage', 'price',
+    'previous_price', 'price_changed_at', 'description', 'excerpt', 'main_image_url',
+    'main_image_mirror_url', 'image', 'status', 'views', 'created_at', 'updated_at',
+]
+
+
+def build_cards(cars):
+    # Картинка карточки: загруженный файл → копия/URL main_image_url → основное фото из CarPhoto
+    main_photos = {
+        car_id: (image_url, image)
+        for car_id, image_url, image in CarPhoto.objects.filter(car__in=cars, is_main=True)
+        .order_by('created_at').values_list('car_id', 'image_url', 'image')
+    }
+    mirrors = mirror_map([car.main_image_url for car in cars] + [url for url, _ in main_photos.values()])
+    cards = []
+    for car in cars:
+        photo_url, photo_file = main_photos.get(car.pk, ('', ''))
+        if car.main_image:
+            image = car.main_image.url
+        elif car.main_image_url:
+            image = mirrors.get(car.main_image_url) or car.main_image_url
+        elif photo_file:
+            image = default_storage.url(photo_file)
+        else:
+            image = mirrors.get(photo_url) or photo_url
+        cards.append(CarCard(
+            car_id=car.pk,
+            brand_id=car.brand_id,
+            model_id=car.model_id,
+            user_id=car.user_id,
+            brand_name=car.brand.name,
+            model_name=car.model.name,
+            user_name=car.user.username,
+            year=car.year,
+            mileage=car.mileage,
+            price=car.price,
+            previous_price=car.previous_price,
+            price_changed_at=car.price_changed_at,
+            description=car.description,
+            excerpt=Truncator(car.description).words(EXCERPT_WORDS)[:400],
+            main_image_url=car.main_image_url,
+            main_image_mirror_url=mirrors.get(car.main_image_url, ''),
+            image=image[:255],
+            status=car.status,
+            views=car.views,
+            created_at=car.created_at,
+            updated_at=car.updated_at,
+        ))
+    return cards
+
+
+def save_cards(cars):
+    CarCard.objects.bulk_create(
+        build_cards(cars), update_conflicts=True, unique_fields=['car'], update_fields=UPDATE_FIELDS,
+    )
+
+
+def refresh(car_ids):
+    # Перечитывает объявления: активные сохраняются в карточки, остальные удаляются
+    car_ids = set(car_ids)
+    if not car_ids:
+        return
+    cars = list(Car.objects.filter(pk__in=car_ids, status='active').select_related('brand', 'model', 'user'))
+    stale = car_ids - {car.pk for car in cars}
+    if stale:
+        CarCard.objects.filter(car_id__in=stale).delete()
+    if cars:
+        save_cards(cars)
+
+
+def car_saved(car, update_fields=None):
+    if update_fields is not None and set(update_fields) == {'views'}:
+        CarCard.objects.filter(car_id=car.pk).update(views=car.views)
+    else:
+        refresh([car.pk])
+
+
+def add_views(car_id, count):
+    CarCard.objects.filter(car_id=car_id).update(views=F('views') + count)
+
+
+# Переименования — одним UPDATE по индексу, без перечитывания объявлений
+def brand_changed(brand):
+    CarCard.objects.filter(brand_id=brand.pk).exclude(brand_name=brand.name).update(brand_name=brand.name)
+
+
+def model_changed(model):
+    CarCard.objects.filter(model_id=model.pk).exclude(model_name=model.name).update(model_name=model.name)
+
+
+def user_changed(user):
+    CarCard.objects.filter(user_id=user.pk).exclude(user_name=user.username).update(user_name=user.username)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    # Полная пересборка: upsert активных пачками по id, затем удаление лишних карточек
+    saved = 0
+    last_id = 0
+    while True:
+        cars = list(
+            Car.objects.filter(status='active', pk__gt=last_id)
+            .select_related('brand', 'model', 'user').order_by('pk')[:batch_size]
+        )
+        if not cars:
+            break
+        save_cards(cars)
+        saved += len(cars)
+        last_id = cars[-1].pk
+    removed = CarCard.objects.filter(
+        ~Exists(Car.objects.filter(pk=OuterRef('car_id'), status='active'))
+    ).delete()[0]
+    return saved, removed
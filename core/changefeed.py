@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.http import base36_to_int, int_to_base36
+
+from .models import ChangeCounter, ChangeLog
+
+
+# Лента изменений каталога: ChangeLog пишется сигналами вместе с изменением объекта.
+# Курсор — номер seq в порядке коммита, а не id: id выдаётся при вставке, и долгая транзакция
+# закоммитила бы запись с меньшим id уже после того, как курсор клиента ушёл дальше
+
+ACTIONS = {'+': 'created', '~': 'updated', '-': 'deleted'}
+FLOOR = 'changelog_floor'
+SEQUENCE = 'changelog_seq'
+SEQUENCE_BATCH = 10000
+TOKEN_PREFIX = 'c1.'
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def record(model_name, object_id, action):
+    ChangeLog.objects.create(model=model_name, object_id=object_id, action=action)
+
+
+def encode_token(change_id):
+    return TOKEN_PREFIX + int_to_base36(change_id)
+
+
+def decode_token(token):
+    if not token:
+        return 0
+    if not token.startswith(TOKEN_PREFIX):
+        raise InvalidToken(token)
+    try:
+        return base36_to_int(token[len(TOKEN_PREFIX):])
+    except ValueError:
+        raise InvalidToken(token) from None
+
+
+def floor():
+    # Токены с seq меньше этого ссылаются на удалённые при сжатии tombstone-записи
+    return ChangeCounter.objects.filter(name=FLOOR).values_list('version', flat=True).first() or 0
+
+
+def assign_sequence(model=ChangeLog, name=SEQUENCE):
+    # Номера получают только уже закоммиченные записи и только под блокировкой счётчика,
+    # поэтому запись, закоммиченная позже, получит номер больше любого выданного раньше.
+    # Так же нумеруются события потока объявлений (stream.SEQUENCE)
+    if not model.objects.filter(seq__isnull=True).exists():
+        return 0
+    with transaction.atomic():
+        counter, _ = ChangeCounter.objects.select_for_update().get_or_create(name=name)
+        rows = list(model.objects.filter(seq__isnull=True).order_by('id').only('id')[:SEQUENCE_BATCH])
+        for number, row in enumerate(rows, counter.version + 1):
+            row.seq = number
+        model.objects.bulk_update(rows, ['seq'], batch_size=1000)
+        counter.version += len(rows)
+        counter.save(update_fields=['version', 'updated_at'])
+    return len(rows)
+
+
+def fetch_changes(since, limit, serializers, context=None):
+    # Пачка изменений после since; несколько изменений объекта схлопываются в последнее.
+    # Объявления отдаются только активные — снятые с публикации приходят как удалённые
+    assign_sequence()
+    rows = list(
+        ChangeLog.objects.filter(seq__gt=since).order_by('seq')
+        .values_list('seq', 'model', 'object_id', 'action')[:limit]
+    )
+    latest = {}
+    for change_id, model_name, object_id, action in rows:
+        latest.pop((model_name, object_id), None)
+        latest[(model_name, object_id)] = (change_id, action)
+
+    objects = {}
+    for model_name, serializer_class in serializers.items():
+        ids = [object_id for (name, object_id), (_, action) in latest.items()
+               if name == model_name and action != '-']
+        queryset = serializer_class.Meta.model.objects.filter(pk__in=ids)
+        if model_name == 'car':
+            queryset = queryset.filter(status='active').select_related('brand', 'model', 'user', 'visitor_total')
+        for obj in queryset:
+            objects[(model_name, obj.pk)] = serializer_class(obj, context=context).data
+
+    results = []
+    for key, (change_id, action) in latest.items():
+        data = objects.get(key)
+        if data is None:
+            action = '-'
+        results.append({
+            'type': key[0],
+            'id': key[1],
+            'action': ACTIONS[action],
+            'data': data,
+        })
+    next_id = rows[-1][0] if rows else since
+    return {
+        'next': encode_token(next_id),
+        'has_more': len(rows) == limit,
+        'results': results,
+    }
+
+
+def compact(days, tombstone_days, batch_size=10000):
+    # Удаляет записи, перекрытые более новыми, и старые tombstone-записи
+    cutoff = timezone.now() - timedelta(days=days)
+    superseded = ChangeLog.objects.filter(created_at__lt=cutoff).filter(Exists(
+        ChangeLog.objects.filter(model=OuterRef('model'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'))
+    ))
+    removed = _delete_in_batches(superseded, batch_size)
+
+    tombstone_cutoff = timezone.now() - timedelta(days=tombstone_days)
+    tombstones = ChangeLog.objects.filter(action='-', created_at__lt=tombstone_cutoff, seq__isnull=False)
+    last_tombstone = tombstones.order_by('-seq').values_list('seq', flat=True).first()
+    if last_tombstone:
+        with transaction.atomic():
+            ChangeCounter.objects.update_or_create(name=FLOOR, defaults={'version': last_tombstone})
+            removed += _delete_in_batches(tombstones, batch_size)
+    return removed
+
+
+def _delete_in_batches(queryset, batch_size):
+    removed = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        removed += ChangeLog.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,103 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import ChangeCounter
+
+
+# Условные GET-запросы: ETag / Last-Modified без рендера тела ответа
+
+
+def bump_version(name):
+    # +1 к счётчику таблицы (вызывается из сигналов)
+    updated = ChangeCounter.objects.filter(name=name).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        ChangeCounter.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+def get_versions(*names):
+    # {таблица: (версия, дата изменения)} одним запросом
+    rows = ChangeCounter.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    versions = {name: (0, None) for name in names}
+    for name, version, updated_at in rows:
+        versions[name] = (version, updated_at)
+    return versions
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+def user_key(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else 'anon'
+
+
+def not_modified_response(request, etag, last_modified):
+    # 304/412, если клиент уже имеет актуальную версию, иначе None
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def apply_validators(request, response, etag, last_modified):
+    # ETag, Last-Modified и Cache-Control для 200 и 304
+    if request.method not in ('GET', 'HEAD'):
+        return response
+    if not (200 <= response.status_code < 300 or response.status_code == 304):
+        return response
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    if last_modified and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    # Ответ с cookie (или с сессией, которую сохранит SessionMiddleware) в общий кэш не попадает
+    session = getattr(request, 'session', None)
+    sets_cookies = bool(response.cookies) or (session is not None and session.modified)
+    if user_key(request) == 'anon' and not sets_cookies:
+        patch_cache_control(response, public=True, max_age=settings.CONDITIONAL_GET_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie', 'Authorization'))
+    return response
+
+
+class ConditionalGetMixin:
+    # Для ViewSet: list/retrieve отвечают 304, если данные не менялись
+    conditional_tables = ()
+
+    def get_list_validators(self, request):
+        versions = get_versions(*self.conditional_tables)
+        etag = make_etag(
+            'list', request.get_full_path(), user_key(request),
+            *(version for version, _ in versions.values())
+        )
+        last_modified = max((dt for _, dt in versions.values() if dt), default=None)
+        return etag, last_modified
+
+    def get_object_validators(self, request, pk):
+        etag, last_modified = self.get_list_validators(request)
+        return make_etag('object', pk, etag), last_modified
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_list_validators(request)
+        return self._conditional(request, etag, last_modified, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        etag, last_modified = self.get_object_validators(request, kwargs[lookup])
+        return self._conditional(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, etag, last_modified, handler, *args, **kwargs):
+        response = None
+        if etag or last_modified:
+            response = not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return apply_validators(request, response, etag, last_modified)
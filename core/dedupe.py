@@ -0,0 +1,231 @@
+import hashlib
+import random
+import re
+from array import array
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import cards, sellers
+from .models import Car, CarBand, CarPhoto, CarSignature, Favorite
+
+
+# Поиск почти одинаковых объявлений: MinHash по описанию и характеристикам,
+# кандидаты — через LSH-корзины (CarBand) одним индексным запросом
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MILEAGE_STEP = 5000
+MERSENNE = (1 << 61) - 1
+# Поля, от которых зависит подпись
+FIELDS = ('description', 'brand_id', 'model_id', 'year', 'mileage')
+# Поля, которые переносятся из повтора в исходное объявление
+MERGE_FIELDS = ('description', 'price', 'mileage', 'main_image_url', 'main_image')
+
+_random = random.Random(NUM_PERM)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE), _random.randrange(MERSENNE)) for _ in range(NUM_PERM)]
+WORD_RE = re.compile(r'\w+')
+
+
+@dataclass
+class Match:
+    car: Car
+    similarity: float
+    merged: bool = False
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def normalize(text):
+    return WORD_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def shingles(car):
+    # Пары соседних слов описания + характеристики отдельными «словами»
+    words = normalize(car.description or '')
+    result = {' '.join(words[i:i + 2]) for i in range(max(len(words) - 1, 1))} if words else set()
+    result.update((f'#brand:{car.brand_id}', f'#model:{car.model_id}', f'#year:{car.year}'))
+    if car.mileage is not None:
+        result.add(f'#mileage:{car.mileage // MILEAGE_STEP}')
+    return result
+
+
+def minhash(items):
+    hashes = [_hash64(item) for item in items]
+    return array('Q', (min((a * h + b) % MERSENNE for h in hashes) for a, b in PERMUTATIONS))
+
+
+def signature_of(car):
+    if getattr(car, '_signature', None) is None:
+        car._signature = minhash(shingles(car))
+    return car._signature
+
+
+def band_keys(signature):
+    # Ключ корзины включает номер полосы, поэтому хватает одного индекса по bucket
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def similarity(first, second):
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERM
+
+
+def find_duplicate(car, before=None):
+    # Лучший кандидат среди непроданных объявлений той же марки, модели и года
+    signature = signature_of(car)
+    candidates = CarBand.objects.filter(bucket__in=band_keys(signature)).values('car_id')
+    rows = CarSignature.objects.filter(
+        car_id__in=candidates,
+        car__brand_id=car.brand_id,
+        car__model_id=car.model_id,
+        car__year=car.year,
+        duplicate_of__isnull=True,
+    ).exclude(car__status='sold')
+    if car.pk:
+        rows = rows.exclude(car_id=car.pk)
+    if before:
+        rows = rows.filter(car_id__lt=before)
+
+    best = None
+    for car_id, stored in rows.order_by('car_id').values_list('car_id', 'signature'):
+        score = similarity(signature, array('Q', bytes(stored)))
+        if score >= settings.DEDUPE_THRESHOLD and (best is None or score > best[1]):
+            best = (car_id, score)
+    if best is None:
+        return None
+    original = Car.objects.filter(pk=best[0]).first()
+    return Match(original, best[1]) if original else None
+
+
+def index(car, match=None):
+    # Сохраняет подпись и корзины; без match прежняя пометка дубля не меняется
+    signature = signature_of(car)
+    defaults = {'signature': signature.tobytes()}
+    if match is not None:
+        defaults.update(duplicate_of=match.car, similarity=match.similarity)
+    CarSignature.objects.update_or_create(car_id=car.pk, defaults=defaults)
+    CarBand.objects.filter(car_id=car.pk).delete()
+    CarBand.objects.bulk_create(CarBand(car_id=car.pk, bucket=key) for key in band_keys(signature))
+
+
+def track_car(car):
+    car._dedupe_loaded = tuple(car.__dict__.get(field) for field in FIELDS)
+
+
+def car_saved(car, created):
+    # Подпись пересчитывается только при изменении описания или характеристик
+    current = tuple(getattr(car, field) for field in FIELDS)
+    if created or current != car._dedupe_loaded:
+        car._signature = None
+        index(car, getattr(car, '_duplicate', None))
+    car._dedupe_loaded = current
+
+
+def resolve(car):
+    # Проверка нового (ещё не сохранённого) объявления при добавлении.
+    # Повтор своего объявления объединяется с ним (merged=True, сохранять car не нужно),
+    # похожее на чужое сохраняется на модерацию с пометкой дубля.
+    match = find_duplicate(car)
+    if match is None:
+        return None
+    if settings.DEDUPE_MERGE and match.car.user_id == car.user_id:
+        merge_into(match.car, car)
+        match.merged = True
+        return match
+    car.status = 'moderation'
+    car._duplicate = match
+    return match
+
+
+@transaction.atomic
+def add_car(car):
+    # Добавление объявления (API, форма, импорт): повтор своего объявления объединяется с ним,
+    # остальное сохраняется. Возвращает сохранённое объявление и совпадение (или None)
+    match = resolve(car)
+    if match and match.merged:
+        return match.car, match
+    car.save()
+    return car, match
+
+
+def merge_into(original, repost):
+    # Содержимое повтора переносится в исходное объявление
+    for field in MERGE_FIELDS:
+        value = getattr(repost, field)
+        if value or (field == 'mileage' and value is not None):
+            setattr(original, field, value)
+    original._signature = None
+    original.save()
+    return original
+
+
+@transaction.atomic
+def merge_existing(original, duplicate):
+    # Объединение двух сохранённых объявлений одного продавца: остаётся более старое
+    merge_into(original, duplicate)
+    CarPhoto.objects.filter(car=duplicate).update(car=original)
+    # Избранное переносится; у кого в избранном оба — лишняя запись удаляется
+    Favorite.objects.filter(car=duplicate, user__favorites__car=original).delete()
+    Favorite.objects.filter(car=duplicate).update(car=original)
+    Car.objects.filter(pk=original.pk).update(views=F('views') + duplicate.views)
+    cards.add_views(original.pk, duplicate.views)
+    sellers.apply_delta(original.user_id, total_views=duplicate.views)
+    duplicate.delete()
+
+
+def dedupe_catalog(merge=False, dry_run=False, batch_size=500):
+    # Перестройка индекса и проверка всего каталога: более раннее объявление считается исходным
+    indexed = flagged = merged = 0
+    last_id = 0
+    while True:
+        batch = list(Car.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        with transaction.atomic():
+            CarSignature.objects.bulk_create(
+                [CarSignature(car=car, signature=signature_of(car).tobytes()) for car in batch],
+                update_conflicts=True, unique_fields=['car'], update_fields=['signature'],
+            )
+            CarBand.objects.filter(car__in=batch).delete()
+            CarBand.objects.bulk_create(
+                CarBand(car=car, bucket=key) for car in batch for key in band_keys(signature_of(car))
+            )
+        indexed += len(batch)
+
+    last_id = 0
+    while True:
+        batch = list(
+            Car.objects.filter(pk__gt=last_id).exclude(status='sold')
+            .select_related('signature').order_by('pk')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        for car in batch:
+            car._signature = array('Q', bytes(car.signature.signature))
+            match = find_duplicate(car, before=car.pk)
+            if match is None:
+                continue
+            if merge and match.car.user_id == car.user_id:
+                merged += 1
+                if not dry_run:
+                    merge_existing(match.car, car)
+                continue
+            flagged += 1
+            if not dry_run:
+                CarSignature.objects.filter(car=car).update(duplicate_of=match.car, similarity=match.similarity)
+                if car.status == 'active':
+                    car.status = 'moderation'
+                    car.save(update_fields=['status', 'updated_at'])
+    return indexed, flagged, merged
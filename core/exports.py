@@ -0,0 +1,142 @@
+import csv
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.db import connections
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+
+from .models import Car
+from .resources import CarResource
+
+
+# Параллельный экспорт: диапазон id делится на шарды, каждый шард форматируется
+# (dehydrate_* ресурса) в отдельном процессе со своим соединением с базой,
+# части склеиваются в порядке шардов — строки всегда идут по возрастанию id.
+# Выборка задаётся списком id или запросом (Query фильтров): по запросу шарды
+# делят его диапазон id и каждый применяет те же условия — список id не строится.
+
+FORMATS = ('csv', 'xlsx', 'zip')
+
+
+def make_shards(ids=None, shards=8, query=None):
+    # [(номер, от id, до id, явные id или None)]; шарду без пропусков в id хватает диапазона
+    if ids is not None:
+        ids = sorted(set(ids))
+        size = max(-(-len(ids) // shards), 1)
+        return [
+            (number, chunk[0], chunk[-1] + 1, None if chunk[-1] - chunk[0] + 1 == len(chunk) else chunk)
+            for number, chunk in enumerate(ids[start:start + size] for start in range(0, len(ids), size))
+        ]
+    bounds = cars(query).order_by().values_list('id', flat=True)
+    low, high = bounds.order_by('id').first(), bounds.order_by('-id').first()
+    if low is None:
+        return []
+    step = max(-(-(high - low + 1) // shards), 1)
+    return [(number, start, start + step, None) for number, start in enumerate(range(low, high + 1, step))]
+
+
+def cars(query=None):
+    # Объявления по сохранённому Query (pickle переносит его в задачу и дочерние процессы)
+    queryset = Car.objects.all()
+    if query is not None:
+        queryset.query = query
+    return queryset
+
+
+def export_shard(shard, fmt, tmpdir, query=None):
+    # Выполняется в дочернем процессе; возвращает (номер, путь к части, строк, ширины столбцов)
+    number, low, high, ids = shard
+    queryset = cars(query).filter(id__gte=low, id__lt=high).select_related('brand', 'model', 'user').order_by('id')
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    dataset = CarResource().export(queryset)
+    path = os.path.join(tmpdir, f'part-{number:05d}')
+    widths = [len(str(title)) for title in dataset.headers]
+    if fmt == 'xlsx':
+        for row in dataset:
+            widths = [max(width, len(str(value))) for width, value in zip(widths, row)]
+        with open(path, 'wb') as fh:
+            pickle.dump(list(dataset), fh, pickle.HIGHEST_PROTOCOL)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            if fmt == 'zip':
+                writer.writerow(dataset.headers)
+            writer.writerows(dataset)
+    return number, path, len(dataset), widths
+
+
+def _export_shard(args):
+    return export_shard(*args)
+
+
+def parallel_export(output, fmt='csv', workers=None, ids=None, shards_per_worker=4, queryset=None):
+    # Возвращает (строк, секунд); output — путь к итоговому файлу
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат {fmt}')
+    workers = workers or settings.EXPORT_WORKERS or os.cpu_count() or 1
+    started = time.perf_counter()
+    headers = CarResource().get_export_headers()
+    query = queryset.query if queryset is not None else None
+    shards = make_shards(ids, workers * shards_per_worker, query)
+    tmpdir = tempfile.mkdtemp(prefix='export-')
+    try:
+        jobs = [(shard, fmt, tmpdir, query) for shard in shards]
+        if workers == 1:
+            parts = [_export_shard(job) for job in jobs]
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения родителя
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                parts = pool.map(_export_shard, jobs, chunksize=1)
+        parts.sort()
+        _merge(output, fmt, headers, parts)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return sum(part[2] for part in parts), time.perf_counter() - started
+
+
+def _merge(output, fmt, headers, parts):
+    tmp = f'{output}.tmp'
+    if fmt == 'csv':
+        with open(tmp, 'w', newline='', encoding='utf-8') as out:
+            csv.writer(out).writerow(headers)
+            for _, path, _, _ in parts:
+                with open(path, encoding='utf-8', newline='') as fh:
+                    shutil.copyfileobj(fh, out)
+    elif fmt == 'zip':
+        with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for number, path, rows, _ in parts:
+                if rows:
+                    archive.write(path, f'cars-{number:05d}.csv')
+    else:
+        # write_only: строки пишутся потоком, без хранения всей книги в памяти
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Объявления')
+        ws.freeze_panes = 'A2'
+        # Автоширина столбцов по максимумам, посчитанным в шардах
+        for column, widths in enumerate(zip(*(part[3] for part in parts)), 1):
+            ws.column_dimensions[get_column_letter(column)].width = max(widths) + 2
+        bold_font = Font(bold=True, size=12)
+        header_cells = []
+        for title in headers:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = bold_font
+            cell.alignment = Alignment(horizontal='center')
+            header_cells.append(cell)
+        ws.append(header_cells)
+        for _, path, _, _ in parts:
+            with open(path, 'rb') as fh:
+                for row in pickle.load(fh):
+                    ws.append(row)
+        wb.save(tmp)
+    os.replace(tmp, output)
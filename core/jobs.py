@@ -0,0 +1,109 @@
+import base64
+import pickle
+
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import cards, sellers
+from .conditional import bump_version
+from .models import Car, PendingViews
+from .tasks import enqueue, task
+
+
+# Фоновые задачи приложения (регистрируются через tasks.autodiscover)
+
+
+def dump_query(queryset):
+    # Запрос выборки для аргументов задачи: условия фильтров вместо списка id
+    return base64.b64encode(pickle.dumps(queryset.query)).decode()
+
+
+@task(priority=-10)
+def export_cars(path, fmt='xlsx', query=None):
+    # Параллельный экспорт во временный файл, затем в хранилище MEDIA; query — dump_query()
+    import tempfile
+    from django.core.files import File
+    from .exports import cars, parallel_export
+
+    queryset = cars(pickle.loads(base64.b64decode(query))) if query else None
+    with tempfile.NamedTemporaryFile(suffix=f'.{fmt}') as tmp:
+        parallel_export(tmp.name, fmt, queryset=queryset)
+        with open(tmp.name, 'rb') as fh:
+            default_storage.save(path, File(fh))
+
+
+@task
+def clean_old_cars(days=365):
+    # Прежняя очистка проданных: объявления не удаляются (пропали бы из истории продавца
+    # и статистики), а переносятся в архив, как archive_sold
+    from .archive import archive_sold
+
+    return archive_sold(days)
+
+
+@task(priority=-5)
+def archive_sold(days=None):
+    from .archive import archive_sold
+
+    return archive_sold(days)
+
+
+@task(priority=-5)
+def expire_uploads(hours=None):
+    from .uploads import expire
+
+    return expire(hours)
+
+
+@task(priority=-5)
+def mirror_photos():
+    from .mirror import collect_sources, mirror_pending
+
+    collect_sources()
+    while any(mirror_pending()):
+        pass
+
+
+def buffer_view(car_id):
+    # Просмотр на пути запроса: +1 в буфер, без сохранения Car и истории
+    if not PendingViews.objects.filter(car_id=car_id).update(count=F('count') + 1):
+        try:
+            with transaction.atomic():
+                PendingViews.objects.create(car_id=car_id, count=1)
+        except IntegrityError:
+            PendingViews.objects.filter(car_id=car_id).update(count=F('count') + 1)
+    enqueue(flush_views, dedup_key='flush_views', delay=settings.VIEWS_FLUSH_DELAY)
+
+
+@task(priority=5)
+def flush_visitors():
+    # Буфер PendingVisit → скетчи уникальных посетителей (ставится из visitors.record_view)
+    from .visitors import flush
+
+    return flush()
+
+
+@task(priority=5)
+def flush_views():
+    # Переносит накопленные просмотры в Car.views одним UPDATE на объявление
+    flushed = 0
+    for car_id, count in PendingViews.objects.values_list('car_id', 'count'):
+        with transaction.atomic():
+            # Забираем прочитанное число, а не всю строку: просмотры, пришедшие за время сброса,
+            # остаются в буфере. Условие count__gte не даёт второму сбросу забрать их дважды
+            taken = PendingViews.objects.filter(car_id=car_id, count__gte=count).update(
+                count=F('count') - count,
+            )
+            if not taken:
+                continue
+            PendingViews.objects.filter(car_id=car_id, count__lte=0).delete()
+            Car.objects.filter(pk=car_id).update(views=F('views') + count)
+            cards.add_views(car_id, count)
+            seller_id = Car.objects.filter(pk=car_id).values_list('user_id', flat=True).first()
+            sellers.apply_delta(seller_id, total_views=count)
+        flushed += count
+    if flushed:
+        bump_version('car')
+    return flushed
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from ... import archive, jobs
+from ...tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Переносит проданные объявления в архив (ArchivedCar) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Дней после продажи (по умолчанию ARCHIVE_SOLD_AFTER_DAYS)')
+        parser.add_argument('--batch', type=int, help='Объявлений в пачке (по умолчанию ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--queue', action='store_true', help='Поставить в очередь фоновых задач')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            enqueue(jobs.archive_sold, options['days'], dedup_key='archive_sold')
+            self.stdout.write(self.style.SUCCESS('Перенос в архив поставлен в очередь'))
+            return
+        moved = archive.archive_sold(options['days'], options['batch'])
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {moved}'))
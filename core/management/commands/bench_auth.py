@@ -0,0 +1,46 @@
+import base64
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from ...apikeys import create_key
+from ...models import User
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает запросы в секунду к API при Basic-авторизации и по ключу API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help='Запросов на каждую схему')
+        parser.add_argument('--path', default='/api/brands/')
+
+    def handle(self, *args, **options):
+        # Пользователь и ключ создаются во временной транзакции и откатываются; ограничитель частоты выключен
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], THROTTLE_ENABLED=False,
+        ):
+            user = User.objects.create_user('bench-auth', password='bench-auth-password')
+            _, token = create_key(user, 'bench', ['read'])
+            basic = base64.b64encode(b'bench-auth:bench-auth-password').decode()
+            schemes = {
+                'Basic': f'Basic {basic}',
+                'Token': f'Token {token}',
+            }
+            results = {}
+            for name, header in schemes.items():
+                results[name] = self.measure(options['path'], header, options['requests'])
+                self.stdout.write(f'{name}: {results[name]:.1f} запросов/с')
+            self.stdout.write(f'Ускорение: x{results["Token"] / results["Basic"]:.1f}')
+            transaction.set_rollback(True)
+
+    def measure(self, path, header, requests):
+        client = Client(HTTP_AUTHORIZATION=header)
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path}: HTTP {response.status_code}')
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        return requests / (time.perf_counter() - started)
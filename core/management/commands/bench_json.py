@@ -0,0 +1,53 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ...middleware import brotli, compress
+from ...models import CarCard
+from ...renderers import FastJSONRenderer
+from ...serializers import CarCardSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает кодирование страницы /api/cars/ (json и orjson) и размер ответа без сжатия, gzip и br'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='*', default=[10, 50, 100, 500], help='Объявлений на странице')
+        parser.add_argument('--repeat', type=int, default=50, help='Повторов кодирования')
+
+    def handle(self, *args, **options):
+        # Карточки не сохраняются в базу — замеряется только рендер и сжатие
+        now = timezone.now()
+        description = 'Один владелец, полная сервисная история, зимняя резина в комплекте. ' * 8
+        for size in options['sizes']:
+            cards = [
+                CarCard(car_id=i, brand_name='Toyota', model_name='Camry', user_id=1, user_name='seller',
+                        year=2015 + i % 10, mileage=10000 * i, price=Decimal('1250000.00') + i,
+                        previous_price=Decimal('1300000.00'), price_changed_at=now, description=description,
+                        main_image_url=f'https://example.com/cars/{i}.jpg', status='active', views=i, created_at=now)
+                for i in range(1, size + 1)
+            ]
+            data = {
+                'count': size, 'next': None, 'previous': None,
+                'results': CarCardSerializer(cards, many=True, context={'unique_viewers': {}}).data,
+            }
+            stdlib = self.measure(JSONRenderer(), data, options['repeat'])
+            fast = self.measure(FastJSONRenderer(), data, options['repeat'])
+            body = FastJSONRenderer().render(data)
+            sizes = [f'{len(body) / 1024:.1f} КБ']
+            for encoding in ('gzip', 'br') if brotli else ('gzip',):
+                started = time.perf_counter()
+                compressed = compress(body, encoding)
+                sizes.append(f'{encoding} {len(compressed) / 1024:.1f} КБ за {(time.perf_counter() - started) * 1000:.2f} мс')
+            self.stdout.write(
+                f'{size} объявлений: json {stdlib * 1000:.2f} мс, orjson {fast * 1000:.2f} мс '
+                f'(x{stdlib / fast:.1f}); ' + ', '.join(sizes)
+            )
+
+    def measure(self, renderer, data, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            renderer.render(data)
+        return (time.perf_counter() - started) / repeat
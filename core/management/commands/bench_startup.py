@@ -0,0 +1,79 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import get_commands
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Запуск воркера очереди без выполнения задач: настройка Django + загрузка модулей задач
+WORKER_BOOT = 'import django; django.setup(); from core import tasks; tasks.autodiscover()'
+FORBIDDEN = 'openpyxl,tablib,import_export.admin,import_export.formats.base_formats'
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время импорта при старте (python -X importtime): check, воркер и команды core'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Запусков на каждую цель (берётся медиана)')
+        parser.add_argument('--top', type=int, default=5, help='Самых тяжёлых модулей в отчёте')
+        parser.add_argument('--forbid', default=FORBIDDEN,
+                            help='Модули через запятую, которые не должны загружаться при старте')
+        parser.add_argument('--only', nargs='*', help='Только эти цели (check, worker, имена команд)')
+
+    def handle(self, *args, **options):
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        targets = {
+            'check': [manage, 'check'],
+            'worker': ['-c', WORKER_BOOT],
+        }
+        for name, app in sorted(get_commands().items()):
+            if app == 'core' and name != 'bench_startup':
+                targets[name] = [manage, name, '--help']
+        if options['only']:
+            targets = {name: argv for name, argv in targets.items() if name in options['only']}
+
+        forbidden = {module.strip() for module in options['forbid'].split(',') if module.strip()}
+        violations = []
+        for name, argv in targets.items():
+            runs = [self.run(argv) for _ in range(options['repeat'])]
+            wall = statistics.median(run[0] for run in runs)
+            modules = runs[-1][1]
+            imports = sum(self_us for self_us, _ in modules.values()) / 1000
+            loaded = sorted(forbidden & modules.keys())
+            self.stdout.write(
+                f'{name}: старт {wall * 1000:.0f} мс, импорт {imports:.0f} мс, модулей {len(modules)}'
+                + (self.style.ERROR(f', лишние: {", ".join(loaded)}') if loaded else '')
+            )
+            heaviest = sorted(runs[-1][2].items(), key=lambda item: item[1], reverse=True)[:options['top']]
+            for module, cumulative_us in heaviest:
+                self.stdout.write(f'    {cumulative_us / 1000:8.1f} мс  {module}')
+            if loaded:
+                violations.append(name)
+
+        if violations:
+            raise CommandError(f'При старте загружаются тяжёлые модули: {", ".join(violations)}')
+
+    def run(self, argv):
+        # Время запуска, {модуль: (собственное, суммарное время в мкс)}
+        # и суммарное время модулей верхнего уровня (импортированных не из других модулей)
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', *argv],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=os.environ.copy(),
+        )
+        wall = time.perf_counter() - started
+        if process.returncode:
+            raise CommandError(f'{" ".join(argv)}: {process.stderr.strip().splitlines()[-1:]}')
+        modules, top_level = {}, {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            modules[module.strip()] = (int(self_us), int(cumulative_us))
+            if not module[1:].startswith(' '):
+                top_level[module.strip()] = int(cumulative_us)
+        return wall, modules, top_level
@@ -0,0 +1,127 @@
+import asyncio
+import resource
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from ... import stream
+
+PATH = '/api/stream/cars/'
+
+
+class StreamClient:
+    # ASGI-клиент в памяти: держит соединение, пока не будет вызван disconnect()
+    received = 0
+
+    def __init__(self, number, slow, counter):
+        address = f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}'
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': PATH, 'raw_path': PATH.encode(), 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'accept', b'text/event-stream')],
+            'client': (address, 50000), 'server': ('testserver', 80),
+        }
+        self.slow = slow
+        self.counter = counter
+        self.requested = False
+        self.status = None
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message.get('body', b'').startswith(b'id: '):
+            if self.slow:
+                # Медленный клиент не читает поток — его очередь переполняется
+                await self.disconnected.wait()
+            self.received += 1
+            self.counter[0] += 1
+            self.counter[1] = time.perf_counter()
+
+    def disconnect(self):
+        self.disconnected.set()
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест потока новых объявлений: тысячи SSE-подписчиков через ASGI в одном процессе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--events', type=int, default=20)
+        parser.add_argument('--slow', type=int, default=0, help='Сколько подписчиков не читают поток')
+        parser.add_argument('--queue-size', type=int, help='Очередь подписчика (по умолчанию STREAM_QUEUE_SIZE)')
+        parser.add_argument('--timeout', type=float, default=120)
+
+    def handle(self, *args, **options):
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], SHED_ENABLED=False, STREAM_HEARTBEAT=3600,
+            STREAM_MAX_SUBSCRIBERS=options['subscribers'] + 1,
+            STREAM_QUEUE_SIZE=options['queue_size'] or settings.STREAM_QUEUE_SIZE,
+        ):
+            asyncio.run(self.run(options))
+
+    async def run(self, options):
+        total, slow = options['subscribers'], min(options['slow'], options['subscribers'])
+        fast = total - slow
+        deadline = time.perf_counter() + options['timeout']
+        counter = [0, 0.0]
+        memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        app = ASGIHandler()
+        clients = [StreamClient(number, number < slow, counter) for number in range(total)]
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(app(client.scope, client.receive, client.send)) for client in clients]
+        while len(stream.broadcaster.subscribers) < total:
+            if time.perf_counter() > deadline:
+                raise CommandError(f'Подключилось {len(stream.broadcaster.subscribers)} из {total}')
+            await asyncio.sleep(0.05)
+        connected = time.perf_counter() - started
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memory_before
+        self.stdout.write(
+            f'Подключено {total} подписчиков за {connected:.2f} с, память +{memory / 1024:.1f} МБ '
+            f'(~{memory / total:.1f} КБ на подписчика)'
+        )
+
+        # Синтетические события с id выше реальных — раздача без записи в базу
+        latencies = []
+        base_id = 10 ** 15
+        for number in range(options['events']):
+            payload = {'id': number, 'brand': 1, 'model': 1, 'price': '1000000.00', 'year': 2024}
+            event = stream.to_event((base_id + number, 1, 1, Decimal('1000000'), payload))
+            target = counter[0] + fast
+            sent = time.perf_counter()
+            stream.broadcaster.deliver([event])
+            while counter[0] < target:
+                if time.perf_counter() > deadline:
+                    raise CommandError(f'Событие {number}: доставлено {counter[0] - target + fast} из {fast}')
+                await asyncio.sleep(0)
+            latencies.append(counter[1] - sent)
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{options["events"]} событий x {fast} подписчиков: медиана доставки всем '
+            f'{statistics.median(latencies) * 1000:.1f} мс, p99 {p99 * 1000:.1f} мс, '
+            f'{fast * len(latencies) / sum(latencies):.0f} сообщений/с'
+        )
+        if slow:
+            dropped = total - len(stream.broadcaster.subscribers)
+            self.stdout.write(f'Медленных подписчиков отключено: {dropped} из {slow}')
+
+        for client in clients:
+            client.disconnect()
+        await asyncio.wait(tasks, timeout=max(deadline - time.perf_counter(), 1))
+        errors = [client.status for client in clients if client.status != 200]
+        if errors:
+            raise CommandError(f'Ответов не 200: {len(errors)}')
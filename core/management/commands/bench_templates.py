@@ -0,0 +1,61 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from ...cards import build_cards
+from ...models import Brand, Car, Model, User
+
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCMEM_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'bench-templates',
+}}
+
+
+class Command(BaseCommand):
+    help = 'Замеряет рендер каталога и карточки объявления без кэша фрагментов и с ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=30, help='Объявлений на странице каталога')
+        parser.add_argument('--repeat', type=int, default=200, help='Повторов рендера')
+
+    def handle(self, *args, **options):
+        # Объявления не сохраняются в базу — замеряется только шаблон
+        brand = Brand(pk=1, name='Toyota')
+        model = Model(pk=1, brand=brand, name='Camry')
+        user = User(pk=1, username='seller')
+        now = timezone.now()
+        description = 'Один владелец, полная сервисная история, зимняя резина в комплекте.\n' * 20
+        cars = [
+            Car(pk=i, brand=brand, model=model, user=user, year=2015 + i % 10, mileage=10000 * i,
+                price=Decimal('1250000.00') + i, description=description, status='active',
+                main_image_url=f'https://example.com/cars/{i}.jpg', updated_at=now)
+            for i in range(1, options['cars'] + 1)
+        ]
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        pages = {
+            'каталог': ('core/car_list.html', {'cars': build_cards(cars), 'is_paginated': False}),
+            'карточка': ('core/car_detail.html', {'car': cars[0], 'photos': [], 'main_image_mirror': None}),
+        }
+
+        for name, (template, context) in pages.items():
+            before = self.measure(DUMMY_CACHE, template, context, request, options['repeat'])
+            after = self.measure(LOCMEM_CACHE, template, context, request, options['repeat'])
+            self.stdout.write(
+                f'{name}: без кэша {before * 1000:.3f} мс, с кэшем {after * 1000:.3f} мс, '
+                f'ускорение x{before / after:.1f}'
+            )
+
+    def measure(self, caches, template, context, request, repeat):
+        with override_settings(CACHES=caches):
+            render_to_string(template, context, request)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                render_to_string(template, context, request)
+            return (time.perf_counter() - started) / repeat
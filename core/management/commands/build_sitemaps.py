@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ...sitemaps import build
+
+
+class Command(BaseCommand):
+    help = 'Генерирует sitemap (шарды по 50 000 URL) и RSS/Atom активных объявлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Перестроить все шарды')
+        parser.add_argument('--feed-limit', type=int, default=100, help='Объявлений в RSS/Atom')
+
+    def handle(self, *args, **options):
+        total, changed, removed = build(options['force'], options['feed_limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Шардов: {total}, перестроено: {changed}, удалено: {removed}'
+        ))
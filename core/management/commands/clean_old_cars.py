@@ -1,13 +1,18 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from ...models import Car
+from ...jobs import clean_old_cars
+from ...tasks import enqueue
 
 
 class Command(BaseCommand):
-    help = 'Удаляет объявления старше 1 года со статусом sold'
+    help = 'Переносит в архив проданные объявления без изменений больше года (см. archive_cars)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='store_true', help='Поставить в очередь фоновых задач')
 
     def handle(self, *args, **options):
-        old_date = timezone.now() - timedelta(days=365)
-        deleted = Car.objects.filter(status='sold', created_at__lt=old_date).delete()
-        self.stdout.write(self.style.SUCCESS(f'Удалено {deleted[0]} старых объявлений'))
+        if options['queue']:
+            enqueue(clean_old_cars, dedup_key='clean_old_cars')
+            self.stdout.write(self.style.SUCCESS('Очистка поставлена в очередь'))
+            return
+        moved = clean_old_cars()
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {moved}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from ...jobs import expire_uploads
+from ...tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки фото по частям и их временные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help='Без новых частей дольше (по умолчанию UPLOAD_EXPIRE_HOURS)')
+        parser.add_argument('--queue', action='store_true', help='Поставить в очередь фоновых задач')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            enqueue(expire_uploads, options['hours'], dedup_key='expire_uploads')
+            self.stdout.write(self.style.SUCCESS('Очистка поставлена в очередь'))
+            return
+        deleted = expire_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {deleted}'))
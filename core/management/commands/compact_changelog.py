@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from ...changefeed import compact
+from ...stream import prune
+
+
+class Command(BaseCommand):
+    help = ('Сжимает журнал изменений: оставляет последнюю запись по объекту, удаляет старые удаления '
+            'и старые события потока объявлений')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Сжимать записи старше N дней')
+        parser.add_argument('--tombstone-days', type=int, default=90, help='Хранить записи об удалении N дней')
+        parser.add_argument('--stream-days', type=int, default=7, help='Хранить события потока объявлений N дней')
+
+    def handle(self, *args, **options):
+        removed = compact(options['days'], options['tombstone_days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей журнала: {removed}'))
+        pruned = prune(options['stream_days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено событий потока: {pruned}'))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ...apikeys import create_key
+from ...models import ApiKey, User
+
+
+class Command(BaseCommand):
+    help = 'Создаёт ключ API для пользователя и выводит токен (показывается один раз)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--name', default='API')
+        parser.add_argument('--scope', action='append', dest='scopes',
+                            choices=[code for code, _ in ApiKey.SCOPE_CHOICES],
+                            help='Право ключа (можно несколько раз), по умолчанию read')
+        parser.add_argument('--days', type=int, help='Срок действия в днях')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'Пользователь {options["username"]} не найден')
+        expires_at = timezone.now() + timedelta(days=options['days']) if options['days'] else None
+        key, token = create_key(user, options['name'], options['scopes'] or ['read'], expires_at)
+        self.stdout.write(self.style.SUCCESS(f'Ключ {key.prefix} создан, права: {", ".join(key.scopes)}'))
+        self.stdout.write(token)
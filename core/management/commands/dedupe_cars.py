@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from ...dedupe import dedupe_catalog
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс дублей и помечает (или объединяет) почти одинаковые объявления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--merge', action='store_true',
+                            help='Объединять повторы объявлений одного продавца с более ранним')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только посчитать дубли, не меняя объявления')
+        parser.add_argument('--batch', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed, flagged, merged = dedupe_catalog(
+            merge=options['merge'], dry_run=options['dry_run'], batch_size=options['batch']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано: {indexed}, помечено дублей: {flagged}, объединено: {merged}'
+        ))
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Параллельный экспорт объявлений в CSV/XLSX/ZIP; --scale замеряет строки в секунду по числу процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', help='Файл результата')
+        parser.add_argument('--format', choices=('csv', 'xlsx', 'zip'), default='csv')
+        parser.add_argument('--workers', type=int, help='Процессов (по умолчанию EXPORT_WORKERS или число ядер)')
+        parser.add_argument('--status', help='Только объявления с этим статусом')
+        parser.add_argument('--scale', type=int, nargs='*',
+                            help='Замер для списка чисел процессов, например --scale 1 2 4 8')
+
+    def handle(self, *args, **options):
+        # openpyxl и import_export загружаются только при запуске экспорта
+        from ...exports import parallel_export
+        from ...models import Car
+
+        queryset = Car.objects.filter(status=options['status']) if options['status'] else None
+
+        if options['scale'] is not None:
+            baseline = None
+            for workers in options['scale'] or [1, 2, 4, os.cpu_count() or 1]:
+                with tempfile.NamedTemporaryFile(suffix=f'.{options["format"]}') as tmp:
+                    rows, seconds = parallel_export(tmp.name, options['format'], workers, queryset=queryset)
+                speed = rows / seconds if seconds else 0
+                baseline = baseline or speed
+                self.stdout.write(
+                    f'{workers} проц.: {rows} строк за {seconds:.2f} с, {speed:.0f} строк/с, '
+                    f'x{speed / baseline if baseline else 0:.1f}'
+                )
+            return
+
+        output = options['output'] or f'cars.{options["format"]}'
+        rows, seconds = parallel_export(output, options['format'], options['workers'], queryset=queryset)
+        self.stdout.write(self.style.SUCCESS(
+            f'{output}: {rows} строк за {seconds:.2f} с ({rows / seconds if seconds else 0:.0f} строк/с)'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from ...mirror import PhotoFetcher, collect_sources, mirror_pending
+
+
+class Command(BaseCommand):
+    help = 'Скачивает внешние фотографии объявлений в локальное хранилище'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help='URL за один проход')
+        parser.add_argument('--concurrency', type=int, help='Параллельных загрузок всего')
+        parser.add_argument('--per-host', type=int, help='Параллельных загрузок на один хост')
+        parser.add_argument('--retry-failed', action='store_true', help='Повторить неудачные загрузки')
+
+    def handle(self, *args, **options):
+        collect_sources()
+        fetcher = PhotoFetcher(concurrency=options['concurrency'], per_host=options['per_host'])
+        total_ok = total_failed = 0
+        while True:
+            ok, failed = mirror_pending(options['batch'], options['retry_failed'], fetcher)
+            if not ok and not failed:
+                break
+            total_ok += ok
+            total_failed += failed
+            self.stdout.write(f'Загружено {ok}, ошибок {failed}')
+        self.stdout.write(self.style.SUCCESS(f'Готово: загружено {total_ok}, ошибок {total_failed}'))
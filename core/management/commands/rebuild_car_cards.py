@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ...cards import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает карточки каталога (CarCard) из активных объявлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500)
+
+    def handle(self, *args, **options):
+        saved, removed = rebuild(options['batch'])
+        self.stdout.write(self.style.SUCCESS(f'Карточек сохранено: {saved}, удалено: {removed}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from ...sellers import reconcile
+from ...visitors import rebuild_sellers
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику продавцов по объявлениям и избранному'
+
+    def handle(self, *args, **options):
+        updated, reset = reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано продавцов: {updated}, обнулено: {reset}'))
+        # Уникальные посетители: объявления могли перейти к другому продавцу
+        sellers = rebuild_sellers()
+        self.stdout.write(self.style.SUCCESS(f'Пересобраны посетители продавцов: {sellers}'))
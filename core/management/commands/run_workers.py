@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ...tasks import run_workers
+
+
+class Command(BaseCommand):
+    help = 'Запускает процессы-воркеры фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.TASK_WORKER_PROCESSES,
+                            help='Количество процессов')
+        parser.add_argument('--poll', type=float, default=settings.TASK_POLL_INTERVAL,
+                            help='Пауза между опросами пустой очереди, сек')
+        parser.add_argument('--once', action='store_true', help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Воркеров: {options["processes"]}')
+        run_workers(options['processes'], options['poll'], options['once'])
@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import routers, throttling
+
+try:
+    import brotli
+except ImportError:
+    # Brotli не установлен — отдаём только gzip
+    brotli = None
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinMiddleware:
+    # Изменяющие запросы и клиенты, недавно писавшие в базу, читают с основной базы
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        with routers.replica_scope(pinned) as scope:
+            response = self.get_response(request)
+        if scope.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class LoadSheddingMiddleware:
+    # 503 + Retry-After, когда процесс уже обрабатывает предельное число запросов
+    # (предел падает при росте задержки базы, см. throttling.LoadShedder)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SHED_ENABLED or request.path.startswith(settings.SHED_EXEMPT_PATHS):
+            return self.get_response(request)
+        shedder = throttling.shedder
+        if not shedder.acquire():
+            throttling.count_rejection('shed')
+            return self.overloaded(request)
+        timer = QueryTimer()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                return self.get_response(request)
+        finally:
+            shedder.release(timer.elapsed, timer.queries)
+
+    def overloaded(self, request):
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'detail': 'Сервис перегружен, повторите запрос позже'}, status=503)
+        else:
+            response = HttpResponse('Сервис перегружен, повторите запрос позже', status=503)
+        response['Retry-After'] = str(settings.SHED_RETRY_AFTER)
+        return response
+
+
+class QueryTimer:
+    # execute_wrapper: суммарное время и число запросов к базе
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.queries += 1
+
+
+# Только JSON API: в нём нет CSRF-токена рядом с отражённым вводом. HTML и остальное сжимает
+# GZipMiddleware со случайной добавкой против BREACH — её нельзя кэшировать, как здесь
+COMPRESSIBLE_TYPES = ('application/json',)
+
+
+def choose_encoding(accept_encoding):
+    # br предпочтительнее gzip; кодировки с q=0 запрещены
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    for name in (('br', 'gzip') if brotli else ('gzip',)):
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    # Сжатие JSON (br/gzip по Accept-Encoding) от COMPRESSION_MIN_SIZE байт.
+    # Публичные ответы с ETag кэшируются уже сжатыми: повторный запрос той же версии не сжимается заново
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.endswith('+json'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE or response.status_code in (204, 206, 304):
+            return response
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        key = self.cache_key(request, response, content_type, encoding)
+        content = cache.get(key) if key else None
+        if content is None:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            if key:
+                cache.set(key, content, settings.COMPRESSION_CACHE_TIMEOUT)
+
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+        response.headers['Content-Encoding'] = encoding
+        # Тело отличается от несжатого — ETag становится слабым (как в GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def cache_key(self, request, response, content_type, encoding):
+        cache_control = response.get('Cache-Control', '')
+        if (request.method != 'GET' or response.status_code != 200 or not response.has_header('ETag')
+                or 'public' not in cache_control):
+            return None
+        raw = '|'.join((encoding, response['ETag'], request.get_full_path(), content_type))
+        return 'compressed:' + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
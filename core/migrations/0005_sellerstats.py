@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_changecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seller_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Продавец')),
+                ('active_count', models.PositiveIntegerField(default=0, verbose_name='Активных объявлений')),
+                ('moderation_count', models.PositiveIntegerField(default=0, verbose_name='На модерации')),
+                ('sold_count', models.PositiveIntegerField(default=0, verbose_name='Продано')),
+                ('total_views', models.PositiveBigIntegerField(default=0, verbose_name='Всего просмотров')),
+                ('favorites_received', models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Статистика продавца',
+                'verbose_name_plural': 'Статистика продавцов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='car_user_status_idx'),
+        ),
+    ]
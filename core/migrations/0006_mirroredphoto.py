@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_sellerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MirroredPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(max_length=255, unique=True, verbose_name='Исходный URL')),
+                ('sha256', models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256 содержимого')),
+                ('file', models.FileField(blank=True, upload_to='mirror/', verbose_name='Файл')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Тип содержимого')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер, байт')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает загрузки'), ('ok', 'Загружено'), ('failed', 'Ошибка загрузки')], db_index=True, default='pending', max_length=20, verbose_name='Статус')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Ошибка')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('fetched_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата загрузки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Зеркало фотографии',
+                'verbose_name_plural': 'Зеркала фотографий',
+            },
+        ),
+    ]
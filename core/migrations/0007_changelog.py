@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_mirroredphoto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('action', models.CharField(choices=[('+', 'Создано'), ('~', 'Изменено'), ('-', 'Удалено')], max_length=1, verbose_name='Действие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала изменений',
+                'verbose_name_plural': 'Журнал изменений',
+                'indexes': [models.Index(fields=['model', 'object_id', 'id'], name='changelog_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['created_at'], name='car_created_idx'),
+        ),
+    ]
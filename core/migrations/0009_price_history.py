@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_car_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена')),
+                ('changed_at', models.DateTimeField(verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение цены',
+                'verbose_name_plural': 'История цен',
+            },
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='previous_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Предыдущая цена'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='price_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата изменения цены'),
+        ),
+        migrations.AddField(
+            model_name='historicalcar',
+            name='previous_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Предыдущая цена'),
+        ),
+        migrations.AddField(
+            model_name='historicalcar',
+            name='price_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата изменения цены'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('previous_price__gt', models.F('price'))), fields=['status', '-price_changed_at'], name='car_price_drop_idx'),
+        ),
+        migrations.AddField(
+            model_name='pricechange',
+            name='car',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_changes', to='core.car', verbose_name='Объявление'),
+        ),
+        migrations.AddIndex(
+            model_name='pricechange',
+            index=models.Index(fields=['car', 'changed_at'], name='pricechange_car_idx'),
+        ),
+    ]
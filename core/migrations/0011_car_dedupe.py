@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True, verbose_name='Корзина')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.car', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+            },
+        ),
+        migrations.CreateModel(
+            name='CarSignature',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.car', verbose_name='Объявление')),
+                ('signature', models.BinaryField(verbose_name='MinHash-подпись')),
+                ('similarity', models.FloatField(blank=True, null=True, verbose_name='Сходство')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='core.car', verbose_name='Дубль объявления')),
+            ],
+            options={
+                'verbose_name': 'Подпись объявления',
+                'verbose_name_plural': 'Подписи объявлений',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_car_dedupe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('prefix', models.CharField(editable=False, max_length=16, unique=True, verbose_name='Префикс')),
+                ('key_hash', models.CharField(editable=False, max_length=64, verbose_name='Хэш ключа')),
+                ('scopes', models.JSONField(blank=True, default=list, verbose_name='Права')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Действует до')),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Отозван')),
+                ('last_used_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последнее использование')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_keys', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ключ API',
+                'verbose_name_plural': 'Ключи API',
+            },
+        ),
+    ]
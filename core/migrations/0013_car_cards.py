@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_api_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarCard',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='core.car', verbose_name='Объявление')),
+                ('brand_name', models.CharField(max_length=100, verbose_name='Марка')),
+                ('model_name', models.CharField(max_length=100, verbose_name='Модель')),
+                ('user_name', models.CharField(max_length=150, verbose_name='Продавец')),
+                ('year', models.PositiveIntegerField(verbose_name='Год выпуска')),
+                ('mileage', models.PositiveIntegerField(blank=True, null=True, verbose_name='Пробег, км')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена')),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Предыдущая цена')),
+                ('price_changed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения цены')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('excerpt', models.CharField(blank=True, max_length=400, verbose_name='Начало описания')),
+                ('main_image_url', models.URLField(blank=True, max_length=255, verbose_name='Основное фото (URL)')),
+                ('main_image_mirror_url', models.CharField(blank=True, max_length=255, verbose_name='Локальная копия фото')),
+                ('image', models.CharField(blank=True, max_length=255, verbose_name='Фото для карточки')),
+                ('status', models.CharField(default='active', max_length=20, verbose_name='Статус объявления')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Количество просмотров')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('brand', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.brand', verbose_name='Марка')),
+                ('model', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.model', verbose_name='Модель')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Продавец')),
+            ],
+            options={
+                'verbose_name': 'Карточка каталога',
+                'verbose_name_plural': 'Карточки каталога',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='carcard_created_idx'), models.Index(fields=['brand', 'model', '-created_at'], name='carcard_brand_idx'), models.Index(fields=['user', '-created_at'], name='carcard_user_idx'), models.Index(fields=['price'], name='carcard_price_idx'), models.Index(fields=['year'], name='carcard_year_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_car_cards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCar',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Год выпуска')),
+                ('mileage', models.PositiveIntegerField(blank=True, null=True, verbose_name='Пробег, км')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('main_image_url', models.URLField(blank=True, max_length=255, verbose_name='Основное фото (URL)')),
+                ('main_image', models.ImageField(blank=True, null=True, upload_to='cars/%Y/%m/%d/', verbose_name='Главное фото')),
+                ('status', models.CharField(choices=[('moderation', 'На модерации'), ('active', 'Активно'), ('sold', 'Продано')], max_length=20, verbose_name='Статус объявления')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Количество просмотров')),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Предыдущая цена')),
+                ('price_changed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения цены')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('archived_at', models.DateTimeField(verbose_name='Дата переноса в архив')),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.brand', verbose_name='Марка')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кем создано')),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.model', verbose_name='Модель')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_cars', to=settings.AUTH_USER_MODEL, verbose_name='Продавец')),
+            ],
+            options={
+                'verbose_name': 'Архивное объявление',
+                'verbose_name_plural': 'Архив объявлений',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCarPhoto',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_url', models.URLField(max_length=255, verbose_name='URL фотографии')),
+                ('is_main', models.BooleanField(default=False, verbose_name='Основное фото')),
+                ('created_at', models.DateTimeField(verbose_name='Дата загрузки')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='core.archivedcar', verbose_name='Автомобиль')),
+            ],
+            options={
+                'verbose_name': 'Фотография архивного объявления',
+                'verbose_name_plural': 'Фотографии архивных объявлений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedcar',
+            index=models.Index(fields=['user', '-created_at'], name='archivedcar_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcar',
+            index=models.Index(fields=['archived_at'], name='archivedcar_archived_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_car_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitorTotal',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='visitor_total', serialize=False, to='core.car', verbose_name='Объявление')),
+                ('registers', models.BinaryField(verbose_name='Регистры HyperLogLog')),
+                ('estimate', models.PositiveIntegerField(default=0, verbose_name='Уникальных посетителей')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Посетители объявления',
+                'verbose_name_plural': 'Посетители объявлений',
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('registers', models.BinaryField(verbose_name='Регистры HyperLogLog')),
+                ('car', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='visitor_sketches', to='core.car', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Посетители за день',
+                'verbose_name_plural': 'Посетители по дням',
+                'constraints': [models.UniqueConstraint(fields=('car', 'day'), name='visitorsketch_car_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 22:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_visitor_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена')),
+                ('payload', models.JSONField(verbose_name='Данные события')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата события')),
+                ('brand', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.brand', verbose_name='Марка')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.car', verbose_name='Объявление')),
+                ('model', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.model', verbose_name='Модель')),
+            ],
+            options={
+                'verbose_name': 'Событие потока объявлений',
+                'verbose_name_plural': 'События потока объявлений',
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-19 23:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_listing_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcarphoto',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='cars/%Y/%m/%d/', verbose_name='Файл фотографии'),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='cars/%Y/%m/%d/', verbose_name='Файл фотографии'),
+        ),
+        migrations.AlterField(
+            model_name='archivedcarphoto',
+            name='image_url',
+            field=models.URLField(blank=True, max_length=255, verbose_name='URL фотографии'),
+        ),
+        migrations.AlterField(
+            model_name='carphoto',
+            name='image_url',
+            field=models.URLField(blank=True, max_length=255, verbose_name='URL фотографии'),
+        ),
+        migrations.CreateModel(
+            name='PhotoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('main', 'Главное фото'), ('photo', 'Дополнительное фото')], max_length=10, verbose_name='Куда загружается')),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Размер, байт')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256 содержимого')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Получено, байт')),
+                ('status', models.CharField(choices=[('uploading', 'Загружается'), ('complete', 'Загружено'), ('failed', 'Ошибка')], default='uploading', max_length=10, verbose_name='Статус')),
+                ('file', models.CharField(blank=True, max_length=255, verbose_name='Файл в хранилище')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.car', verbose_name='Объявление')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Загрузка фото',
+                'verbose_name_plural': 'Загрузки фото',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-20 00:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_photo_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentlyViewed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('car_ids', models.BinaryField(verbose_name='Объявления')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Недавно просмотренные',
+                'verbose_name_plural': 'Недавно просмотренные',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-20 01:00
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+# Уже выданные токены ленты — это id записей: существующие записи получают seq = id
+def number_existing(apps, schema_editor):
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    ChangeLog.objects.update(seq=F('id'))
+    last = ChangeLog.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeCounter.objects.update_or_create(name='changelog_seq', defaults={'version': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_recently_viewed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Порядковый номер'),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 6.0.1 on 2026-10-20 02:00
+
+from django.core.files.storage import default_storage
+from django.db import migrations
+from django.utils.text import Truncator
+
+
+BATCH_SIZE = 500
+UPDATE_FIELDS = [
+    'brand', 'model', 'user', 'brand_name', 'model_name', 'user_name', 'year', 'mileage', 'price',
+    'previous_price', 'price_changed_at', 'description', 'excerpt', 'main_image_url',
+    'main_image_mirror_url', 'image', 'status', 'views', 'created_at', 'updated_at',
+]
+
+
+# 0013_car_cards создала пустую таблицу — без заполнения каталог пуст до rebuild_car_cards.
+# Те же поля, что у cards.build_cards, но на исторических моделях: миграция не зависит
+# от будущих полей Car и CarCard. Повторный запуск безопасен (upsert)
+def fill_cards(apps, schema_editor):
+    Car = apps.get_model('core', 'Car')
+    CarCard = apps.get_model('core', 'CarCard')
+    CarPhoto = apps.get_model('core', 'CarPhoto')
+    MirroredPhoto = apps.get_model('core', 'MirroredPhoto')
+    last_id = 0
+    while True:
+        cars = list(
+            Car.objects.filter(status='active', pk__gt=last_id)
+            .select_related('brand', 'model', 'user').order_by('pk')[:BATCH_SIZE]
+        )
+        if not cars:
+            break
+        last_id = cars[-1].pk
+        main_photos = {
+            car_id: (image_url, image)
+            for car_id, image_url, image in CarPhoto.objects.filter(car__in=cars, is_main=True)
+            .order_by('created_at').values_list('car_id', 'image_url', 'image')
+        }
+        urls = {car.main_image_url for car in cars} | {url for url, _ in main_photos.values()}
+        mirrors = {
+            source_url: default_storage.url(name)
+            for source_url, name in MirroredPhoto.objects.filter(
+                source_url__in=urls - {''}, status='ok',
+            ).values_list('source_url', 'file')
+        }
+        cards = []
+        for car in cars:
+            photo_url, photo_file = main_photos.get(car.pk, ('', ''))
+            if car.main_image:
+                image = default_storage.url(car.main_image.name)
+            elif car.main_image_url:
+                image = mirrors.get(car.main_image_url) or car.main_image_url
+            elif photo_file:
+                image = default_storage.url(photo_file)
+            else:
+                image = mirrors.get(photo_url) or photo_url
+            cards.append(CarCard(
+                car_id=car.pk,
+                brand_id=car.brand_id,
+                model_id=car.model_id,
+                user_id=car.user_id,
+                brand_name=car.brand.name,
+                model_name=car.model.name,
+                user_name=car.user.username,
+                year=car.year,
+                mileage=car.mileage,
+                price=car.price,
+                previous_price=car.previous_price,
+                price_changed_at=car.price_changed_at,
+                description=car.description,
+                excerpt=Truncator(car.description).words(30)[:400],
+                main_image_url=car.main_image_url,
+                main_image_mirror_url=mirrors.get(car.main_image_url, ''),
+                image=image[:255],
+                status=car.status,
+                views=car.views,
+                created_at=car.created_at,
+                updated_at=car.updated_at,
+            ))
+        CarCard.objects.bulk_create(
+            cards, update_conflicts=True, unique_fields=['car'], update_fields=UPDATE_FIELDS,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_changelog_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_cards, migrations.RunPython.noop),
+    ]
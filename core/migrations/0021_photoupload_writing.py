@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-20 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_backfill_car_cards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photoupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Загружается'), ('writing', 'Принимается часть'), ('complete', 'Загружено'), ('failed', 'Ошибка')], default='uploading', max_length=10, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 6.0.1 on 2026-10-20 04:00
+
+import math
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+REGISTERS = 1 << 10
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+# Посетители продавцов — объединение уже накопленных VisitorTotal. Формат регистров
+# (zlib, 1024 байта) и оценка повторяют core.visitors на момент этой миграции
+def estimate(registers):
+    zeros = registers.count(0)
+    if zeros == REGISTERS:
+        return 0
+    raw = ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -rank for rank in registers)
+    if raw <= 2.5 * REGISTERS and zeros:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def fill_seller_visitors(apps, schema_editor):
+    VisitorTotal = apps.get_model('core', 'VisitorTotal')
+    SellerVisitors = apps.get_model('core', 'SellerVisitors')
+    sellers = {}
+    for user_id, data in VisitorTotal.objects.values_list('car__user_id', 'registers').iterator():
+        registers = sellers.setdefault(user_id, bytearray(REGISTERS))
+        registers[:] = bytes(map(max, registers, zlib.decompress(bytes(data))))
+    SellerVisitors.objects.bulk_create([
+        SellerVisitors(user_id=user_id, registers=zlib.compress(bytes(registers)), estimate=estimate(registers))
+        for user_id, registers in sellers.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_photoupload_writing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerVisitors',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seller_visitors', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Продавец')),
+                ('registers', models.BinaryField(verbose_name='Регистры HyperLogLog')),
+                ('estimate', models.PositiveIntegerField(default=0, verbose_name='Уникальных посетителей')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Посетители продавца',
+                'verbose_name_plural': 'Посетители продавцов',
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingVisit',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField(verbose_name='День')),
+                ('visitor_hash', models.BigIntegerField(verbose_name='Хеш посетителя')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.car', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Несброшенный посетитель',
+                'verbose_name_plural': 'Несброшенные посетители',
+            },
+        ),
+        migrations.RunPython(fill_seller_visitors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-20 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_seller_visitors_pending_visit'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionRecentlyViewed',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='sessions.session', verbose_name='Сессия')),
+                ('car_ids', models.BinaryField(verbose_name='Объявления')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Недавно просмотренные сессии',
+                'verbose_name_plural': 'Недавно просмотренные сессий',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-20 06:00
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+# Уже отданные клиентам id событий (Last-Event-ID) — это id записей: существующие события
+# получают seq = id
+def number_existing(apps, schema_editor):
+    ListingEvent = apps.get_model('core', 'ListingEvent')
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    ListingEvent.objects.update(seq=F('id'))
+    last = ListingEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeCounter.objects.update_or_create(name='listing_seq', defaults={'version': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_session_recently_viewed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingevent',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Порядковый номер'),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
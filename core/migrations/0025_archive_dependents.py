@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-20 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_listingevent_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcar',
+            name='favorited_by',
+            field=models.JSONField(blank=True, default=list, verbose_name='В избранном у пользователей'),
+        ),
+        migrations.AddField(
+            model_name='archivedcar',
+            name='price_history',
+            field=models.JSONField(blank=True, default=list, verbose_name='История цен'),
+        ),
+        migrations.AddField(
+            model_name='archivedcar',
+            name='unique_viewers',
+            field=models.PositiveIntegerField(default=0, verbose_name='Уникальных посетителей'),
+        ),
+        migrations.AddField(
+            model_name='archivedcar',
+            name='visitor_registers',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='Регистры HyperLogLog'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['status', 'updated_at'], name='car_status_updated_idx'),
+        ),
+    ]
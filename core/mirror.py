@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import http.client
+import ipaddress
+import mimetypes
+import socket
+import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from .conditional import bump_version
+from .models import Car, CarPhoto, MirroredPhoto
+
+
+# Зеркалирование внешних фото: asyncio-загрузчик + хранилище по хэшу содержимого.
+# URL приходят от пользователей, поэтому загрузчик ходит только по http/https и только на
+# публичные адреса: имя хоста разрешается при соединении, и сокет открывается на уже проверенный
+# адрес — так же проверяется каждый редирект (подмена DNS между проверкой и запросом не помогает)
+
+SCHEMES = ('http', 'https')
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def check_url(url):
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in SCHEMES or not parts.hostname:
+        raise UnsafeURL(f'Разрешены только http и https: {url[:100]}')
+
+
+def is_public(address, allowed_networks=()):
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    ip = getattr(ip, 'ipv4_mapped', None) or ip
+    if any(ip in ipaddress.ip_network(network) for network in allowed_networks):
+        return True
+    return ip.is_global and not ip.is_multicast
+
+
+def connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None,
+                   allowed_networks=()):
+    # socket.create_connection, но только к публичным адресам; все адреса хоста проверяются заранее
+    host, port = address
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in infos:
+        if not is_public(sockaddr[0], allowed_networks):
+            raise UnsafeURL(f'Адрес {sockaddr[0]} ({host}) не публичный')
+    error = None
+    for family, kind, proto, _, sockaddr in infos:
+        sock = socket.socket(family, kind, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            sock.close()
+            error = exc
+    raise error or OSError(f'Не удалось разрешить {host}')
+
+
+class PublicOnlyConnection:
+    def __init__(self, *args, allowed_networks=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = partial(connect_public, allowed_networks=allowed_networks)
+
+
+class PublicHTTPConnection(PublicOnlyConnection, http.client.HTTPConnection):
+    pass
+
+
+class PublicHTTPSConnection(PublicOnlyConnection, http.client.HTTPSConnection):
+    pass
+
+
+class PublicHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, allowed_networks=()):
+        super().__init__()
+        self.allowed_networks = allowed_networks
+
+    def http_open(self, req):
+        return self.do_open(PublicHTTPConnection, req, allowed_networks=self.allowed_networks)
+
+
+class PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, allowed_networks=()):
+        super().__init__()
+        self.allowed_networks = allowed_networks
+
+    def https_open(self, req):
+        return self.do_open(
+            PublicHTTPSConnection, req, context=self._context, allowed_networks=self.allowed_networks,
+        )
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    # Адрес цели проверит соединение, здесь — схема (urllib сам пошёл бы и на ftp://)
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def build_opener(allowed_networks=()):
+    # Без прокси из окружения и без file://, ftp://, data:
+    opener = urllib.request.OpenerDirector()
+    for handler in (
+        PublicHTTPHandler(allowed_networks), PublicHTTPSHandler(allowed_networks),
+        CheckedRedirectHandler(), urllib.request.HTTPDefaultErrorHandler(),
+        urllib.request.HTTPErrorProcessor(),
+    ):
+        opener.add_handler(handler)
+    return opener
+
+
+@dataclass
+class FetchResult:
+    url: str
+    data: bytes = b''
+    content_type: str = ''
+    error: str = ''
+
+
+class PhotoFetcher:
+    # Общий лимит параллельных загрузок и отдельный лимит на каждый хост
+
+    def __init__(self, concurrency=None, per_host=None, timeout=None, max_bytes=None, allowed_networks=None):
+        self.concurrency = concurrency or settings.PHOTO_MIRROR_CONCURRENCY
+        self.per_host = per_host or settings.PHOTO_MIRROR_PER_HOST
+        self.timeout = timeout or settings.PHOTO_MIRROR_TIMEOUT
+        self.max_bytes = max_bytes or settings.PHOTO_MIRROR_MAX_BYTES
+        if allowed_networks is None:
+            allowed_networks = settings.PHOTO_MIRROR_ALLOWED_NETWORKS
+        self.opener = build_opener(tuple(allowed_networks))
+
+    async def fetch_all(self, urls):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._hosts = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def fetch(self, url):
+        host = urlsplit(url).netloc.lower()
+        async with self._semaphore, self._hosts[host]:
+            try:
+                return await asyncio.to_thread(self._download, url)
+            except Exception as exc:
+                return FetchResult(url, error=f'{type(exc).__name__}: {exc}'[:255])
+
+    def _download(self, url):
+        check_url(url)
+        request = urllib.request.Request(url, headers={'User-Agent': 'CarHub photo mirror'})
+        with self.opener.open(request, timeout=self.timeout) as response:
+            content_type = response.headers.get_content_type()
+            if not content_type.startswith('image/'):
+                return FetchResult(url, error=f'Не изображение: {content_type}')
+            data = response.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            return FetchResult(url, error=f'Файл больше {self.max_bytes} байт')
+        return FetchResult(url, data=data, content_type=content_type)
+
+
+def storage_name(digest, content_type):
+    ext = mimetypes.guess_extension(content_type) or ''
+    return f'mirror/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def store(result):
+    # Одинаковые картинки с разных URL хранятся одним файлом
+    digest = hashlib.sha256(result.data).hexdigest()
+    name = storage_name(digest, result.content_type)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(result.data))
+    width, height = get_image_dimensions(ContentFile(result.data))
+    return {
+        'sha256': digest,
+        'file': name,
+        'content_type': result.content_type,
+        'size': len(result.data),
+        'width': width,
+        'height': height,
+    }
+
+
+def collect_sources():
+    # Новые URL из объявлений и доп. фото ставятся в очередь
+    urls = set(Car.objects.exclude(main_image_url='').values_list('main_image_url', flat=True))
+    urls.update(CarPhoto.objects.exclude(image_url='').values_list('image_url', flat=True))
+    MirroredPhoto.objects.bulk_create(
+        [MirroredPhoto(source_url=url) for url in urls],
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+def mirror_pending(limit=500, retry_failed=False, fetcher=None):
+    queue = Q(status='pending')
+    if retry_failed:
+        queue |= Q(status='failed', attempts__lt=settings.PHOTO_MIRROR_MAX_ATTEMPTS)
+    photos = list(MirroredPhoto.objects.filter(queue).order_by('attempts', 'id')[:limit])
+    if not photos:
+        return 0, 0
+
+    fetcher = fetcher or PhotoFetcher()
+    results = asyncio.run(fetcher.fetch_all([photo.source_url for photo in photos]))
+
+    ok = failed = 0
+    now = timezone.now()
+    for photo, result in zip(photos, results):
+        photo.attempts += 1
+        photo.fetched_at = now
+        if result.error:
+            photo.status, photo.error = 'failed', result.error
+            failed += 1
+        else:
+            for field, value in store(result).items():
+                setattr(photo, field, value)
+            photo.status, photo.error = 'ok', ''
+            ok += 1
+    MirroredPhoto.objects.bulk_update(photos, [
+        'sha256', 'file', 'content_type', 'size', 'width', 'height',
+        'status', 'error', 'attempts', 'fetched_at',
+    ])
+    # Страницы объявлений теперь ссылаются на локальные копии — сбрасываем их ETag
+    mirrored = [photo.source_url for photo in photos if photo.status == 'ok']
+    if mirrored:
+        from .cards import refresh
+        car_ids = set(Car.objects.filter(
+            Q(main_image_url__in=mirrored) | Q(photos__image_url__in=mirrored)
+        ).values_list('pk', flat=True))
+        Car.objects.filter(pk__in=car_ids).update(updated_at=now)
+        # Карточки каталога показывают локальные копии
+        refresh(car_ids)
+        bump_version('car')
+        bump_version('catalog')
+    return ok, failed
+
+
+def mirror_map(urls):
+    # {исходный URL: локальный URL} одним запросом
+    urls = {url for url in urls if url}
+    if not urls:
+        return {}
+    rows = MirroredPhoto.objects.filter(source_url__in=urls, status='ok').values_list('source_url', 'file')
+    return {source_url: default_storage.url(name) for source_url, name in rows}
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
@@ -148,6 +150,20 @@ class Car(models.Model):
         default=0,
         verbose_name=_('Количество просмотров')
     )
+    previous_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Предыдущая цена')
+    )
+    price_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Дата изменения цены')
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_('Дата создания')
@@ -169,11 +185,55 @@ class Car(models.Model):
         verbose_name = _('Объявление об автомобиле')
         verbose_name_plural = _('Объявления об автомобилях')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status', '-created_at'], name='car_user_status_idx'),
+            models.Index(fields=['created_at'], name='car_created_idx'),
+            # Выборка archive_sold: status='sold' AND updated_at < срока
+            models.Index(fields=['status', 'updated_at'], name='car_status_updated_idx'),
+            models.Index(
+                fields=['status', '-price_changed_at'],
+                name='car_price_drop_idx',
+                condition=models.Q(previous_price__gt=models.F('price')),
+            ),
+        ]
+
+    @property
+    def price_dropped(self):
+        return self.previous_price is not None and self.previous_price > self.price
 
     def __str__(self):
         return f'{self.model} ({self.year}) - {self.price} ₽'
 
 
+class PriceChange(models.Model):
+    # История цен (append-only): пишется только при реальном изменении Car.price
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='price_changes',
+        verbose_name=_('Объявление')
+    )
+    price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name=_('Цена')
+    )
+    changed_at = models.DateTimeField(
+        verbose_name=_('Дата изменения')
+    )
+
+    class Meta:
+        verbose_name = _('Изменение цены')
+        verbose_name_plural = _('История цен')
+        indexes = [
+            models.Index(fields=['car', 'changed_at'], name='pricechange_car_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.car_id}: {self.price} ₽ ({self.changed_at:%Y-%m-%d})'
+
+
 class CarPhoto(models.Model):
     # Фотографии автомобиля
     car = models.ForeignKey(
@@ -184,8 +244,15 @@ class CarPhoto(models.Model):
     )
     image_url = models.URLField(
         max_length=255,
+        blank=True,
         verbose_name=_('URL фотографии')
     )
+    image = models.ImageField(
+        upload_to='cars/%Y/%m/%d/',
+        blank=True,
+        null=True,
+        verbose_name=_('Файл фотографии')
+    )
     is_main = models.BooleanField(
         default=False,
         verbose_name=_('Основное фото')
@@ -268,5 +335,1016 @@ class ForumPost(models.Model):
         verbose_name_plural = _('Посты на форуме')
         ordering = ['-created_at']
 
+    # Как Car.__str__
+    def __str__(self):
+        return f'{self.model_name} ({self.year}) - {self.price} ₽' or f'Ответ от {self.user} ({self.created_at.date()})'
+
+
+class ChangeCounter(models.Model):
+    # Счётчики изменений таблиц (для ETag списков)
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name=_('Таблица')
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Версия')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Счётчик изменений')
+        verbose_name_plural = _('Счётчики изменений')
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class SellerStats(models.Model):
+    # Денормализованная статистика продавца (обновляется сигналами)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='seller_stats',
+        verbose_name=_('Продавец')
+    )
+    active_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Активных объявлений')
+    )
+    moderation_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('На модерации')
+    )
+    sold_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Продано')
+    )
+    total_views = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Всего просмотров')
+    )
+    favorites_received = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Добавлений в избранное')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Статистика продавца')
+        verbose_name_plural = _('Статистика продавцов')
+
+    def __str__(self):
+        return f'{self.user}: {self.active_count} активных, {self.sold_count} продано'
+
+
+class MirroredPhoto(models.Model):
+    # Локальная копия внешней фотографии (main_image_url / CarPhoto.image_url)
+    STATUS_CHOICES = (
+        ('pending', _('Ожидает загрузки')),
+        ('ok', _('Загружено')),
+        ('failed', _('Ошибка загрузки')),
+    )
+
+    source_url = models.URLField(
+        max_length=255,
+        unique=True,
+        verbose_name=_('Исходный URL')
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name=_('SHA-256 содержимого')
+    )
+    file = models.FileField(
+        upload_to='mirror/',
+        blank=True,
+        verbose_name=_('Файл')
+    )
+    content_type = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Тип содержимого')
+    )
+    size = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Размер, байт')
+    )
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Ширина')
+    )
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Высота')
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name=_('Статус')
+    )
+    error = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Ошибка')
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('Попыток')
+    )
+    fetched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Дата загрузки')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+
+    class Meta:
+        verbose_name = _('Зеркало фотографии')
+        verbose_name_plural = _('Зеркала фотографий')
+
+    def __str__(self):
+        return f'{self.source_url} ({self.status})'
+
+
+class ChangeLog(models.Model):
+    # Журнал изменений каталога для партнёров (append-only)
+    ACTION_CHOICES = (
+        ('+', _('Создано')),
+        ('~', _('Изменено')),
+        ('-', _('Удалено')),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(
+        max_length=20,
+        verbose_name=_('Тип объекта')
+    )
+    object_id = models.BigIntegerField(
+        verbose_name=_('ID объекта')
+    )
+    action = models.CharField(
+        max_length=1,
+        choices=ACTION_CHOICES,
+        verbose_name=_('Действие')
+    )
+    # Номер в порядке коммита (changefeed.assign_sequence) — по нему идёт курсор ленты
+    seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name=_('Порядковый номер')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_('Дата изменения')
+    )
+
+    class Meta:
+        verbose_name = _('Запись журнала изменений')
+        verbose_name_plural = _('Журнал изменений')
+        indexes = [
+            models.Index(fields=['model', 'object_id', 'id'], name='changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.model} #{self.object_id}'
+
+
+class Task(models.Model):
+    # Фоновая задача (очередь в базе, выполняется manage.py run_workers)
+    STATUS_CHOICES = (
+        ('queued', _('В очереди')),
+        ('running', _('Выполняется')),
+        ('done', _('Выполнена')),
+        ('failed', _('Ошибка')),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(
+        max_length=100,
+        verbose_name=_('Задача')
+    )
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_('Аргументы')
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_('Именованные аргументы')
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name=_('Приоритет')
+    )
+    dedup_key = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name=_('Ключ дедупликации')
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name=_('Статус')
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('Попыток')
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name=_('Максимум попыток')
+    )
+    run_at = models.DateTimeField(
+        verbose_name=_('Запуск не раньше')
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Воркер')
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Взята в работу')
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name=_('Последняя ошибка')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Дата завершения')
+    )
+
+    class Meta:
+        verbose_name = _('Фоновая задача')
+        verbose_name_plural = _('Фоновые задачи')
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='queued') & ~models.Q(dedup_key=''),
+                name='task_queued_dedup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class PendingViews(models.Model):
+    # Буфер просмотров: сбрасывается в Car.views фоновой задачей flush_views
+    car = models.OneToOneField(
+        Car,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Объявление')
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Просмотров')
+    )
+
+    class Meta:
+        verbose_name = _('Несброшенные просмотры')
+        verbose_name_plural = _('Несброшенные просмотры')
+
+    def __str__(self):
+        return f'{self.car_id}: +{self.count}'
+
+
+class CarSignature(models.Model):
+    # MinHash-подпись объявления для поиска дублей (core.dedupe)
+    car = models.OneToOneField(
+        Car,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name=_('Объявление')
+    )
+    signature = models.BinaryField(
+        verbose_name=_('MinHash-подпись')
+    )
+    duplicate_of = models.ForeignKey(
+        Car,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates',
+        verbose_name=_('Дубль объявления')
+    )
+    similarity = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_('Сходство')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Подпись объявления')
+        verbose_name_plural = _('Подписи объявлений')
+
+    def __str__(self):
+        return f'{self.car_id} → {self.duplicate_of_id}' if self.duplicate_of_id else str(self.car_id)
+
+
+class CarBand(models.Model):
+    # LSH-индекс: корзина полосы подписи; кандидаты в дубли — объявления с общей корзиной
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Объявление')
+    )
+    bucket = models.BigIntegerField(
+        db_index=True,
+        verbose_name=_('Корзина')
+    )
+
+    class Meta:
+        verbose_name = _('Корзина LSH')
+        verbose_name_plural = _('Корзины LSH')
+
+    def __str__(self):
+        return f'{self.car_id}: {self.bucket}'
+
+
+class ApiKey(models.Model):
+    # Ключ API партнёра: хранится только HMAC секрета, поиск — по уникальному префиксу
+    SCOPE_CHOICES = (
+        ('read', _('Чтение')),
+        ('write', _('Запись')),
+        ('feed', _('Лента изменений')),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_keys',
+        verbose_name=_('Пользователь')
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name=_('Название')
+    )
+    prefix = models.CharField(
+        max_length=16,
+        unique=True,
+        editable=False,
+        verbose_name=_('Префикс')
+    )
+    key_hash = models.CharField(
+        max_length=64,
+        editable=False,
+        verbose_name=_('Хэш ключа')
+    )
+    scopes = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_('Права')
+    )
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Действует до')
+    )
+    revoked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Отозван')
+    )
+    last_used_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Последнее использование')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+
+    class Meta:
+        verbose_name = _('Ключ API')
+        verbose_name_plural = _('Ключи API')
+
+    def __str__(self):
+        return f'{self.name} ({self.prefix})'
+
+
+class CarCard(models.Model):
+    # Read-модель каталога: карточка активного объявления со всеми полями списков,
+    # без JOIN. Поддерживается core.cards из сигналов, пересобирается rebuild_car_cards
+    car = models.OneToOneField(
+        Car,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name=_('Объявление')
+    )
+    brand = models.ForeignKey(
+        Brand,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Марка')
+    )
+    model = models.ForeignKey(
+        Model,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Модель')
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Продавец')
+    )
+    brand_name = models.CharField(
+        max_length=100,
+        verbose_name=_('Марка')
+    )
+    model_name = models.CharField(
+        max_length=100,
+        verbose_name=_('Модель')
+    )
+    user_name = models.CharField(
+        max_length=150,
+        verbose_name=_('Продавец')
+    )
+    year = models.PositiveIntegerField(
+        verbose_name=_('Год выпуска')
+    )
+    mileage = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Пробег, км')
+    )
+    price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name=_('Цена')
+    )
+    previous_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name=_('Предыдущая цена')
+    )
+    price_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Дата изменения цены')
+    )
+    description = models.TextField(
+        verbose_name=_('Описание')
+    )
+    excerpt = models.CharField(
+        max_length=400,
+        blank=True,
+        verbose_name=_('Начало описания')
+    )
+    main_image_url = models.URLField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Основное фото (URL)')
+    )
+    main_image_mirror_url = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Локальная копия фото')
+    )
+    image = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Фото для карточки')
+    )
+    status = models.CharField(
+        max_length=20,
+        default='active',
+        verbose_name=_('Статус объявления')
+    )
+    views = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Количество просмотров')
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('Дата создания')
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Карточка каталога')
+        verbose_name_plural = _('Карточки каталога')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='carcard_created_idx'),
+            models.Index(fields=['brand', 'model', '-created_at'], name='carcard_brand_idx'),
+            models.Index(fields=['user', '-created_at'], name='carcard_user_idx'),
+            models.Index(fields=['price'], name='carcard_price_idx'),
+            models.Index(fields=['year'], name='carcard_year_idx'),
+        ]
+
+    @property
+    def price_dropped(self):
+        return self.previous_price is not None and self.previous_price > self.price
+
+    # Как Car.__str__
+    def __str__(self):
+        return f'{self.model_name} ({self.year}) - {self.price} ₽'
+
+
+class ArchivedCar(models.Model):
+    # Архив проданных объявлений (холодное хранение): строки переносятся из Car
+    # задачей archive_sold, id совпадает с исходным объявлением
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_cars',
+        verbose_name=_('Продавец')
+    )
+    brand = models.ForeignKey(
+        Brand,
+        on_delete=models.PROTECT,
+        related_name='+',
+        verbose_name=_('Марка')
+    )
+    model = models.ForeignKey(
+        Model,
+        on_delete=models.PROTECT,
+        related_name='+',
+        verbose_name=_('Модель')
+    )
+    year = models.PositiveIntegerField(
+        verbose_name=_('Год выпуска')
+    )
+    mileage = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_('Пробег, км')
+    )
+    price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name=_('Цена')
+    )
+    description = models.TextField(
+        verbose_name=_('Описание')
+    )
+    main_image_url = models.URLField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Основное фото (URL)')
+    )
+    main_image = models.ImageField(
+        upload_to='cars/%Y/%m/%d/',
+        blank=True,
+        null=True,
+        verbose_name='Главное фото'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Car.STATUS_CHOICES,
+        verbose_name=_('Статус объявления')
+    )
+    views = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Количество просмотров')
+    )
+    previous_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name=_('Предыдущая цена')
+    )
+    price_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Дата изменения цены')
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('Дата создания')
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Дата обновления')
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name=_('Кем создано')
+    )
+    archived_at = models.DateTimeField(
+        verbose_name=_('Дата переноса в архив')
+    )
+    # Зависимые строки объявления, перенесённые вместе с ним (core.archive)
+    price_history = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_('История цен')
+    )
+    favorited_by = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_('В избранном у пользователей')
+    )
+    unique_viewers = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Уникальных посетителей')
+    )
+    visitor_registers = models.BinaryField(
+        blank=True,
+        default=b'',
+        verbose_name=_('Регистры HyperLogLog')
+    )
+
+    class Meta:
+        verbose_name = _('Архивное объявление')
+        verbose_name_plural = _('Архив объявлений')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archivedcar_user_idx'),
+            models.Index(fields=['archived_at'], name='archivedcar_archived_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} ({self.year}) - {self.price} ₽'
+
+
+class ArchivedCarPhoto(models.Model):
+    # Фотографии архивных объявлений
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID'
+    )
+    car = models.ForeignKey(
+        ArchivedCar,
+        on_delete=models.CASCADE,
+        related_name='photos',
+        verbose_name=_('Автомобиль')
+    )
+    image_url = models.URLField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('URL фотографии')
+    )
+    image = models.ImageField(
+        upload_to='cars/%Y/%m/%d/',
+        blank=True,
+        null=True,
+        verbose_name=_('Файл фотографии')
+    )
+    is_main = models.BooleanField(
+        default=False,
+        verbose_name=_('Основное фото')
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('Дата загрузки')
+    )
+
+    class Meta:
+        verbose_name = _('Фотография архивного объявления')
+        verbose_name_plural = _('Фотографии архивных объявлений')
+
+    def __str__(self):
+        return f'Фото для {self.car} ({self.created_at.date()})'
+
+
+class VisitorSketch(models.Model):
+    # HyperLogLog уникальных посетителей объявления за день (core.visitors)
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='visitor_sketches',
+        verbose_name=_('Объявление')
+    )
+    day = models.DateField(
+        verbose_name=_('День')
+    )
+    registers = models.BinaryField(
+        verbose_name=_('Регистры HyperLogLog')
+    )
+
+    class Meta:
+        verbose_name = _('Посетители за день')
+        verbose_name_plural = _('Посетители по дням')
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'day'], name='visitorsketch_car_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.car_id}: {self.day}'
+
+
+class VisitorTotal(models.Model):
+    # Уникальные посетители объявления за всё время: регистры и готовая оценка
+    car = models.OneToOneField(
+        Car,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='visitor_total',
+        verbose_name=_('Объявление')
+    )
+    registers = models.BinaryField(
+        verbose_name=_('Регистры HyperLogLog')
+    )
+    estimate = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Уникальных посетителей')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Посетители объявления')
+        verbose_name_plural = _('Посетители объявлений')
+
+    def __str__(self):
+        return f'{self.car_id}: {self.estimate}'
+
+
+class SellerVisitors(models.Model):
+    # Уникальные посетители всех объявлений продавца: объединение VisitorTotal,
+    # обновляется при сбросе буфера visitors.flush
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='seller_visitors',
+        verbose_name=_('Продавец')
+    )
+    registers = models.BinaryField(
+        verbose_name=_('Регистры HyperLogLog')
+    )
+    estimate = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Уникальных посетителей')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Посетители продавца')
+        verbose_name_plural = _('Посетители продавцов')
+
+    def __str__(self):
+        return f'{self.user_id}: {self.estimate}'
+
+
+class PendingVisit(models.Model):
+    # Буфер просмотров для HyperLogLog: сбрасывается в скетчи фоновой задачей flush_visitors
+    id = models.BigAutoField(primary_key=True)
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Объявление')
+    )
+    day = models.DateField(
+        verbose_name=_('День')
+    )
+    visitor_hash = models.BigIntegerField(
+        verbose_name=_('Хеш посетителя')
+    )
+
+    class Meta:
+        verbose_name = _('Несброшенный посетитель')
+        verbose_name_plural = _('Несброшенные посетители')
+
+    def __str__(self):
+        return f'{self.car_id}: {self.day}'
+
+
+class ListingEvent(models.Model):
+    # Объявление стало активным — событие потока /api/stream/cars/ (core.stream)
+    id = models.BigAutoField(primary_key=True)
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Объявление')
+    )
+    brand = models.ForeignKey(
+        Brand,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Марка')
+    )
+    model = models.ForeignKey(
+        Model,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Модель')
+    )
+    price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name=_('Цена')
+    )
+    payload = models.JSONField(
+        verbose_name=_('Данные события')
+    )
+    # Номер в порядке коммита (changefeed.assign_sequence) — по нему идут опрос и Last-Event-ID
+    seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name=_('Порядковый номер')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_('Дата события')
+    )
+
+    class Meta:
+        verbose_name = _('Событие потока объявлений')
+        verbose_name_plural = _('События потока объявлений')
+
+    def __str__(self):
+        return f'#{self.id}: {self.car_id}'
+
+
+class PhotoUpload(models.Model):
+    # Загрузка фото по частям (core.uploads); id — токен для докачки
+    TARGET_CHOICES = (
+        ('main', _('Главное фото')),
+        ('photo', _('Дополнительное фото')),
+    )
+    STATUS_CHOICES = (
+        ('uploading', _('Загружается')),
+        ('writing', _('Принимается часть')),
+        ('complete', _('Загружено')),
+        ('failed', _('Ошибка')),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Пользователь')
+    )
+    car = models.ForeignKey(
+        Car,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Объявление')
+    )
+    target = models.CharField(
+        max_length=10,
+        choices=TARGET_CHOICES,
+        verbose_name=_('Куда загружается')
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name=_('Имя файла')
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name=_('Размер, байт')
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        verbose_name=_('SHA-256 содержимого')
+    )
+    offset = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Получено, байт')
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='uploading',
+        verbose_name=_('Статус')
+    )
+    file = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Файл в хранилище')
+    )
+    error = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('Ошибка')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Дата создания')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Загрузка фото')
+        verbose_name_plural = _('Загрузки фото')
+
+    def __str__(self):
+        return f'{self.filename}: {self.offset}/{self.size}'
+
+
+class RecentlyViewed(models.Model):
+    # Недавно просмотренные объявления пользователя (core.recent): id подряд по 8 байт, свежие первыми
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Пользователь')
+    )
+    car_ids = models.BinaryField(
+        verbose_name=_('Объявления')
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Недавно просмотренные')
+        verbose_name_plural = _('Недавно просмотренные')
+
+    def __str__(self):
+        return f'{self.user_id}: {len(self.car_ids) // 8}'
+
+
+class SessionRecentlyViewed(models.Model):
+    # То же для анонимной сессии; удаляется вместе с сессией (clearsessions, выход)
+    session = models.OneToOneField(
+        'sessions.Session',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Сессия')
+    )
+    car_ids = models.BinaryField(
+        verbose_name=_('Объявления')
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Недавно просмотренные сессии')
+        verbose_name_plural = _('Недавно просмотренные сессий')
+
     def __str__(self):
-        return self.title or f'Ответ от {self.user} ({self.created_at.date()})'
+        return f'{self.session_id}: {len(self.car_ids) // 8}'
@@ -0,0 +1,23 @@
+from django.utils import timezone
+
+from .models import Car, PriceChange
+
+
+# История цен и «последнее изменение цены» на объявлении
+
+
+def track_car(car):
+    car._loaded_price = car.__dict__.get('price')
+
+
+def car_saved(car, created):
+    loaded = car._loaded_price
+    car._loaded_price = car.price
+    if car.price is None or (not created and (loaded is None or loaded == car.price)):
+        return
+    now = timezone.now()
+    PriceChange.objects.create(car=car, price=car.price, changed_at=now)
+    if created:
+        return
+    car.previous_price, car.price_changed_at = loaded, now
+    Car.objects.filter(pk=car.pk).update(previous_price=loaded, price_changed_at=now)
@@ -0,0 +1,96 @@
+from array import array
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import CarCard, RecentlyViewed, SessionRecentlyViewed
+
+
+# Недавно просмотренные объявления: кольцевой буфер deque(maxlen=RECENTLY_VIEWED_SIZE)
+# на пользователя (RecentlyViewed) или сессию (SessionRecentlyViewed). В строке — упакованный
+# массив id (8 байт на id, свежие первыми); просмотр — чтение строки под блокировкой и одна
+# запись, Car не трогается, параллельные просмотры не теряют друг друга. Таблицы общие для всех
+# процессов и читаются только с основной базы (routers.PRIMARY_ONLY), поэтому запись не ставит
+# клиенту cookie закрепления. Просмотр сессию не создаёт: у анонимного посетителя без сессии
+# (первый заход, поисковый робот) история не ведётся.
+
+
+def pack(ids):
+    return array('Q', ids).tobytes()
+
+
+def unpack(data):
+    ids = array('Q')
+    ids.frombytes(bytes(data))
+    return ids.tolist()
+
+
+def owner_key(request):
+    # 'u:<id>' или 's:<ключ уже существующей сессии>'
+    if request.user.is_authenticated:
+        return f'u:{request.user.pk}'
+    session = getattr(request, 'session', None)
+    session_key = session.session_key if session is not None else None
+    return f's:{session_key}' if session_key else None
+
+
+def storage(owner):
+    # Модель и фильтр строки владельца
+    kind, key = owner.split(':', 1)
+    if kind == 'u':
+        return RecentlyViewed, {'user_id': int(key)}
+    return SessionRecentlyViewed, {'session_id': key}
+
+
+def load(owner):
+    model, lookup = storage(owner)
+    data = model.objects.filter(**lookup).values_list('car_ids', flat=True).first()
+    return unpack(data) if data else []
+
+
+def push(ids, car_id):
+    # Повторный просмотр поднимает объявление наверх; самое старое вытесняется.
+    # Не больше RECENTLY_VIEWED_SIZE сравнений — O(1) относительно числа объявлений
+    ring = deque(ids, maxlen=settings.RECENTLY_VIEWED_SIZE)
+    try:
+        ring.remove(car_id)
+    except ValueError:
+        pass
+    ring.appendleft(car_id)
+    return list(ring)
+
+
+def record(request, car_id):
+    owner = owner_key(request)
+    if owner is None:
+        return
+    model, lookup = storage(owner)
+    try:
+        with transaction.atomic():
+            rows = model.objects.select_for_update().filter(**lookup)
+            data = rows.values_list('car_ids', flat=True).first()
+            if data is None:
+                # Первый просмотр: пустая строка, затем как обычно под блокировкой
+                model.objects.bulk_create(
+                    [model(car_ids=b'', updated_at=timezone.now(), **lookup)], ignore_conflicts=True,
+                )
+                data = rows.values_list('car_ids', flat=True).first() or b''
+            ids = unpack(data)
+            if ids[:1] != [car_id]:
+                rows.update(car_ids=pack(push(ids, car_id)), updated_at=timezone.now())
+    except IntegrityError:
+        # Пользователь удалён или сессия истекла между запросом и записью
+        pass
+
+
+def cards(request):
+    # Карточки каталога в порядке просмотра одним запросом; карточки есть только
+    # у активных объявлений, поэтому проданные и удалённые пропадают сами
+    owner = owner_key(request)
+    ids = load(owner) if owner else []
+    if not ids:
+        return []
+    found = CarCard.objects.in_bulk(ids)
+    return [found[car_id] for car_id in ids if car_id in found]
@@ -1,4 +1,5 @@
 from import_export import resources, fields
+from . import dedupe
 from .models import Car
 
 
@@ -19,6 +20,13 @@ class CarResource(resources.ModelResource):
         skip_unchanged = True
         report_skipped = False
 
+    # Новые строки проверяются на дубли: повтор объявления того же продавца не создаётся
+    def do_instance_save(self, instance, is_create):
+        if not is_create:
+            return super().do_instance_save(instance, is_create)
+        car, _ = dedupe.add_car(instance)
+        instance.pk = car.pk
+
     # 1.фильтр  активных
     def get_export_queryset(self):
         return self.Meta.model.objects.filter(status='active')
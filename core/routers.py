@@ -0,0 +1,81 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+
+# Чтение с реплик, запись на основную базу. Реплики читаются только внутри replica_scope()
+# (запрос — ReplicaPinMiddleware, фоновая задача — tasks.execute); вне его — команды, shell,
+# миграции — всё идёт в default. После записи область (и клиент на REPLICA_PIN_SECONDS)
+# читает с основной базы; с выходом из области закрепление снимается.
+
+# Служебные записи запроса не закрепляют клиента; сессии и недавно просмотренные (core.recent)
+# и читаются только с основной базы (иначе только что вошедший пользователь не найдёт свою
+# сессию на отстающей реплике)
+PRIMARY_ONLY = {'sessions.session', 'core.recentlyviewed', 'core.sessionrecentlyviewed'}
+
+_scope = ContextVar('replica_scope', default=None)
+_health = {}
+
+
+class ReplicaScope:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def replica_scope(pinned=False):
+    scope = ReplicaScope(pinned)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def is_healthy(alias):
+    # Результат проверки кэшируется на REPLICA_HEALTH_CHECK_INTERVAL секунд
+    checked_at, healthy = _health.get(alias, (0, True))
+    now = time.monotonic()
+    if now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        healthy = True
+    except DatabaseError:
+        connections[alias].close()
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if (
+            scope is None or scope.pinned or model._meta.label_lower in PRIMARY_ONLY
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and model._meta.label_lower not in PRIMARY_ONLY:
+            scope.pinned = scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,125 @@
+from django.db.models import DEFERRED, Count, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ArchivedCar, Car, Favorite, SellerStats
+
+
+# Статистика продавцов: атомарные инкременты вместо COUNT по объявлениям
+
+STATUS_FIELDS = {
+    'active': 'active_count',
+    'moderation': 'moderation_count',
+    'sold': 'sold_count',
+}
+COUNTER_FIELDS = ('active_count', 'moderation_count', 'sold_count', 'total_views', 'favorites_received')
+TRACKED_FIELDS = ('user_id', 'status', 'views')
+
+
+def apply_delta(user_id, **deltas):
+    # UPDATE ... SET field = field + delta; строка создаётся при первом изменении
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if user_id is None or not deltas:
+        return
+    values = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    values['updated_at'] = timezone.now()
+    if not SellerStats.objects.filter(user_id=user_id).update(**values):
+        SellerStats.objects.get_or_create(user_id=user_id)
+        SellerStats.objects.filter(user_id=user_id).update(**values)
+
+
+def status_delta(status, sign):
+    field = STATUS_FIELDS.get(status)
+    return {field: sign} if field else {}
+
+
+def track_car(car):
+    # Запоминаем загруженные значения, чтобы в post_save посчитать разницу;
+    # поля, не загруженные через only()/defer(), — DEFERRED (неизвестны)
+    car._stats_user_id, car._stats_status, car._stats_views = (
+        car.__dict__.get(field, DEFERRED) for field in TRACKED_FIELDS
+    )
+
+
+def car_saving(car):
+    # Объявление загружено без отслеживаемых полей: старые значения читаются из базы до сохранения
+    loaded = (car._stats_user_id, car._stats_status, car._stats_views)
+    if car.pk is None or DEFERRED not in loaded:
+        return
+    row = Car.objects.filter(pk=car.pk).values_list(*TRACKED_FIELDS).first()
+    if row is not None:
+        car._stats_user_id, car._stats_status, car._stats_views = (
+            value if old is DEFERRED else old for old, value in zip(loaded, row)
+        )
+
+
+def car_saved(car, created):
+    if created:
+        apply_delta(car.user_id, total_views=car.views, **status_delta(car.status, 1))
+    elif DEFERRED in (car._stats_user_id, car._stats_status, car._stats_views):
+        # Старые значения неизвестны (строки не было в базе) — разницу не считаем
+        pass
+    elif car._stats_user_id != car.user_id:
+        car_deleted(car, user_id=car._stats_user_id, status=car._stats_status, views=car._stats_views)
+        apply_delta(car.user_id, total_views=car.views, **status_delta(car.status, 1))
+    else:
+        deltas = {'total_views': car.views - (car._stats_views or 0)}
+        if car._stats_status != car.status:
+            deltas.update(status_delta(car._stats_status, -1))
+            for field, delta in status_delta(car.status, 1).items():
+                deltas[field] = deltas.get(field, 0) + delta
+        apply_delta(car.user_id, **deltas)
+    track_car(car)
+
+
+def car_deleted(car, user_id=None, status=None, views=None):
+    user_id = car.user_id if user_id is None else user_id
+    status = car.status if status is None else status
+    views = car.views if views is None else views
+    apply_delta(user_id, total_views=-(views or 0), **status_delta(status, -1))
+
+
+def favorite_changed(favorite, sign):
+    seller_id = Car.objects.filter(pk=favorite.car_id).values_list('user_id', flat=True).first()
+    apply_delta(seller_id, favorites_received=sign)
+
+
+def reconcile():
+    # Пересчёт всех счётчиков по таблицам Car, ArchivedCar и Favorite
+    stats = {}
+    for table in (Car, ArchivedCar):
+        rows = table.objects.values('user_id').annotate(
+            active_count=Count('id', filter=Q(status='active')),
+            moderation_count=Count('id', filter=Q(status='moderation')),
+            sold_count=Count('id', filter=Q(status='sold')),
+            total_views=Sum('views'),
+        )
+        for row in rows:
+            totals = stats.setdefault(row.pop('user_id'), {})
+            for field, value in row.items():
+                totals[field] = totals.get(field, 0) + (value or 0)
+    favorites = Favorite.objects.values('car__user_id').annotate(total=Count('id'))
+    for row in favorites:
+        stats.setdefault(row['car__user_id'], {})['favorites_received'] = row['total']
+    # Избранное архивных объявлений перенесено в ArchivedCar.favorited_by
+    for user_id, favorited_by in ArchivedCar.objects.exclude(favorited_by=[]).values_list('user_id', 'favorited_by'):
+        totals = stats.setdefault(user_id, {})
+        totals['favorites_received'] = totals.get('favorites_received', 0) + len(favorited_by)
+
+    now = timezone.now()
+    objs = [
+        SellerStats(user_id=user_id, updated_at=now, **{
+            field: values.get(field) or 0 for field in COUNTER_FIELDS
+        })
+        for user_id, values in stats.items()
+    ]
+    SellerStats.objects.bulk_create(
+        objs, batch_size=500, update_conflicts=True,
+        unique_fields=['user'], update_fields=[*COUNTER_FIELDS, 'updated_at'],
+    )
+    stale = SellerStats.objects.filter(
+        ~Exists(Car.objects.filter(user_id=OuterRef('user_id'))),
+        ~Exists(ArchivedCar.objects.filter(user_id=OuterRef('user_id'))),
+    )
+    reset = stale.update(updated_at=now, **{field: 0 for field in COUNTER_FIELDS})
+    return len(objs), reset
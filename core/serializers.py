@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Car, Brand, Model
+from . import dedupe, visitors
+from .mirror import mirror_map
+from .models import Car, CarCard, CarPhoto, Brand, Model, PhotoUpload, SellerStats
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -14,10 +18,18 @@ class BrandSerializer(serializers.ModelSerializer):
         return value
 
 
+class CarModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Model
+        fields = ['id', 'brand', 'name', 'created_at']
+
+
 class CarSerializer(serializers.ModelSerializer):
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     model_name = serializers.CharField(source='model.name', read_only=True)
     user_name = serializers.CharField(source='user.username', read_only=True)
+    main_image_mirror_url = serializers.SerializerMethodField()
+    unique_viewers = serializers.SerializerMethodField()
 
     brand = serializers.PrimaryKeyRelatedField(
         queryset=Brand.objects.all(),
@@ -34,10 +46,27 @@ class CarSerializer(serializers.ModelSerializer):
         model = Car
         fields = [
             'id', 'brand', 'brand_name', 'model', 'model_name',
-            'year', 'mileage', 'price', 'description', 'main_image_url',
-            'status', 'views', 'user', 'user_name', 'created_at'
+            'year', 'mileage', 'price', 'description', 'main_image_url', 'main_image_mirror_url',
+            'status', 'views', 'unique_viewers', 'user', 'user_name', 'created_at',
+            'previous_price', 'price_changed_at'
         ]
-        read_only_fields = ['views', 'created_at', 'user', 'user_name']
+        read_only_fields = ['views', 'created_at', 'user', 'user_name', 'previous_price', 'price_changed_at']
+
+    # Локальная копия main_image_url (карта передаётся из CarViewSet для всей страницы)
+    def get_main_image_mirror_url(self, obj):
+        mirrors = self.context.get('mirrors')
+        if mirrors is None:
+            mirrors = mirror_map([obj.main_image_url])
+        url = mirrors.get(obj.main_image_url)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+    # Оценка HyperLogLog за всё время (карта передаётся из CarViewSet для всей страницы)
+    def get_unique_viewers(self, obj):
+        estimates = self.context.get('unique_viewers')
+        if estimates is not None:
+            return estimates.get(obj.pk, 0)
+        return visitors.car_estimate(obj)
 
     def validate_price(self, value):
         if value < 0:
@@ -61,6 +90,117 @@ class CarSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"model": "Модель не принадлежит выбранной марке"})
         return data
 
+    # Повтор своего объявления объединяется с ним, похожее на чужое уходит на модерацию
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        car, self.duplicate = dedupe.add_car(Car(**validated_data))
+        return car
+
+
+# Фото объявления: загруженный файл или внешний URL (локальная копия — из карты mirrors)
+class CarPhotoSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CarPhoto
+        fields = ['id', 'url', 'image_url', 'is_main', 'created_at']
+
+    def get_url(self, obj):
+        if obj.image:
+            url = obj.image.url
+        else:
+            mirrors = self.context.get('mirrors')
+            if mirrors is None:
+                mirrors = mirror_map([obj.image_url])
+            url = mirrors.get(obj.image_url) or obj.image_url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+
+# Объявление с фото: retrieve и batch (фото — через prefetch_related('photos'))
+class CarDetailSerializer(CarSerializer):
+    photos = CarPhotoSerializer(many=True, read_only=True)
+
+    class Meta(CarSerializer.Meta):
+        fields = CarSerializer.Meta.fields + ['main_image', 'photos']
+        read_only_fields = CarSerializer.Meta.read_only_fields + ['main_image']
+
+
+# Списки объявлений из карточек каталога — те же поля, что у CarSerializer, без JOIN
+class CarCardSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='car_id', read_only=True)
+    user = serializers.IntegerField(source='user_id', read_only=True)
+    main_image_mirror_url = serializers.SerializerMethodField()
+    unique_viewers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CarCard
+        fields = [
+            'id', 'brand_name', 'model_name',
+            'year', 'mileage', 'price', 'description', 'main_image_url', 'main_image_mirror_url',
+            'status', 'views', 'unique_viewers', 'user', 'user_name', 'created_at',
+            'previous_price', 'price_changed_at'
+        ]
+        read_only_fields = fields
+
+    def get_main_image_mirror_url(self, obj):
+        url = obj.main_image_mirror_url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+    def get_unique_viewers(self, obj):
+        estimates = self.context.get('unique_viewers')
+        if estimates is None:
+            estimates = visitors.estimates([obj.car_id])
+        return estimates.get(obj.car_id, 0)
+
+
+class SellerSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='user_id', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    unique_viewers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SellerStats
+        fields = [
+            'id', 'username', 'active_count', 'moderation_count', 'sold_count',
+            'total_views', 'unique_viewers', 'favorites_received', 'updated_at'
+        ]
+
+    def get_unique_viewers(self, obj):
+        return visitors.seller_estimate(obj.user_id)
+
+
+# История продавца: строки archive.seller_history (Car и ArchivedCar)
+class SellerCarSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    brand_name = serializers.CharField(source='brand__name')
+    model_name = serializers.CharField(source='model__name')
+    year = serializers.IntegerField()
+    mileage = serializers.IntegerField(allow_null=True)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    status = serializers.CharField()
+    views = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    archived = serializers.BooleanField()
+
+
+# Загрузка фото по частям (core.uploads); проверки — в uploads.start
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    car = serializers.PrimaryKeyRelatedField(queryset=Car.objects.all())
+    chunk_size = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PhotoUpload
+        fields = [
+            'id', 'car', 'target', 'filename', 'size', 'sha256', 'offset', 'status', 'error', 'chunk_size',
+            'url', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['offset', 'status', 'error', 'created_at', 'updated_at']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_MAX_CHUNK_SIZE
+
+    def get_url(self, obj):
+        return default_storage.url(obj.file) if obj.file else None
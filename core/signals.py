@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import apikeys, cards, changefeed, dedupe, jobs, prices, sellers, stream, tasks
+from .conditional import bump_version
+from .models import ApiKey, Brand, Car, CarPhoto, Favorite, MirroredPhoto, Model, User
+
+
+# Версии таблиц для ETag: любое изменение сбрасывает кэш клиентов
+@receiver([post_save, post_delete], sender=Car)
+def car_changed(sender, update_fields=None, **kwargs):
+    bump_version('car')
+    # Счётчик просмотров в HTML-каталоге не выводится
+    if update_fields is None or set(update_fields) != {'views'}:
+        bump_version('catalog')
+
+
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Model)
+def brand_changed(sender, **kwargs):
+    bump_version('brand')
+
+
+# Фото — часть объявления: обновляем updated_at, не трогая историю. update() сигналов Car
+# не шлёт, поэтому версии списков поднимаются здесь
+@receiver([post_save, post_delete], sender=CarPhoto)
+def car_photo_changed(sender, instance, **kwargs):
+    Car.objects.filter(pk=instance.car_id).update(updated_at=timezone.now())
+    cards.refresh([instance.car_id])
+    bump_version('car')
+    bump_version('catalog')
+
+
+# Статистика продавцов, история цен, индекс дублей и поток новых объявлений
+@receiver(post_init, sender=Car)
+def car_loaded(sender, instance, **kwargs):
+    sellers.track_car(instance)
+    prices.track_car(instance)
+    dedupe.track_car(instance)
+    stream.track_car(instance)
+
+
+@receiver(pre_save, sender=Car)
+def car_saving_stats(sender, instance, **kwargs):
+    sellers.car_saving(instance)
+
+
+@receiver(post_save, sender=Car)
+def car_saved_stats(sender, instance, created, **kwargs):
+    sellers.car_saved(instance, created)
+    prices.car_saved(instance, created)
+    dedupe.car_saved(instance, created)
+    stream.car_saved(instance, created)
+
+
+# Карточки каталога (CarCard); удалённые объявления убирает каскад
+@receiver(post_save, sender=Car)
+def car_saved_card(sender, instance, update_fields=None, **kwargs):
+    cards.car_saved(instance, update_fields)
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved_cards(sender, instance, created, **kwargs):
+    if not created:
+        cards.brand_changed(instance)
+
+
+@receiver(post_save, sender=Model)
+def model_saved_cards(sender, instance, created, **kwargs):
+    if not created:
+        cards.model_changed(instance)
+
+
+@receiver(post_delete, sender=Car)
+def car_deleted_stats(sender, instance, **kwargs):
+    sellers.car_deleted(instance)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        sellers.favorite_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    sellers.favorite_changed(instance, -1)
+
+
+# Лента изменений для партнёров (просмотры не пишутся — иначе журнал растёт на каждый просмотр)
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Model)
+def log_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'views'}:
+        return
+    changefeed.record(sender._meta.model_name, instance.pk, '+' if created else '~')
+
+
+@receiver(post_delete, sender=Car)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Model)
+def log_deleted(sender, instance, **kwargs):
+    changefeed.record(sender._meta.model_name, instance.pk, '-')
+
+
+# Новые внешние фото скачиваются фоновой задачей
+@receiver(post_save, sender=Car)
+def queue_car_photo_mirror(sender, instance, created, update_fields=None, **kwargs):
+    if instance.main_image_url and (update_fields is None or 'main_image_url' in update_fields):
+        if not MirroredPhoto.objects.filter(source_url=instance.main_image_url).exists():
+            transaction.on_commit(lambda: tasks.enqueue(jobs.mirror_photos, dedup_key='mirror_photos'))
+
+
+@receiver(post_save, sender=CarPhoto)
+def queue_photo_mirror(sender, instance, created, **kwargs):
+    if instance.image_url and not MirroredPhoto.objects.filter(source_url=instance.image_url).exists():
+        transaction.on_commit(lambda: tasks.enqueue(jobs.mirror_photos, dedup_key='mirror_photos'))
+
+
+# Кэш ключей API: изменения ключей и пользователей (блокировка, смена прав) сбрасывают его
+@receiver([post_save, post_delete], sender=ApiKey)
+def api_key_changed(sender, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_used_at'}:
+        apikeys.invalidate()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or set(update_fields) != {'last_login'}):
+        apikeys.invalidate()
+        # Имя продавца выводится в списках объявлений
+        cards.user_changed(instance)
+        bump_version('car')
+        bump_version('catalog')
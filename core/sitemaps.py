@@ -0,0 +1,140 @@
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max, Sum
+from django.urls import reverse
+from django.utils import feedgenerator
+
+from .models import Car
+
+
+# Sitemap и RSS/Atom каталога, заранее сгенерированные на диск.
+# Шард — фиксированный диапазон id, поэтому изменения одного объявления
+# перестраивают только его шард.
+
+SHARD_SIZE = 50000
+BATCH_SIZE = 2000
+MANIFEST = 'manifest.json'
+
+
+def shard_name(shard):
+    return f'sitemap-{shard}.xml'
+
+
+def absolute(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def fingerprints():
+    # Отпечаток шарда: количество, сумма id и последняя дата изменения — одним запросом
+    rows = (
+        Car.objects.filter(status='active').order_by()
+        .annotate(shard=F('id') / SHARD_SIZE).values('shard')
+        .annotate(count=Count('id'), ids=Sum('id'), lastmod=Max('updated_at'))
+    )
+    return {
+        str(row['shard']): [row['count'], row['ids'], row['lastmod'].isoformat()]
+        for row in rows
+    }
+
+
+def iter_shard(shard):
+    # Keyset-итерация без OFFSET и без загрузки всего queryset
+    last_id = shard * SHARD_SIZE - 1
+    upper = (shard + 1) * SHARD_SIZE
+    while True:
+        batch = list(
+            Car.objects.filter(status='active', id__gt=last_id, id__lt=upper)
+            .order_by('id').values_list('id', 'updated_at')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1][0]
+
+
+def write_atomic(path, write):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def write_shard(root, shard):
+    def write(fh):
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fh.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for car_id, updated_at in iter_shard(shard):
+            url = escape(absolute(reverse('core:car_detail', args=[car_id])))
+            fh.write(f'<url><loc>{url}</loc><lastmod>{updated_at.date().isoformat()}</lastmod></url>\n')
+        fh.write('</urlset>\n')
+    write_atomic(os.path.join(root, shard_name(int(shard))), write)
+
+
+def write_index(root, manifest):
+    def write(fh):
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fh.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for shard, (_, _, lastmod) in sorted(manifest.items(), key=lambda item: int(item[0])):
+            url = escape(absolute(reverse('core:sitemap_file', args=[shard_name(int(shard))])))
+            fh.write(f'<sitemap><loc>{url}</loc><lastmod>{lastmod}</lastmod></sitemap>\n')
+        fh.write('</sitemapindex>\n')
+    write_atomic(os.path.join(root, 'sitemap.xml'), write)
+
+
+def write_feeds(root, limit):
+    cars = (
+        Car.objects.filter(status='active').select_related('brand', 'model')
+        .order_by('-created_at')[:limit]
+    )
+    feeds = {
+        'feed.rss': feedgenerator.Rss201rev2Feed,
+        'feed.atom': feedgenerator.Atom1Feed,
+    }
+    for name, feed_class in feeds.items():
+        feed = feed_class(
+            title='CarHub — новые объявления',
+            link=absolute(reverse('core:car_list')),
+            description='Новые объявления о продаже автомобилей',
+            feed_url=absolute(reverse('core:sitemap_file', args=[name])),
+            language='ru',
+        )
+        for car in cars:
+            link = absolute(reverse('core:car_detail', args=[car.pk]))
+            feed.add_item(
+                title=f'{car.brand} {car.model} ({car.year}) — {int(car.price):,} ₽',
+                link=link,
+                unique_id=link,
+                description=car.description[:500],
+                pubdate=car.created_at,
+                updateddate=car.updated_at,
+            )
+        write_atomic(os.path.join(root, name), lambda fh: feed.write(fh, 'utf-8'))
+
+
+def build(force=False, feed_limit=100):
+    root = settings.SITEMAP_ROOT
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, MANIFEST)
+    old = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as fh:
+            old = json.load(fh)
+
+    current = fingerprints()
+    changed = [shard for shard, fingerprint in current.items() if old.get(shard) != fingerprint]
+    for shard in changed:
+        write_shard(root, int(shard))
+    removed = [shard for shard in old if shard not in current]
+    for shard in removed:
+        path = os.path.join(root, shard_name(int(shard)))
+        if os.path.exists(path):
+            os.remove(path)
+
+    if changed or removed or force or not old:
+        write_index(root, current)
+        write_feeds(root, feed_limit)
+    write_atomic(manifest_path, lambda fh: json.dump(current, fh))
+    return len(current), len(changed), len(removed)
@@ -0,0 +1,243 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .changefeed import assign_sequence
+from .models import ChangeCounter, ListingEvent
+from .renderers import dumps
+
+
+# Поток новых объявлений (SSE, /api/stream/cars/). Переход объявления в active пишется
+# в ListingEvent после коммита; в каждом процессе один таск опрашивает таблицу и раскладывает
+# события по очередям подписчиков. Курсор опроса и id событий — seq в порядке коммита
+# (changefeed.assign_sequence), а не id: вставка с меньшим id, закоммиченная позже, иначе
+# осталась бы позади курсора. Сохранение в том же процессе будит опрос сразу,
+# из других процессов событие приходит не позже чем через STREAM_POLL_INTERVAL.
+# Переполненная очередь (медленный клиент) закрывает поток — клиент переподключается
+# с Last-Event-ID и дочитывает пропущенное из базы.
+
+SEQUENCE = 'listing_seq'
+PRICE = serializers.DecimalField(max_digits=12, decimal_places=2)
+DATETIME = serializers.DateTimeField()
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    brand_id: int
+    model_id: int
+    price: Decimal
+    message: bytes
+
+
+@dataclass(frozen=True)
+class Filters:
+    brand: int = None
+    model: int = None
+    min_price: Decimal = None
+    max_price: Decimal = None
+
+    def matches(self, event):
+        return (
+            (self.brand is None or event.brand_id == self.brand)
+            and (self.model is None or event.model_id == self.model)
+            and (self.min_price is None or event.price >= self.min_price)
+            and (self.max_price is None or event.price <= self.max_price)
+        )
+
+
+def parse_filters(params):
+    # ValueError/ArithmeticError при некорректных значениях
+    def value(name, cast):
+        raw = params.get(name)
+        return cast(raw) if raw not in (None, '') else None
+
+    return Filters(
+        brand=value('brand', int),
+        model=value('model', int),
+        min_price=value('min_price', Decimal),
+        max_price=value('max_price', Decimal),
+    )
+
+
+def track_car(car):
+    car._stream_status = car.__dict__.get('status')
+
+
+def car_saved(car, created):
+    was_active = not created and car._stream_status == 'active'
+    car._stream_status = car.status
+    if car.status != 'active' or was_active:
+        return
+    fields = {
+        'car_id': car.pk,
+        'brand_id': car.brand_id,
+        'model_id': car.model_id,
+        'price': car.price,
+        'payload': {
+            'id': car.pk,
+            'brand': car.brand_id,
+            'brand_name': car.brand.name,
+            'model': car.model_id,
+            'model_name': car.model.name,
+            'year': car.year,
+            'mileage': car.mileage,
+            'price': PRICE.to_representation(car.price),
+            'main_image_url': car.main_image_url,
+            'created_at': DATETIME.to_representation(car.created_at),
+        },
+    }
+    transaction.on_commit(lambda: record(fields))
+
+
+def record(fields):
+    ListingEvent.objects.create(**fields)
+    broadcaster.wake()
+
+
+def to_event(row):
+    seq, brand_id, model_id, price, payload = row
+    message = b'id: %d\nevent: car\ndata: %s\n\n' % (seq, dumps(payload))
+    return Event(seq, brand_id, model_id, price, message)
+
+
+def fetch(after, limit, filters=None):
+    assign_sequence(ListingEvent, SEQUENCE)
+    events = ListingEvent.objects.filter(seq__gt=after)
+    if filters is not None:
+        for field in ('brand', 'model'):
+            if getattr(filters, field) is not None:
+                events = events.filter(**{f'{field}_id': getattr(filters, field)})
+        if filters.min_price is not None:
+            events = events.filter(price__gte=filters.min_price)
+        if filters.max_price is not None:
+            events = events.filter(price__lte=filters.max_price)
+    rows = events.order_by('seq').values_list('seq', 'brand_id', 'model_id', 'price', 'payload')[:limit]
+    return [to_event(row) for row in rows]
+
+
+def prune(days):
+    # Старые события нужны только для догона по Last-Event-ID
+    return ListingEvent.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+
+def latest_id():
+    # Последний выданный seq
+    assign_sequence(ListingEvent, SEQUENCE)
+    return ChangeCounter.objects.filter(name=SEQUENCE).values_list('version', flat=True).first() or 0
+
+
+class Subscriber:
+
+    def __init__(self, filters):
+        self.filters = filters
+        self.queue = asyncio.Queue(maxsize=settings.STREAM_QUEUE_SIZE)
+        self.dropped = False
+
+
+class Broadcaster:
+    # Раздача событий подписчикам процесса; работает в цикле событий ASGI-сервера
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.wakeup = None
+        self.task = None
+        self.last_id = None
+
+    def full(self):
+        return len(self.subscribers) >= settings.STREAM_MAX_SUBSCRIBERS
+
+    def subscribe(self, filters):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.wakeup, self.task, self.last_id = loop, asyncio.Event(), None, None
+            self.subscribers = set()
+        subscriber = Subscriber(filters)
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = loop.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def wake(self):
+        # Вызывается из потоков синхронного кода (сигналы), поэтому через call_soon_threadsafe
+        loop, wakeup = self.loop, self.wakeup
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def run(self):
+        try:
+            if self.last_id is None:
+                self.last_id = await sync_to_async(latest_id)()
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), settings.STREAM_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                events = await sync_to_async(fetch)(self.last_id, settings.STREAM_BATCH_SIZE)
+                if events:
+                    self.last_id = events[-1].id
+                    self.deliver(events)
+        finally:
+            # Без подписчиков опрос останавливается; новый начнёт с последнего события в базе
+            self.task, self.last_id = None, None
+
+    def deliver(self, events):
+        for subscriber in list(self.subscribers):
+            for event in events:
+                if not subscriber.filters.matches(event):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self.drop(subscriber)
+                    break
+
+    def drop(self, subscriber):
+        # Место под маркер конца потока освобождается за счёт самого старого события
+        self.subscribers.discard(subscriber)
+        subscriber.dropped = True
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+
+broadcaster = Broadcaster()
+
+
+async def events(filters, last_event_id=0):
+    # Тело SSE-ответа: пропущенные события из базы (Last-Event-ID), затем живые
+    subscriber = broadcaster.subscribe(filters)
+    try:
+        yield b'retry: %d\n\n' % settings.STREAM_RETRY_MS
+        # События из очереди, уже отданные при догоне (или клиенту до переподключения), пропускаются
+        seen = last_event_id
+        while last_event_id:
+            replay = await sync_to_async(fetch)(seen, settings.STREAM_BATCH_SIZE, filters)
+            for event in replay:
+                seen = event.id
+                yield event.message
+            if len(replay) < settings.STREAM_BATCH_SIZE:
+                break
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), settings.STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b': ping\n\n'
+                continue
+            if event is None:
+                return
+            if event.id > seen:
+                yield event.message
+    finally:
+        broadcaster.unsubscribe(subscriber)
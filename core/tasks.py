@@ -0,0 +1,189 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module
+import multiprocessing
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import Task
+from .routers import replica_scope
+
+
+# Фоновые задачи: очередь в таблице Task, воркеры — отдельные процессы (manage.py run_workers)
+
+logger = logging.getLogger(__name__)
+registry = {}
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=None):
+    # Регистрирует функцию как задачу: @task или @task(priority=10)
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.task_priority = priority
+        func.task_max_attempts = max_attempts or settings.TASK_MAX_ATTEMPTS
+        registry[func.task_name] = func
+        return func
+    return register(func) if func else register
+
+
+def autodiscover():
+    # Задачи лежат в модулях <app>.jobs
+    for app_config in apps.get_app_configs():
+        try:
+            import_module(f'{app_config.name}.jobs')
+        except ModuleNotFoundError as exc:
+            if exc.name != f'{app_config.name}.jobs':
+                raise
+
+
+def enqueue(func, *args, priority=None, dedup_key='', delay=0, **kwargs):
+    # Ставит задачу в очередь; при совпадении dedup_key возвращает уже стоящую задачу
+    if settings.TASKS_ALWAYS_EAGER:
+        func(*args, **kwargs)
+        return None
+    fields = {
+        'name': func.task_name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'priority': func.task_priority if priority is None else priority,
+        'max_attempts': func.task_max_attempts,
+        'dedup_key': dedup_key,
+        'run_at': timezone.now() + timedelta(seconds=delay),
+    }
+    if not dedup_key:
+        return Task.objects.create(**fields)
+    existing = Task.objects.filter(dedup_key=dedup_key, status='queued').first()
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**fields)
+    except IntegrityError:
+        return Task.objects.filter(dedup_key=dedup_key, status='queued').first()
+
+
+def claim(worker_id):
+    # Оптимистичная блокировка: UPDATE ... WHERE status='queued' сработает только у одного воркера
+    now = timezone.now()
+    candidates = (
+        Task.objects.filter(status='queued', run_at__lte=now)
+        .order_by('-priority', 'run_at', 'id').values_list('id', flat=True)[:10]
+    )
+    for task_id in candidates:
+        # dedup_key снимается, чтобы можно было поставить следующую такую же задачу
+        taken = Task.objects.filter(pk=task_id, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now, dedup_key='',
+        )
+        if taken:
+            return Task.objects.get(pk=task_id)
+    return None
+
+
+@contextmanager
+def heartbeat(job):
+    # Пока задача выполняется, отдельный поток обновляет locked_at: requeue_stale
+    # не отдаёт другому воркеру задачу, которая идёт дольше TASK_LOCK_TIMEOUT
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(settings.TASK_LOCK_TIMEOUT / 3):
+                try:
+                    Task.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(
+                        locked_at=timezone.now(),
+                    )
+                except DatabaseError:
+                    logger.exception('Не удалось продлить блокировку задачи #%s', job.pk)
+        finally:
+            # Соединение потока
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def execute(job):
+    func = registry.get(job.name)
+    job.attempts += 1
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        # Свои записи задача читает с основной базы; следующая задача снова начинает с реплик
+        with heartbeat(job), replica_scope():
+            func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()[-5000:]
+        if job.attempts < job.max_attempts:
+            # Экспоненциальная задержка перед повтором
+            backoff = settings.TASK_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status, job.run_at = 'queued', timezone.now() + timedelta(seconds=backoff)
+        else:
+            job.status, job.finished_at = 'failed', timezone.now()
+        logger.exception('Задача %s #%s завершилась с ошибкой', job.name, job.pk)
+    else:
+        job.status, job.finished_at, job.last_error = 'done', timezone.now(), ''
+    job.locked_by, job.locked_at = '', None
+    job.save(update_fields=['status', 'attempts', 'run_at', 'finished_at', 'last_error', 'locked_by', 'locked_at'])
+
+
+def requeue_stale():
+    # Задачи упавших воркеров возвращаются в очередь (у живых locked_at продлевает heartbeat)
+    stale_before = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    return Task.objects.filter(status='running', locked_at__lt=stale_before).update(
+        status='queued', locked_by='', locked_at=None,
+    )
+
+
+def worker_loop(worker_id, poll_interval, once=False):
+    autodiscover()
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    last_requeue = 0
+    while not stopping:
+        close_old_connections()
+        if time.monotonic() - last_requeue > settings.TASK_LOCK_TIMEOUT / 2:
+            requeue_stale()
+            last_requeue = time.monotonic()
+        job = claim(worker_id)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        execute(job)
+
+
+def run_workers(processes, poll_interval, once=False):
+    # Пул процессов-воркеров; соединения с базой не должны наследоваться от родителя
+    connections.close_all()
+    host = socket.gethostname()
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=worker_loop, args=(f'{host}:{os.getpid()}:{number}', poll_interval, once))
+        for number in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
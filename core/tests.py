@@ -1,5 +1,1024 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpRequest
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
 
-TestCase()
+from . import (archive, changefeed, dedupe, exports, jobs, recent, sellers, sitemaps, stream, throttling, uploads,
+               visitors)
+from .admin_utils import EstimatedCountPaginator
+from .apikeys import create_key, revoke
+from .mirror import PhotoFetcher
+from .resources import CarResource
+from .routers import replica_scope
+from .tasks import claim, enqueue, execute, task
+from .models import (ApiKey, ArchivedCar, Brand, Car, CarPhoto, CarSignature, ChangeLog, Favorite,
+                     ListingEvent, MirroredPhoto, Model, PendingViews, PendingVisit, PhotoUpload,
+                     PriceChange, RecentlyViewed, SellerStats, SessionRecentlyViewed, Task, User, VisitorTotal)
+
+
+class CatalogTestCase(TestCase):
+    # Продавец, марка, модель и активное объявление
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('seller', password='seller-password')
+        cls.brand = Brand.objects.create(name='BMW')
+        cls.model = Model.objects.create(brand=cls.brand, name='X5')
+        cls.car = cls.create_car()
+
+    @classmethod
+    def create_car(cls, **fields):
+        fields = {
+            'user': cls.user, 'brand': cls.brand, 'model': cls.model, 'year': 2020,
+            'price': 1000000, 'description': 'Один владелец', 'status': 'active', **fields,
+        }
+        return Car.objects.create(**fields)
+
+
+class ChangeFeedTests(CatalogTestCase):
+
+    def setUp(self):
+        _, token = create_key(self.user, 'feed', ['feed'])
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token}'}
+
+    def feed(self, since=''):
+        response = self.client.get('/api/changes/', {'since': since}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def changes(self, page):
+        return {(item['type'], item['id']): item for item in page['results']}
+
+    def test_requires_authentication(self):
+        self.assertIn(self.client.get('/api/changes/').status_code, (401, 403))
+
+    def test_only_active_cars_are_serialized(self):
+        hidden = self.create_car(status='moderation')
+        changes = self.changes(self.feed())
+        self.assertEqual(changes[('car', self.car.pk)]['data']['id'], self.car.pk)
+        self.assertEqual(changes[('car', hidden.pk)]['action'], 'deleted')
+        self.assertIsNone(changes[('car', hidden.pk)]['data'])
+
+    def test_late_commit_is_not_skipped(self):
+        page = self.feed()
+        # Запись с меньшим id, закоммиченная после того, как курсор клиента прошёл дальше
+        late_id = ChangeLog.objects.order_by('id').values_list('id', flat=True).first() - 1
+        ChangeLog.objects.create(id=late_id, model='brand', object_id=self.brand.pk, action='~')
+        changes = self.changes(self.feed(page['next']))
+        self.assertIn(('brand', self.brand.pk), changes)
+        self.assertEqual(self.feed(self.feed(page['next'])['next'])['results'], [])
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get('/api/changes/', {'since': 'garbage'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+        page = self.feed()
+        self.car.delete()
+        changefeed.assign_sequence()
+        changefeed.compact(days=0, tombstone_days=-1)
+        response = self.client.get('/api/changes/', {'since': page['next']}, **self.auth)
+        self.assertEqual(response.status_code, 410)
+
+
+class ApiKeyScopeTests(CatalogTestCase):
+
+    def request(self, method, path, token, **data):
+        return getattr(self.client, method)(
+            path, data, content_type='application/json', HTTP_AUTHORIZATION=f'Token {token}',
+        )
+
+    def test_read_key_cannot_write(self):
+        _, token = create_key(self.user, 'read', ['read'])
+        self.assertEqual(self.request('get', f'/api/cars/{self.car.pk}/', token).status_code, 200)
+        response = self.request('patch', f'/api/cars/{self.car.pk}/', token, price=900000)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.request('get', '/api/changes/', token).status_code, 403)
+
+    def test_write_key_can_write(self):
+        _, token = create_key(self.user, 'write', ['read', 'write'])
+        response = self.request('patch', f'/api/cars/{self.car.pk}/', token, price=900000)
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_scope_requires_key(self):
+        # Сессия не подменяет право 'feed'
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/changes/').status_code, 403)
+
+    def test_revoked_key_is_rejected(self):
+        key, token = create_key(self.user, 'read', ['read'])
+        self.assertEqual(self.request('get', f'/api/cars/{self.car.pk}/', token).status_code, 200)
+        revoke(ApiKey.objects.filter(pk=key.pk))
+        self.assertEqual(self.request('get', f'/api/cars/{self.car.pk}/', token).status_code, 401)
+        self.assertEqual(self.request('get', '/api/cars/', 'ch_bad.token').status_code, 401)
+
+
+class RecentlyViewedTests(CatalogTestCase):
+
+    def test_anonymous_view_does_not_create_session(self):
+        response = self.client.get(f'/car/{self.car.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_history_of_existing_session(self):
+        session = self.client.session
+        session['seen'] = True
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        other = self.create_car()
+        self.client.get(f'/car/{self.car.pk}/')
+        self.client.get(f'/car/{other.pk}/')
+        ids = [car['id'] for car in self.client.get('/api/recently-viewed/').json()['results']]
+        self.assertEqual(ids, [other.pk, self.car.pk])
+
+    def recent_ids(self):
+        return [car['id'] for car in self.client.get('/api/recently-viewed/').json()['results']]
+
+    def test_session_history_is_shared_and_sets_no_cookies(self):
+        session = SessionStore()
+        session['seen'] = True
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        response = self.client.get(f'/car/{self.car.pk}/')
+        self.assertEqual(dict(response.cookies), {})
+        # История в базе, а не в кэше процесса: другой воркер (пустой кэш) видит её
+        cache.clear()
+        self.assertEqual(self.recent_ids(), [self.car.pk])
+        session.delete()
+        self.assertFalse(SessionRecentlyViewed.objects.exists())
+
+    def test_user_history_is_saved_without_flush(self):
+        other = self.create_car()
+        self.client.force_login(self.user)
+        for car in (self.car, other, self.car):
+            self.client.get(f'/car/{car.pk}/')
+        cache.clear()
+        self.assertEqual(self.recent_ids(), [self.car.pk, other.pk])
+        self.assertEqual(recent.unpack(RecentlyViewed.objects.get(user=self.user).car_ids), [self.car.pk, other.pk])
+
+
+class MirrorFetchTests(SimpleTestCase):
+    # Локальный http.server: по умолчанию зеркало на него не ходит
+    PNG = base64.b64decode(
+        'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        png = cls.PNG
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/redirect'):
+                    self.send_response(302)
+                    self.send_header('Location', self.path.split('to=', 1)[1])
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(png)))
+                self.end_headers()
+                self.wfile.write(png)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def fetch(self, url, **options):
+        return asyncio.run(PhotoFetcher(**options).fetch_all([url]))[0]
+
+    def test_private_address_is_refused(self):
+        result = self.fetch(f'{self.base}/photo.png')
+        self.assertIn('UnsafeURL', result.error)
+        self.assertEqual(result.data, b'')
+
+    def test_allowed_network(self):
+        result = self.fetch(f'{self.base}/photo.png', allowed_networks=['127.0.0.1/32'])
+        self.assertEqual(result.error, '')
+        self.assertEqual(result.data, self.PNG)
+
+    def test_redirect_to_private_address_is_refused(self):
+        target = f'http://127.0.0.2:{self.server.server_port}/photo.png'
+        result = self.fetch(f'{self.base}/redirect?to={target}', allowed_networks=['127.0.0.1/32'])
+        self.assertIn('UnsafeURL', result.error)
+
+    def test_only_http_and_https(self):
+        self.assertIn('UnsafeURL', self.fetch('file:///etc/passwd').error)
+        result = self.fetch(f'{self.base}/redirect?to=ftp://127.0.0.1/photo.png', allowed_networks=['127.0.0.1/32'])
+        self.assertIn('UnsafeURL', result.error)
+
+
+class ConditionalGetTests(CatalogTestCase):
+
+    def get(self, path, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(path, **headers)
+
+    def assertChanged(self, path, etag):
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified(self):
+        for path in ('/api/cars/', f'/api/cars/{self.car.pk}/', f'/car/{self.car.pk}/'):
+            etag = self.get(path)['ETag']
+            self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_photo_changes_car_lists(self):
+        etag = self.get('/api/cars/')['ETag']
+        CarPhoto.objects.create(car=self.car, image_url='https://example.com/1.jpg')
+        self.assertChanged('/api/cars/', etag)
+
+    def test_seller_rename_changes_car_lists(self):
+        etag = self.get('/api/cars/')['ETag']
+        self.user.username = 'dealer'
+        self.user.save()
+        self.assertChanged('/api/cars/', etag)
+        self.assertEqual(self.get('/api/cars/').json()['results'][0]['user_name'], 'dealer')
+
+    def test_seller_rename_changes_car_pages(self):
+        api, page = f'/api/cars/{self.car.pk}/', f'/car/{self.car.pk}/'
+        etags = {path: self.get(path)['ETag'] for path in (api, page)}
+        self.user.username = 'dealer'
+        self.user.save()
+        for path, etag in etags.items():
+            self.assertChanged(path, etag)
+        self.assertEqual(self.get(api).json()['user_name'], 'dealer')
+        self.assertContains(self.get(page), 'dealer')
+
+    def test_model_rename_changes_car_page(self):
+        self.get(f'/car/{self.car.pk}/')
+        self.model.name = 'X6'
+        self.model.save()
+        self.assertNotContains(self.get(f'/car/{self.car.pk}/'), 'X5')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    # Реплика — отдельный файл SQLite с той же схемой, но без данных: видно, куда ушло чтение
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        name = os.path.join(directory.name, 'replica.sqlite3')
+        databases = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name},
+        })
+        connections['replica'] = DatabaseWrapper(databases['replica'], alias='replica')
+        self.addCleanup(self.drop_replica)
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(Brand)
+        Brand.objects.create(name='Audi')
+
+    def drop_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+
+    def test_reads_replica_until_write(self):
+        with replica_scope() as scope:
+            self.assertFalse(Brand.objects.exists())
+            Brand.objects.create(name='BMW')
+            self.assertTrue(scope.wrote)
+            self.assertEqual(Brand.objects.count(), 2)
+        with replica_scope():
+            self.assertFalse(Brand.objects.exists())
+
+    def test_outside_scope_reads_primary(self):
+        self.assertEqual(Brand.objects.count(), 1)
+
+    def test_pinned_scope_reads_primary(self):
+        with replica_scope(pinned=True):
+            self.assertEqual(Brand.objects.count(), 1)
+
+    def test_session_write_does_not_pin(self):
+        with replica_scope() as scope:
+            session = SessionStore()
+            session['seen'] = True
+            session.save()
+            self.assertFalse(scope.wrote)
+            self.assertTrue(SessionStore(session.session_key).get('seen'))
+            self.assertFalse(Brand.objects.exists())
+
+
+class CatalogCacheTests(CatalogTestCase):
+
+    def test_flash_messages_are_not_cached(self):
+        cache.clear()
+        self.client.get('/')
+        storage = CookieStorage(HttpRequest())
+        self.client.cookies['messages'] = storage._encode([Message(constants.INFO, 'Объявление удалено')])
+        self.assertContains(self.client.get('/'), 'Объявление удалено')
+        # Сообщение показано один раз и не попало в кэш для других посетителей
+        self.assertNotContains(self.client.get('/'), 'Объявление удалено')
+        self.assertNotContains(Client().get('/'), 'Объявление удалено')
+
+
+class CompressionTests(CatalogTestCase):
+
+    def test_html_is_gzipped_with_padding(self):
+        bodies = {self.client.get('/', HTTP_ACCEPT_ENCODING='gzip').content for _ in range(3)}
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        # Случайное имя файла в заголовке gzip: одна и та же страница сжимается по-разному
+        self.assertGreater(len(bodies | {response.content}), 1)
+
+    def test_json_is_compressed(self):
+        for _ in range(5):
+            self.create_car()
+        response = self.client.get('/api/cars/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 6)
+
+
+@override_settings(THROTTLE_BUCKETS={'anon': (0.001, 3), 'user': (0.001, 3), 'key': (0.001, 3)})
+class ThrottlingTests(CatalogTestCase):
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+
+    def test_bucket_limits_and_search_cost(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/brands/').status_code, 200)
+        response = self.client.get('/api/brands/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(throttling.rejection_stats()['anon'], 1)
+        # Поиск стоит 1 + THROTTLE_SEARCH_COST токенов — больше всего ведра
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/cars/', {'search': 'x'}).status_code, 429)
+        self.assertEqual(self.client.get('/api/cars/').status_code, 200)
+
+    def test_forwarded_for_does_not_reset_bucket(self):
+        # NUM_PROXIES = 0: X-Forwarded-For не меняет IP клиента
+        statuses = [
+            self.client.get('/api/brands/', HTTP_X_FORWARDED_FOR=f'10.0.0.{number}').status_code
+            for number in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_concurrent_takes_do_not_overspend(self):
+        allowed = []
+
+        def spend():
+            for _ in range(25):
+                allowed.append(throttling.take('throttle:test', 1e-9, 100)[0])
+
+        threads = [threading.Thread(target=spend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 100)
+
+    @override_settings(SHED_MAX_CONCURRENCY=4, SHED_MIN_CONCURRENCY=1, SHED_DB_LATENCY=0.05)
+    def test_shedder_limit_is_aimd(self):
+        shedder = throttling.LoadShedder()
+        self.assertEqual([shedder.acquire() for _ in range(5)], [True] * 4 + [False])
+        # Медленная база: предел умножается на 0.8 до SHED_MIN_CONCURRENCY
+        limits = []
+        for _ in range(4):
+            shedder.release(1.0, 1)
+            limits.append(shedder.state()['limit'])
+        self.assertEqual(limits, [3, 2, 2, 1])
+        self.assertEqual([shedder.acquire(), shedder.acquire()], [True, False])
+        for _ in range(10):
+            shedder.release(1.0, 1)
+            shedder.acquire()
+        self.assertEqual(shedder.state()['limit'], 1)
+        # Быстрая база: средняя задержка падает, предел растёт на 1 за запрос до SHED_MAX_CONCURRENCY
+        limits = []
+        for _ in range(40):
+            shedder.release(0.0, 1)
+            self.assertTrue(shedder.acquire())
+            limits.append(shedder.state()['limit'])
+        self.assertEqual(limits[-1], 4)
+        self.assertTrue(all(0 <= after - before <= 1 for before, after in zip(limits, limits[1:])))
+
+    @override_settings(SHED_MAX_CONCURRENCY=0)
+    def test_overloaded_process_sheds_requests(self):
+        with mock.patch.object(throttling, 'shedder', throttling.LoadShedder()):
+            response = self.client.get('/api/brands/')
+            self.assertEqual(self.client.get('/admin/login/').status_code, 200)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(settings.SHED_RETRY_AFTER))
+        self.assertEqual(throttling.rejection_stats()['shed'], 1)
+
+
+@override_settings(STREAM_POLL_INTERVAL=0.01, STREAM_QUEUE_SIZE=2)
+class ListingStreamTests(CatalogTestCase):
+
+    def event(self, price=1000000, brand=None, **fields):
+        brand = brand or self.brand
+        return ListingEvent.objects.create(
+            car=self.car, brand=brand, model=self.model, price=price, payload={'price': price}, **fields,
+        )
+
+    def ids(self, events):
+        return [event.id for event in events]
+
+    def read(self, filters, last_event_id, count):
+        # async_to_sync: запросы sync_to_async идут в этом потоке, в транзакции теста
+        async def collect():
+            messages = stream.events(filters, last_event_id)
+            result = [await messages.__anext__() for _ in range(count)]
+            await messages.aclose()
+            if stream.broadcaster.task:
+                await stream.broadcaster.task
+            return result
+
+        return async_to_sync(collect)()
+
+    def test_late_commit_is_not_skipped(self):
+        later = self.event(id=100)
+        self.assertEqual(self.ids(stream.fetch(0, 10)), [1])
+        # Вставка с меньшим id, закоммиченная после опроса, получает следующий номер
+        self.event(id=50)
+        self.assertEqual(self.ids(stream.fetch(1, 10)), [2])
+        self.assertEqual(ListingEvent.objects.get(pk=later.pk).seq, 1)
+        self.assertEqual(stream.latest_id(), 2)
+
+    def test_filters(self):
+        other = Brand.objects.create(name='Audi')
+        self.event(price=500)
+        self.event(price=2000)
+        self.event(price=1500, brand=other)
+        filters = stream.parse_filters({'brand': str(self.brand.pk), 'min_price': '1000'})
+        self.assertEqual(self.ids(stream.fetch(0, 10, filters)), [2])
+        self.assertEqual(self.ids(stream.fetch(0, 10, stream.parse_filters({'max_price': '1500'}))), [1, 3])
+        with self.assertRaises(ArithmeticError):
+            stream.parse_filters({'min_price': 'x'})
+
+    def test_last_event_id_replays_missed_events(self):
+        other = Brand.objects.create(name='Audi')
+        for brand in (self.brand, self.brand, other, self.brand):
+            self.event(brand=brand)
+        messages = self.read(stream.Filters(brand=self.brand.pk), 1, 3)
+        self.assertTrue(messages[0].startswith(b'retry: '))
+        self.assertEqual([message.split(b'\n')[0] for message in messages[1:]], [b'id: 2', b'id: 4'])
+
+    def test_slow_client_is_dropped(self):
+        broadcaster = stream.Broadcaster()
+        slow = stream.Subscriber(stream.Filters())
+        other = stream.Subscriber(stream.Filters(brand=self.brand.pk + 1))
+        broadcaster.subscribers.update((slow, other))
+        self.event()
+        events = stream.fetch(0, 10) * 3
+        broadcaster.deliver(events)
+        self.assertTrue(slow.dropped)
+        self.assertEqual(broadcaster.subscribers, {other})
+        # В очереди остаются последнее событие и маркер конца: клиент переподключится с Last-Event-ID
+        self.assertEqual([slow.queue.get_nowait(), slow.queue.get_nowait()], [events[1], None])
+        self.assertFalse(other.dropped)
+        self.assertTrue(other.queue.empty())
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=2)
+class AdminCountTests(CatalogTestCase):
+
+    def setUp(self):
+        for status in ('active', 'active', 'sold'):
+            self.create_car(status=status)
+
+    def test_filtered_count_is_capped(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            count = EstimatedCountPaginator(Car.objects.filter(status='active'), 10).count
+        self.assertEqual(count, 3)
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+        self.assertEqual(EstimatedCountPaginator(Car.objects.filter(status='sold'), 10).count, 1)
+
+    def test_changelist_counts_are_capped(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        last = Car.objects.order_by('-id').first()
+        for query in ('?status__exact=active', f'?status__exact=active&cursor={last.pk}'):
+            with CaptureQueriesContext(connections['default']) as queries:
+                response = self.client.get('/admin/core/car/' + query)
+            self.assertEqual(response.status_code, 200)
+            counts = [item['sql'] for item in queries if 'COUNT(' in item['sql'] and 'core_car' in item['sql']]
+            self.assertTrue(counts)
+            self.assertTrue(all('LIMIT 3' in sql for sql in counts), counts)
+
+
+@override_settings(SITEMAP_ROOT=tempfile.mkdtemp(prefix='sitemaps-'), SITE_URL='https://carhub.test')
+class SitemapTests(CatalogTestCase):
+
+    def read(self, name):
+        tree = ElementTree.parse(os.path.join(settings.SITEMAP_ROOT, name))
+        namespace = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+        return {
+            item.findtext(namespace + 'loc'): item.findtext(namespace + 'lastmod')
+            for item in tree.getroot()
+        }
+
+    def test_entries_and_lastmod(self):
+        updated = timezone.now() - timedelta(days=3)
+        Car.objects.filter(pk=self.car.pk).update(updated_at=updated)
+        fresh = self.create_car()
+        self.create_car(status='sold')
+        self.create_car(status='moderation')
+        self.assertEqual(sitemaps.build(force=True)[0], 1)
+
+        fresh.refresh_from_db()
+        self.assertEqual(self.read('sitemap-0.xml'), {
+            f'https://carhub.test/car/{self.car.pk}/': updated.date().isoformat(),
+            f'https://carhub.test/car/{fresh.pk}/': fresh.updated_at.date().isoformat(),
+        })
+        self.assertEqual(self.read('sitemap.xml'), {
+            'https://carhub.test/sitemap-0.xml': fresh.updated_at.isoformat(),
+        })
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response['Content-Type'], 'application/xml; charset=utf-8')
+        self.assertIn(b'sitemap-0.xml', b''.join(response.streaming_content))
+
+    def test_only_changed_shard_is_rebuilt(self):
+        far = self.create_car(id=sitemaps.SHARD_SIZE + 1)
+        self.assertEqual(sitemaps.build(force=True), (2, 2, 0))
+        self.assertEqual(sitemaps.build(), (2, 0, 0))
+
+        Car.objects.filter(pk=far.pk).update(updated_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(sitemaps.build(), (2, 1, 0))
+        far.refresh_from_db()
+        self.assertEqual(self.read('sitemap.xml')['https://carhub.test/sitemap-1.xml'],
+                         far.updated_at.isoformat())
+        self.assertEqual(set(self.read('sitemap-1.xml').values()), {far.updated_at.date().isoformat()})
+
+        # Шард без активных объявлений удаляется вместе со ссылкой в индексе
+        Car.objects.filter(pk=far.pk).update(status='sold')
+        self.assertEqual(sitemaps.build(), (1, 0, 1))
+        self.assertFalse(os.path.exists(os.path.join(settings.SITEMAP_ROOT, 'sitemap-1.xml')))
+        self.assertEqual(list(self.read('sitemap.xml')), ['https://carhub.test/sitemap-0.xml'])
+
+
+@override_settings(EXPORT_WORKERS=1, MEDIA_ROOT=tempfile.mkdtemp(prefix='media-'))
+class ExportTests(CatalogTestCase):
+
+    def read_csv(self, path):
+        with default_storage.open(path) as fh:
+            return list(csv.reader(io.TextIOWrapper(fh, encoding='utf-8')))
+
+    def filtered_range(self):
+        # Диапазон id с пропусками: проданные внутри диапазона и объявления за его границами
+        cars = [self.create_car(price=1000000 + number, status='sold' if number % 3 else 'active')
+                for number in range(12)]
+        queryset = Car.objects.filter(status='active', pk__gt=cars[1].pk, pk__lt=cars[10].pk)
+        return queryset, [car.pk for car in cars[2:10] if car.status == 'active']
+
+    def test_csv_filtered_range(self):
+        queryset, expected = self.filtered_range()
+        path = os.path.join(settings.MEDIA_ROOT, 'range.csv')
+        rows, _ = exports.parallel_export(path, 'csv', workers=1, shards_per_worker=3, queryset=queryset)
+        self.assertEqual(rows, len(expected))
+        with open(path, encoding='utf-8', newline='') as fh:
+            table = list(csv.reader(fh))
+        self.assertEqual(table[0], CarResource().get_export_headers())
+        self.assertEqual([int(row[0]) for row in table[1:]], expected)
+        self.assertEqual(table[1][5], f'{int(Car.objects.get(pk=expected[0]).price):,} ₽')
+
+    def test_xlsx_and_zip_by_ids(self):
+        queryset, expected = self.filtered_range()
+        # Один шард с пропусками в id — выгружаются только явные id
+        ids = [self.car.pk, *expected]
+        self.assertEqual(exports.make_shards(ids, shards=1)[0][3], ids)
+        path = os.path.join(settings.MEDIA_ROOT, 'ids.xlsx')
+        self.assertEqual(exports.parallel_export(path, 'xlsx', workers=1, ids=ids)[0], len(ids))
+        sheet = load_workbook(path, read_only=True)['Объявления']
+        table = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(list(table[0]), CarResource().get_export_headers())
+        self.assertEqual([int(row[0]) for row in table[1:]], ids)
+
+        path = os.path.join(settings.MEDIA_ROOT, 'range.zip')
+        exports.parallel_export(path, 'zip', workers=1, shards_per_worker=2, queryset=queryset)
+        with zipfile.ZipFile(path) as archive:
+            parts = [list(csv.reader(io.TextIOWrapper(archive.open(name), encoding='utf-8')))
+                     for name in sorted(archive.namelist())]
+        self.assertEqual([int(row[0]) for part in parts for row in part[1:]], expected)
+
+    def test_empty_range(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'empty.csv')
+        rows, _ = exports.parallel_export(path, 'csv', workers=1, queryset=Car.objects.filter(status='sold'))
+        self.assertEqual(rows, 0)
+        with open(path, encoding='utf-8', newline='') as fh:
+            self.assertEqual(list(csv.reader(fh)), [CarResource().get_export_headers()])
+
+    def test_admin_export_enqueues_filter_not_ids(self):
+        sold = self.create_car(status='sold')
+        active = self.create_car()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.post('/admin/core/car/?status__exact=active', {
+            'action': 'export_csv_action', 'select_across': '1', 'index': '0', '_selected_action': [active.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        job = Task.objects.get(name='core.jobs.export_cars')
+        self.assertEqual(list(job.kwargs), ['query'])
+        self.assertNotIn(active.pk, job.args)
+        # Объявление, добавленное после постановки, в файл не попадает
+        self.create_car()
+        jobs.export_cars(*job.args, **job.kwargs)
+        rows = self.read_csv(job.args[0])
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), [self.car.pk, active.pk])
+        self.assertNotIn(str(sold.pk), [row[0] for row in rows])
+
+
+@task(name='core.tests.fail_always', max_attempts=3)
+def fail_always():
+    raise RuntimeError('Ошибка задачи')
+
+
+@override_settings(TASK_RETRY_BACKOFF=10)
+class TaskQueueTests(CatalogTestCase):
+
+    def test_retries_with_exponential_backoff(self):
+        job = enqueue(fail_always)
+        for attempt, backoff in ((1, 10), (2, 20)):
+            started = timezone.now()
+            with self.assertLogs('core.tasks', 'ERROR'):
+                execute(job)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            self.assertAlmostEqual((job.run_at - started).total_seconds(), backoff, delta=2)
+            self.assertIn('Ошибка задачи', job.last_error)
+            # Отложенная задача не выдаётся раньше срока
+            self.assertIsNone(claim('worker'))
+        with self.assertLogs('core.tasks', 'ERROR'):
+            execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_dedup_until_claimed(self):
+        first = enqueue(jobs.flush_views, dedup_key='flush_views')
+        self.assertEqual(enqueue(jobs.flush_views, dedup_key='flush_views'), first)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(claim('worker'), first)
+        # Взятая задача снимает ключ: следующий сброс снова ставится в очередь
+        second = enqueue(jobs.flush_views, dedup_key='flush_views')
+        self.assertNotEqual(second, first)
+        execute(Task.objects.get(pk=first.pk))
+        self.assertEqual(Task.objects.get(pk=first.pk).status, 'done')
+
+    def test_claim_order(self):
+        low = enqueue(jobs.flush_views, priority=-5)
+        later = enqueue(jobs.flush_views, priority=10, delay=60)
+        high = enqueue(jobs.flush_views, priority=5)
+        self.assertEqual([claim('worker'), claim('worker'), claim('worker')], [high, low, None])
+        self.assertEqual(Task.objects.get(pk=later.pk).status, 'queued')
+
+
+class ArchiveTests(CatalogTestCase):
+
+    def stats(self):
+        return SellerStats.objects.values(*sellers.COUNTER_FIELDS).get(user=self.user)
+
+    def sold_car(self, days):
+        car = self.create_car()
+        car.price, car.status = 900000, 'sold'
+        car.save()
+        Car.objects.filter(pk=car.pk).update(updated_at=timezone.now() - timedelta(days=days))
+        return car
+
+    def test_dependent_rows_are_archived_without_delete_records(self):
+        car = self.sold_car(40)
+        fan = User.objects.create_user('fan', 'fan@example.com', 'password')
+        Favorite.objects.create(user=fan, car=car)
+        for number in range(20):
+            visitors.record_view(car.pk, f'v{number}')
+        jobs.flush_visitors()
+        visitors.record_view(car.pk, 'late-visitor')
+        jobs.buffer_view(car.pk)
+        fresh = self.sold_car(5)
+        sellers.reconcile()
+        stats, seller_viewers = self.stats(), visitors.seller_estimate(self.user.pk)
+        changes = ChangeLog.objects.count()
+
+        self.assertEqual(archive.archive_sold(30), 1)
+        self.assertFalse(Car.objects.filter(pk=car.pk).exists())
+        self.assertTrue(Car.objects.filter(pk=fresh.pk).exists())
+        archived = ArchivedCar.objects.get(pk=car.pk)
+        self.assertEqual([price for price, _ in archived.price_history], ['1000000.00', '900000.00'])
+        self.assertEqual(archived.favorited_by, [fan.pk])
+        self.assertEqual(archived.views, 1)
+        self.assertAlmostEqual(archived.unique_viewers, 21, delta=2)
+        # Перенос — не удаление: ни истории, ни ленты, ни изменения статистики
+        self.assertFalse(Car.history.filter(id=car.pk, history_type='-').exists())
+        self.assertEqual(ChangeLog.objects.count(), changes)
+        stats['total_views'] += 1
+        self.assertEqual(self.stats(), stats)
+        sellers.reconcile()
+        self.assertEqual(self.stats(), stats)
+        # Пересборка берёт регистры из архива; несброшенное посещение тоже перенесено
+        visitors.rebuild_sellers()
+        self.assertAlmostEqual(visitors.seller_estimate(self.user.pk), seller_viewers + 1, delta=2)
+        for model in (Favorite, PriceChange, PendingVisit, PendingViews, VisitorTotal):
+            self.assertFalse(model.objects.filter(car_id=car.pk).exists(), model)
+
+    def test_clean_old_cars_archives(self):
+        car = self.sold_car(400)
+        self.sold_car(40)
+        self.assertEqual(jobs.clean_old_cars(), 1)
+        self.assertTrue(ArchivedCar.objects.filter(pk=car.pk).exists())
+
+
+class DedupeTests(CatalogTestCase):
+    TEXT = 'Один владелец, обслуживание у дилера, зимняя резина в комплекте, без ДТП и окрасов'
+
+    def setUp(self):
+        self.original = self.create_car(description=self.TEXT, mileage=50000)
+
+    def repost(self, **fields):
+        fields = {
+            'user': self.user, 'brand': self.brand, 'model': self.model, 'year': 2020,
+            'mileage': 52000, 'price': 950000, 'description': self.TEXT, 'status': 'active', **fields,
+        }
+        return Car(**fields)
+
+    def test_no_match_is_saved(self):
+        car, match = dedupe.add_car(self.repost(description='Битая, на запчасти, двигатель не заводится'))
+        self.assertIsNone(match)
+        self.assertEqual((car.status, car.user), ('active', self.user))
+        self.assertTrue(Car.objects.filter(pk=car.pk).exists())
+
+    def test_foreign_match_goes_to_moderation(self):
+        other = User.objects.create_user('reseller', password='password')
+        car, match = dedupe.add_car(self.repost(user=other))
+        self.assertEqual((match.car, match.merged), (self.original, False))
+        self.assertNotEqual(car.pk, self.original.pk)
+        self.assertEqual(Car.objects.get(pk=car.pk).status, 'moderation')
+        self.assertEqual(CarSignature.objects.get(car=car).duplicate_of_id, self.original.pk)
+
+    def test_own_repost_is_merged(self):
+        count = Car.objects.count()
+        car, match = dedupe.add_car(self.repost())
+        self.assertTrue(match.merged)
+        self.assertEqual(car.pk, self.original.pk)
+        self.assertEqual(Car.objects.count(), count)
+        self.original.refresh_from_db()
+        self.assertEqual((self.original.price, self.original.mileage), (950000, 52000))
+
+    def test_api_and_form_merge_reposts(self):
+        count = Car.objects.count()
+        self.client.force_login(self.user)
+        fields = {'brand': self.brand.pk, 'model': self.model.pk, 'year': 2020, 'mileage': 52000,
+                  'price': 950000, 'description': self.TEXT, 'status': 'active'}
+        response = self.client.post('/api/cars/', fields, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['duplicate']['id'], self.original.pk)
+        response = self.client.post('/car/add/', {**fields, 'price': 940000})
+        self.assertRedirects(response, f'/car/{self.original.pk}/', fetch_redirect_response=False)
+        self.assertEqual(Car.objects.count(), count)
+        self.original.refresh_from_db()
+        self.assertEqual(self.original.price, 940000)
+
+
+class SellerStatsTests(CatalogTestCase):
+
+    def stats(self):
+        return SellerStats.objects.values('active_count', 'sold_count', 'total_views').get(user=self.user)
+
+    def test_deferred_fields_are_not_counted_as_changes(self):
+        Car.objects.filter(pk=self.car.pk).update(views=10)
+        sellers.reconcile()
+        before = self.stats()
+        car = Car.objects.only('id', 'user', 'price').get(pk=self.car.pk)
+        car.price = 900000
+        car.save()
+        self.assertEqual(self.stats(), before)
+
+    def test_deferred_status_change_is_counted(self):
+        car = Car.objects.only('id').get(pk=self.car.pk)
+        car.status = 'sold'
+        car.save()
+        self.assertEqual(self.stats(), {'active_count': 0, 'sold_count': 1, 'total_views': 0})
+
+
+class VisitorSketchTests(CatalogTestCase):
+
+    def test_estimate_accuracy(self):
+        # Стандартная ошибка ≈ 3%: допускаем три сигмы
+        for count in (100, 1000, 20000):
+            registers = visitors.new_registers()
+            for number in range(count):
+                visitors.add(registers, f'visitor-{number}')
+            self.assertAlmostEqual(visitors.estimate(registers), count, delta=count * 0.1)
+
+    def test_merge_counts_shared_visitors_once(self):
+        first, second = visitors.new_registers(), visitors.new_registers()
+        for number in range(3000):
+            visitors.add(first, f'v{number}')
+        for number in range(2000, 5000):
+            visitors.add(second, f'v{number}')
+        self.assertAlmostEqual(visitors.estimate(visitors.merge(first, second)), 5000, delta=500)
+
+    def test_views_are_flushed_by_task(self):
+        other = self.create_car()
+        for number in range(30):
+            visitors.record_view(self.car.pk, f'v{number}')
+            visitors.record_view(other.pk, f'v{number + 20}')
+        self.assertEqual(Task.objects.filter(name='core.jobs.flush_visitors', status='queued').count(), 1)
+        self.assertEqual(visitors.estimates([self.car.pk]), {})
+        jobs.flush_visitors()
+        self.assertFalse(PendingVisit.objects.exists())
+        self.assertEqual(visitors.estimates([self.car.pk, other.pk]), {self.car.pk: 30, other.pk: 30})
+        # Продавец — готовая оценка объединения одним запросом, без обхода объявлений
+        with self.assertNumQueries(1):
+            self.assertAlmostEqual(visitors.seller_estimate(self.user.pk), 50, delta=2)
+
+    def test_repeated_flush_does_not_change_estimates(self):
+        for number in range(10):
+            visitors.record_view(self.car.pk, f'v{number}')
+        rows = list(PendingVisit.objects.values_list('car_id', 'day', 'visitor_hash'))
+        visitors.flush(batch_size=3)
+        # Та же пачка ещё раз (параллельный сброс) — объединение идемпотентно
+        PendingVisit.objects.bulk_create([
+            PendingVisit(car_id=car_id, day=day, visitor_hash=value) for car_id, day, value in rows
+        ])
+        visitors.flush()
+        self.assertEqual(visitors.estimates([self.car.pk]), {self.car.pk: 10})
+        self.assertEqual(visitors.seller_estimate(self.user.pk), 10)
+        self.assertEqual(visitors.rebuild_sellers(), 1)
+        self.assertEqual(visitors.seller_estimate(self.user.pk), 10)
+
+
+class PriceApiTests(CatalogTestCase):
+
+    def test_price_history_of_hidden_or_missing_car(self):
+        hidden = self.create_car(status='moderation')
+        self.assertEqual(self.client.get(f'/api/cars/{hidden.pk}/price-history/').status_code, 404)
+        self.assertEqual(self.client.get('/api/cars/999999/price-history/').status_code, 404)
+        response = self.client.get(f'/api/cars/{self.car.pk}/price-history/')
+        self.assertEqual([float(point['price']) for point in response.json()['points']], [1000000])
+
+    def test_price_drops_is_one_query(self):
+        for price in (900000, 800000):
+            car = self.create_car(main_image_url=f'https://example.com/{price}.jpg')
+            car.price = price
+            car.save()
+        MirroredPhoto.objects.create(source_url='https://example.com/900000.jpg', status='ok', file='mirror/a.jpg')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cars/price-drops/')
+        results = response.json()
+        self.assertEqual([float(car['price']) for car in results], [800000, 900000])
+        self.assertTrue(results[1]['main_image_mirror_url'].endswith('/mirror/a.jpg'))
+
+
+class ChunkedUploadTests(CatalogTestCase):
+    PNG = MirrorFetchTests.PNG
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name, UPLOAD_TEMP_DIR=os.path.join(directory.name, 'parts'))
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.force_login(self.user)
+        response = self.client.post('/api/uploads/', {
+            'car': self.car.pk, 'target': 'main', 'filename': 'car.png', 'size': len(self.PNG),
+            'sha256': hashlib.sha256(self.PNG).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.url = f'/api/uploads/{response.json()["id"]}/'
+
+    def send(self, offset, data, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum:
+            headers['HTTP_UPLOAD_CHECKSUM'] = checksum
+        return self.client.patch(self.url, data, content_type='application/octet-stream', **headers)
+
+    def test_resume_after_interruption(self):
+        self.assertEqual(self.send(0, self.PNG[:30]).status_code, 200)
+        # Клиент потерял ответ и спрашивает, докуда дошла загрузка
+        self.assertEqual(self.client.get(self.url)['Upload-Offset'], '30')
+        response = self.send(0, self.PNG[:30])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '30')
+        response = self.send(30, self.PNG[30:])
+        self.assertEqual(response.json()['status'], 'complete')
+        self.car.refresh_from_db()
+        with self.car.main_image.open('rb') as fh:
+            self.assertEqual(fh.read(), self.PNG)
+
+    def test_chunk_in_progress_is_not_overwritten(self):
+        self.send(0, self.PNG[:30])
+        PhotoUpload.objects.update(status='writing')
+        self.assertEqual(self.send(30, self.PNG[30:]).status_code, 409)
+        with open(uploads.temp_path(PhotoUpload.objects.get()), 'rb') as fh:
+            self.assertEqual(fh.read(), self.PNG[:30])
+
+    def test_read_only_key_cannot_upload(self):
+        _, token = create_key(self.user, 'read', ['read'])
+        self.client.logout()
+        auth = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        self.assertEqual(self.client.get(self.url, **auth).status_code, 200)
+        response = self.client.patch(
+            self.url, b'x', content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0', **auth,
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.delete(self.url, **auth).status_code, 403)
+        self.assertEqual(self.client.post('/api/uploads/', {}, **auth).status_code, 403)
+
+    def test_duplicate_chunk_does_not_touch_file(self):
+        # Повтор после таймаута: запрос прочитал загрузку до того, как первая часть была засчитана
+        stale = PhotoUpload.objects.get()
+        self.send(0, self.PNG[:30])
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(stale, 0, io.BytesIO(b'x' * 30), 30)
+        with open(uploads.temp_path(stale), 'rb') as fh:
+            self.assertEqual(fh.read(), self.PNG[:30])
+
+    def test_checksum_mismatch_discards_chunk(self):
+        response = self.send(0, self.PNG[:30], checksum=hashlib.sha256(b'other').hexdigest())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Upload-Offset'], '0')
+        response = self.send(0, self.PNG[:30], checksum=hashlib.sha256(self.PNG[:30]).hexdigest())
+        self.assertEqual(response['Upload-Offset'], '30')
+        self.assertEqual(PhotoUpload.objects.get().status, 'uploading')
+
+
+class CarBatchTests(CatalogTestCase):
+
+    def batch(self, ids):
+        return self.client.get('/api/cars/batch/', {'ids': ids})
+
+    def test_order_and_missing_ids(self):
+        other = self.create_car(price=500000)
+        hidden = self.create_car(status='moderation')
+        response = self.batch(f'{other.pk},999999,{self.car.pk},{other.pk},{hidden.pk}')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([car['id'] for car in data['results']], [other.pk, self.car.pk])
+        self.assertEqual(data['missing'], [999999, hidden.pk])
+
+    def test_cached_data_is_reused(self):
+        self.batch(str(self.car.pk))
+        with self.assertNumQueries(2):
+            response = self.batch(str(self.car.pk))
+        self.assertEqual(response.json()['results'][0]['id'], self.car.pk)
+
+    def test_seller_rename_invalidates_cached_data(self):
+        self.batch(str(self.car.pk))
+        self.user.username = 'dealer'
+        self.user.save()
+        self.assertEqual(self.batch(str(self.car.pk)).json()['results'][0]['user_name'], 'dealer')
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.batch('1,x').status_code, 400)
+        self.assertEqual(self.batch('').status_code, 400)
+        with self.settings(CAR_BATCH_MAX_IDS=2):
+            self.assertEqual(self.batch('1,2,3').status_code, 400)
+
+
+class StartupImportsTests(SimpleTestCase):
+    # Отдельный процесс: в процессе тестов модули могли загрузить другие тесты
+
+    def test_heavy_modules_are_not_loaded(self):
+        from .management.commands.bench_startup import FORBIDDEN
+        code = (
+            'import sys, django; django.setup()\n'
+            'from django.urls import get_resolver; get_resolver().url_patterns\n'
+            'from core import tasks; tasks.autodiscover()\n'
+            f'print(",".join(m for m in {FORBIDDEN!r}.split(",") if m in sys.modules))'
+        )
+        process = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'carhub.settings')},
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), '')
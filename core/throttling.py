@@ -0,0 +1,155 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .apikeys import ApiKeyAuth
+
+
+# Ограничение частоты запросов: token bucket на ключ API, пользователя или IP в кэше
+# THROTTLE_CACHE; дорогие запросы (поиск, cheap) списывают больше токенов. Вёдра общие, только
+# если THROTTLE_CACHE общий (Redis по REDIS_URL); с LocMemCache у каждого процесса свои.
+# Списание атомарно: в Redis — Lua-скриптом, в кэше процесса — под блокировкой.
+# Отказы (429 и 503 от LoadSheddingMiddleware) считаются в том же кэше.
+
+STATS_PREFIX = 'throttle-stats:'
+REASONS = ('key', 'user', 'anon', 'shed')
+
+# KEYS[1] — ведро (хеш t — токены, s — время); ARGV: rate, burst, cost, now, ttl.
+# Числа возвращаются строками: Redis обрезает дробные результаты Lua до целых
+TAKE_SCRIPT = '''
+local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 't', 's')
+local tokens, stamp = tonumber(bucket[1]), tonumber(bucket[2])
+if not tokens then
+    tokens, stamp = burst, now
+end
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 's', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {allowed, tostring(tokens)}
+'''
+
+_lock = threading.Lock()
+_script = {}
+
+
+def count_rejection(reason):
+    cache = caches[settings.THROTTLE_CACHE]
+    key = STATS_PREFIX + reason
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def rejection_stats():
+    cache = caches[settings.THROTTLE_CACHE]
+    counts = cache.get_many([STATS_PREFIX + reason for reason in REASONS])
+    return {reason: counts.get(STATS_PREFIX + reason, 0) for reason in REASONS}
+
+
+def take(key, rate, burst, cost=1):
+    # (разрешено, через сколько секунд хватит токенов)
+    cache = caches[settings.THROTTLE_CACHE]
+    now = time.time()
+    timeout = int(burst / rate) + 1
+    if isinstance(cache, RedisCache):
+        allowed, tokens = redis_take(cache, key, rate, burst, cost, now, timeout)
+    else:
+        with _lock:
+            tokens, stamp = cache.get(key) or (burst, now)
+            tokens = min(burst, tokens + max(0, now - stamp) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), timeout)
+    return (True, 0) if allowed else (False, (cost - tokens) / rate)
+
+
+def redis_take(cache, key, rate, burst, cost, now, timeout):
+    # Чтение, пополнение и списание — один вызов скрипта на сервере Redis
+    key = cache.make_and_validate_key(key)
+    client = cache._cache.get_client(key, write=True)
+    # Клиент создаётся на каждый вызов; скрипт (EVALSHA с откатом на EVAL) — один на процесс
+    if 'take' not in _script:
+        _script['take'] = client.register_script(TAKE_SCRIPT)
+    allowed, tokens = _script['take'](keys=[key], args=[rate, burst, cost, now, timeout], client=client)
+    return bool(allowed), float(tokens)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Ведро выбирается по ключу API, затем пользователю, затем IP; стоимость — throttle_costs
+    # представления по action плюс THROTTLE_SEARCH_COST за ?search=
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        self.scope, ident = self.get_scope(request)
+        rate, burst = settings.THROTTLE_BUCKETS[self.scope]
+        allowed, self.retry_after = take(f'throttle:{self.scope}:{ident}', rate, burst, self.get_cost(request, view))
+        if not allowed:
+            count_rejection(self.scope)
+        return allowed
+
+    def get_scope(self, request):
+        if isinstance(request.auth, ApiKeyAuth):
+            return 'key', request.auth.key_id
+        if request.user and request.user.is_authenticated:
+            return 'user', request.user.pk
+        return 'anon', self.get_ident(request)
+
+    def get_cost(self, request, view):
+        cost = getattr(view, 'throttle_costs', {}).get(getattr(view, 'action', None), 1)
+        if request.query_params.get(api_settings.SEARCH_PARAM):
+            cost += settings.THROTTLE_SEARCH_COST
+        return cost
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoadShedder:
+    # Адаптивный предел одновременных запросов процесса (AIMD): пока средняя задержка
+    # запросов к базе выше SHED_DB_LATENCY, предел уменьшается, иначе растёт на 1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.limit = float(settings.SHED_MAX_CONCURRENCY)
+        self.latency = 0.0
+
+    def acquire(self):
+        with self.lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, db_time, queries):
+        with self.lock:
+            self.in_flight -= 1
+            if not queries:
+                return
+            self.latency += (db_time / queries - self.latency) * 0.2
+            if self.latency > settings.SHED_DB_LATENCY:
+                self.limit = max(settings.SHED_MIN_CONCURRENCY, self.limit * 0.8)
+            else:
+                self.limit = min(settings.SHED_MAX_CONCURRENCY, self.limit + 1)
+
+    def state(self):
+        with self.lock:
+            return {'in_flight': self.in_flight, 'limit': int(self.limit), 'db_latency_ms': round(self.latency * 1000, 2)}
+
+
+shedder = LoadShedder()
@@ -0,0 +1,192 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.images import get_image_dimensions
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Car, CarPhoto, PhotoUpload
+
+
+# Загрузка фото по частям: каждая часть потоком пишется во временный файл по смещению,
+# прерванную загрузку можно продолжить с PhotoUpload.offset. Пока часть пишется, загрузка
+# в статусе 'writing' — второй запрос с тем же смещением файл не трогает. Когда получен последний байт,
+# файл проверяется (SHA-256, изображение) и переносится в хранилище MEDIA переименованием —
+# целиком в памяти процесса он не бывает.
+
+PIECE_SIZE = 64 * 1024
+EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+
+
+class UploadError(Exception):
+    status = 400
+
+
+class OffsetMismatch(UploadError):
+    # Клиент прислал часть не с того места — ему нужно продолжить с upload.offset
+    status = 409
+
+
+class AssembledFile(File):
+    # FileSystemStorage переносит файл с temporary_file_path() через os.rename
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def temp_path(upload):
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def start(user, car, target, filename, size, sha256):
+    filename = get_valid_filename(os.path.basename(filename or ''))
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if car.user_id != user.pk:
+        raise UploadError('Фото можно загружать только к своим объявлениям')
+    if target not in dict(PhotoUpload.TARGET_CHOICES):
+        raise UploadError('target: main или photo')
+    if extension not in EXTENSIONS:
+        raise UploadError(f'Допустимые форматы: {", ".join(EXTENSIONS)}')
+    if not 0 < size <= settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'Размер файла — от 1 байта до {settings.UPLOAD_MAX_SIZE} байт')
+    sha256 = (sha256 or '').lower()
+    if len(sha256) != 64 or not all(char in '0123456789abcdef' for char in sha256):
+        raise UploadError('sha256: шестнадцатеричный SHA-256 всего файла')
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    upload = PhotoUpload.objects.create(
+        user=user, car=car, target=target, filename=filename[-255:], size=size, sha256=sha256,
+    )
+    open(temp_path(upload), 'wb').close()
+    return upload
+
+
+def claim(upload, offset):
+    # Условный UPDATE до записи в файл: из двух запросов с одним смещением (повтор после
+    # таймаута) часть пишет только первый, второй получает 409 и файл не трогает
+    now = timezone.now()
+    free = Q(status='uploading') | Q(
+        status='writing', updated_at__lt=now - timedelta(seconds=settings.UPLOAD_CHUNK_TIMEOUT),
+    )
+    if PhotoUpload.objects.filter(free, pk=upload.pk, offset=offset).update(status='writing', updated_at=now):
+        upload.offset, upload.status = offset, 'writing'
+        return
+    upload.refresh_from_db()
+    if upload.status == 'writing':
+        raise OffsetMismatch('Часть уже принимается — повторите позже')
+    if upload.status != 'uploading':
+        raise OffsetMismatch('Загрузка уже завершена')
+    raise OffsetMismatch(f'Ожидается часть со смещения {upload.offset}')
+
+
+def release(upload, received):
+    upload.offset, upload.status = upload.offset + received, 'uploading'
+    PhotoUpload.objects.filter(pk=upload.pk, status='writing').update(
+        offset=upload.offset, status='uploading', updated_at=timezone.now(),
+    )
+
+
+def write_chunk(upload, offset, stream, length, checksum=None):
+    # Часть из stream (тело запроса) длиной length, начиная с offset. С checksum (SHA-256 части)
+    # часть принимается целиком или никак; без него оборванная часть засчитывается до места обрыва
+    if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f'Часть больше {settings.UPLOAD_MAX_CHUNK_SIZE} байт')
+    if offset + length > upload.size:
+        raise UploadError('Часть выходит за объявленный размер файла')
+    claim(upload, offset)
+
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        with open(temp_path(upload), 'r+b') as fh:
+            fh.seek(offset)
+            fh.truncate()
+            try:
+                while received < length:
+                    piece = stream.read(min(PIECE_SIZE, length - received))
+                    if not piece:
+                        break
+                    fh.write(piece)
+                    digest.update(piece)
+                    received += len(piece)
+            except OSError:
+                # Клиент оборвал соединение посреди части
+                pass
+            if checksum and (received != length or digest.hexdigest() != checksum.lower()):
+                fh.truncate(offset)
+                error = 'Часть получена не полностью' if received != length else 'Контрольная сумма части не совпала'
+                received = 0
+                raise UploadError(error)
+            fh.flush()
+            os.fsync(fh.fileno())
+    finally:
+        release(upload, received)
+    if upload.offset == upload.size:
+        finish(upload)
+    return upload
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for piece in iter(lambda: fh.read(PIECE_SIZE), b''):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+def finish(upload):
+    path = temp_path(upload)
+    if file_sha256(path) != upload.sha256:
+        fail(upload, 'SHA-256 файла не совпал с объявленным')
+    if get_image_dimensions(path) == (None, None):
+        fail(upload, 'Файл не является изображением')
+
+    with transaction.atomic(), open(path, 'rb') as fh:
+        car = Car.objects.select_for_update().get(pk=upload.car_id)
+        content = AssembledFile(fh, name=upload.filename)
+        if upload.target == 'main':
+            car.main_image.save(upload.filename, content, save=False)
+            car.save(update_fields=['main_image', 'updated_at'])
+            stored = car.main_image
+        else:
+            photo = CarPhoto(car=car)
+            photo.image.save(upload.filename, content)
+            stored = photo.image
+        upload.status, upload.file = 'complete', stored.name
+        upload.save(update_fields=['status', 'file', 'updated_at'])
+    # Хранилище не на локальном диске скопировало файл вместо переноса
+    if os.path.exists(path):
+        os.remove(path)
+    return stored
+
+
+def fail(upload, error):
+    PhotoUpload.objects.filter(pk=upload.pk).update(status='failed', error=error, updated_at=timezone.now())
+    upload.status, upload.error = 'failed', error
+    remove_temp(upload)
+    raise UploadError(error)
+
+
+def remove_temp(upload):
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def cancel(upload):
+    remove_temp(upload)
+    upload.delete()
+
+
+def expire(hours=None):
+    # Брошенные загрузки и их временные файлы; завершённые записи тоже больше не нужны
+    hours = settings.UPLOAD_EXPIRE_HOURS if hours is None else hours
+    stale = PhotoUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    for upload in stale.exclude(status='complete').only('pk'):
+        remove_temp(upload)
+    return stale.delete()[0]
@@ -1,11 +1,14 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from . import views
 from rest_framework.routers import DefaultRouter
-from .api import CarViewSet, BrandViewSet
+from .api import (CarViewSet, BrandViewSet, SellerViewSet, UploadViewSet, ChangeFeedView, RecentlyViewedView,
+                  ThrottleStatsView)
 
 router = DefaultRouter()
 router.register(r'cars', CarViewSet, basename="cars")
 router.register(r'brands', BrandViewSet, basename="brands")
+router.register(r'sellers', SellerViewSet, basename="sellers")
+router.register(r'uploads', UploadViewSet, basename="uploads")
 
 app_name = 'core'
 
@@ -15,12 +18,21 @@ urlpatterns = [
     path('car/add/', views.CarCreateView.as_view(), name='car_create'),
     path('car/<int:pk>/edit/', views.CarUpdateView.as_view(), name='car_update'),
     path('car/<int:pk>/delete/', views.CarDeleteView.as_view(), name='car_delete'),
+    path('compare/', views.CarCompareView.as_view(), name='car_compare'),
+    path('recent/', views.RecentlyViewedView.as_view(), name='recently_viewed'),
 
     # Регистрация и логин
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
 
+    # Sitemap и ленты
+    re_path(r'^(?P<name>[\w-]+\.(?:xml|rss|atom))$', views.sitemap_file, name='sitemap_file'),
+
     # API
+    path('api/changes/', ChangeFeedView.as_view(), name='changes'),
+    path('api/throttle-stats/', ThrottleStatsView.as_view(), name='throttle_stats'),
+    path('api/recently-viewed/', RecentlyViewedView.as_view(), name='recently_viewed_api'),
+    path('api/stream/cars/', views.car_stream, name='car_stream'),
     path('api/', include(router.urls)),
 ]
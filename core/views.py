@@ -1,28 +1,149 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+import os
+
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from .models import Car, Brand, Model
+from .models import Car, CarCard, Brand, Model
 from django.shortcuts import render, redirect
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import get_language
+from django.contrib import messages
 from django.contrib.auth import login, logout
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, CarForm
+from . import batch, dedupe, recent, stream
+from .mirror import mirror_map
+from .conditional import apply_validators, get_versions, make_etag, not_modified_response, user_key
 
 
+# Каталог читается из карточек (CarCard): одна таблица, картинка и отрывок уже готовы
 class CarListView(ListView):
-    model = Car
+    model = CarCard
     template_name = 'core/car_list.html'
     context_object_name = 'cars'
-    queryset = Car.objects.filter(status='active').order_by('-created_at')
+    queryset = CarCard.objects.order_by('-created_at')
     paginate_by = 3
 
+    # Анонимный каталог кэшируется целиком; ключ меняется при любом изменении объявлений.
+    # Страница с флеш-сообщениями личная — её не кэшируем и не отдаём из кэша
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated or messages.get_messages(request):
+            return super().get(request, *args, **kwargs)
+        versions = get_versions('catalog', 'brand')
+        key = 'catalog-page:{}:{}:{}:{}'.format(
+            versions['catalog'][0], versions['brand'][0], get_language(), request.get_full_path()
+        )
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        response.add_post_render_callback(
+            lambda rendered: cache.set(key, rendered.content, settings.CATALOG_PAGE_CACHE_TIMEOUT)
+            if rendered.status_code == 200 else None
+        )
+        return response
+
 
 class CarDetailView(DetailView):
     model = Car
     template_name = 'core/car_detail.html'
     context_object_name = 'car'
+    queryset = Car.objects.select_related('brand', 'model', 'user__seller_stats')
+
+    # 304 без рендера шаблона, если объявление не менялось
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, kwargs['pk'])
+        if etag:
+            # Только строка истории — ни Car, ни сессия не меняются, cookie не ставятся
+            recent.record(request, kwargs['pk'])
+        response = not_modified_response(request, etag, last_modified) if etag else None
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return apply_validators(request, response, etag, last_modified)
+
+    def get_validators(self, request, pk):
+        row = Car.objects.filter(pk=pk).values_list(
+            'updated_at', 'user__seller_stats__updated_at', 'user__username',
+        ).first()
+        if row is None:
+            return None, None
+        updated_at, stats_updated_at, seller = row
+        # Версия марок нужна и ключам кэша фрагментов: имя модели в заголовке
+        self.brand_version = brand_version = get_versions('brand')['brand'][0]
+        etag = make_etag(
+            'car-page', pk, updated_at.isoformat(), stats_updated_at, seller, brand_version, user_key(request),
+        )
+        return etag, updated_at
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['brand_version'] = getattr(self, 'brand_version', 0)
+        # Фото и зеркала грузятся только при промахе кэша фрагментов
+        media = SimpleLazyObject(self.load_media)
+        context['photos'] = SimpleLazyObject(lambda: media['photos'])
+        context['main_image_mirror'] = SimpleLazyObject(lambda: media['main_image_mirror'])
+        return context
+
+    def load_media(self):
+        photos = list(self.object.photos.all())
+        mirrors = mirror_map([self.object.main_image_url, *(photo.image_url for photo in photos)])
+        for photo in photos:
+            photo.image_mirror = mirrors.get(photo.image_url)
+        return {'photos': photos, 'main_image_mirror': mirrors.get(self.object.main_image_url)}
+
+
+# Недавно просмотренные объявления пользователя или сессии (core.recent)
+class RecentlyViewedView(TemplateView):
+    template_name = 'core/recently_viewed.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['photos'] = self.object.photos.all()
+        context['cars'] = recent.cards(self.request)
+        return context
+
+
+# Сравнение объявлений бок о бок compare/?ids=3,1,2 — данные из core.batch (как api/cars/batch/)
+class CarCompareView(TemplateView):
+    template_name = 'core/car_compare.html'
+    rows = (
+        ('Марка', 'brand_name'),
+        ('Модель', 'model_name'),
+        ('Год выпуска', 'year'),
+        ('Пробег, км', 'mileage'),
+        ('Цена, ₽', 'price'),
+        ('Просмотры', 'views'),
+        ('Уникальные посетители', 'unique_viewers'),
+        ('Продавец', 'user_name'),
+        ('Опубликовано', 'created_at'),
+    )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            ids = batch.parse_ids(self.request.GET.get('ids', ''), settings.CAR_COMPARE_MAX_IDS)
+        except ValueError:
+            context['error'] = f'Укажите от 1 до {settings.CAR_COMPARE_MAX_IDS} объявлений'
+            return context
+        queryset = Car.objects.filter(status='active').select_related('brand', 'model', 'user', 'visitor_total')
+        cars, context['missing'] = batch.load(queryset, ids, self.request)
+        for car in cars:
+            car['image'] = (
+                car['main_image'] or car['main_image_mirror_url'] or car['main_image_url']
+                or next((photo['url'] for photo in car['photos']), None)
+            )
+        # Строки, где значения различаются, подсвечиваются
+        context['cars'] = cars
+        context['rows'] = [
+            {
+                'label': label,
+                'key': key,
+                'values': [car[key] for car in cars],
+                'differs': len({str(car[key]) for car in cars}) > 1,
+            }
+            for label, key in self.rows
+        ]
         return context
 
 
@@ -38,10 +159,17 @@ class CarCreateView(LoginRequiredMixin, CreateView):
         context['models'] = Model.objects.all()
         return context
 
+    # Повтор своего объявления обновляет его, похожее на чужое уходит на модерацию
     def form_valid(self, form):
         form.instance.user = self.request.user
         form.instance.created_by = self.request.user
-        return super().form_valid(form)
+        self.object, match = dedupe.add_car(form.instance)
+        if match and match.merged:
+            messages.info(self.request, 'Такое объявление у вас уже есть — оно обновлено')
+            return redirect('core:car_detail', pk=self.object.pk)
+        if match:
+            messages.warning(self.request, 'Похожее объявление уже есть в каталоге, новое отправлено на модерацию')
+        return redirect(self.get_success_url())
 
 
 class CarUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -99,3 +227,32 @@ def user_login(request):
 def user_logout(request):
     logout(request)
     return redirect('core:car_list')
+
+
+# Готовые sitemap и ленты из SITEMAP_ROOT (генерирует build_sitemaps)
+def sitemap_file(request, name):
+    path = os.path.join(settings.SITEMAP_ROOT, name)
+    if not os.path.exists(path):
+        raise Http404
+    content_type = 'application/atom+xml' if name.endswith('.atom') else 'application/xml'
+    if name.endswith('.rss'):
+        content_type = 'application/rss+xml'
+    return FileResponse(open(path, 'rb'), content_type=f'{content_type}; charset=utf-8')
+
+
+# Поток новых объявлений (text/event-stream) api/stream/cars/?brand=&model=&min_price=&max_price=
+# Долгие соединения держит только ASGI-сервер (carhub.asgi)
+async def car_stream(request):
+    try:
+        filters = stream.parse_filters(request.GET)
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except (ValueError, ArithmeticError):
+        return HttpResponseBadRequest('Некорректные параметры фильтра или Last-Event-ID')
+    if stream.broadcaster.full():
+        response = HttpResponse('Слишком много подписчиков, повторите позже', status=503)
+        response['Retry-After'] = str(settings.SHED_RETRY_AFTER)
+        return response
+    response = StreamingHttpResponse(stream.events(filters, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
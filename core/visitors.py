@@ -0,0 +1,206 @@
+import hashlib
+import math
+import zlib
+from itertools import chain
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
+
+from .conditional import bump_version
+from .jobs import flush_visitors
+from .models import ArchivedCar, Car, PendingVisit, SellerVisitors, VisitorSketch, VisitorTotal
+from .tasks import enqueue
+
+
+# Уникальные посетители объявлений: HyperLogLog на объявление и день.
+# Просмотры пишутся в общий буфер PendingVisit; задача flush_visitors пачками сливает его
+# в VisitorSketch (день), VisitorTotal (всё время) и SellerVisitors (продавец);
+# диапазон дат — объединение дневных скетчей.
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+# Стандартная ошибка оценки 1.04 / sqrt(REGISTERS) ≈ 3%
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+RANK_BITS = 64 - PRECISION
+
+
+def new_registers():
+    return bytearray(REGISTERS)
+
+
+def visitor_hash(visitor):
+    # 64-битный хеш со знаком — помещается в BigIntegerField
+    return int.from_bytes(hashlib.blake2b(visitor.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def add(registers, visitor):
+    add_hash(registers, visitor_hash(visitor))
+
+
+def add_hash(registers, value):
+    x = value & ((1 << 64) - 1)
+    index = x >> RANK_BITS
+    rank = RANK_BITS - (x & ((1 << RANK_BITS) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def merge(target, other):
+    # Объединение скетчей — поэлементный максимум регистров
+    target[:] = bytes(map(max, target, other))
+    return target
+
+
+def estimate(registers):
+    zeros = registers.count(0)
+    if zeros == REGISTERS:
+        return 0
+    raw = ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -rank for rank in registers)
+    # Малые значения — линейный счёт по пустым регистрам
+    if raw <= 2.5 * REGISTERS and zeros:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+# На диске регистры сжаты: у редко просматриваемых объявлений почти все нули
+def pack(registers):
+    return zlib.compress(bytes(registers))
+
+
+def unpack(data):
+    return bytearray(zlib.decompress(bytes(data))) if data else new_registers()
+
+
+def visitor_id(request):
+    # Пользователь, иначе сессия, иначе IP + User-Agent
+    if request.user.is_authenticated:
+        return f'u:{request.user.pk}'
+    session_key = getattr(request, 'session', None) and request.session.session_key
+    if session_key:
+        return f's:{session_key}'
+    return 'a:{}:{}'.format(request.META.get('REMOTE_ADDR', ''), request.META.get('HTTP_USER_AGENT', ''))
+
+
+def record_view(car_id, visitor):
+    # На пути запроса — одна вставка в буфер; сброс выполняет воркер
+    PendingVisit.objects.create(car_id=car_id, day=timezone.localdate(), visitor_hash=visitor_hash(visitor))
+    enqueue(flush_visitors, dedup_key='flush_visitors', delay=settings.VISITOR_SKETCH_FLUSH_DELAY)
+
+
+def flush(batch_size=None):
+    # Сливает буфер в базу пачками по id. Объединение регистров идемпотентно: пачка,
+    # обработанная дважды (параллельный сброс, падение до удаления), оценку не меняет
+    batch_size = batch_size or settings.VISITOR_SKETCH_BATCH_SIZE
+    last_id = PendingVisit.objects.order_by('-id').values_list('id', flat=True).first()
+    flushed = 0
+    while last_id is not None:
+        rows = list(
+            PendingVisit.objects.filter(id__lte=last_id).order_by('id')
+            .values_list('id', 'car_id', 'day', 'visitor_hash')[:batch_size]
+        )
+        if not rows:
+            break
+        pending = {}
+        for _, car_id, day, value in rows:
+            add_hash(pending.setdefault((car_id, day), new_registers()), value)
+        with transaction.atomic():
+            save_registers(pending)
+            PendingVisit.objects.filter(id__lte=rows[-1][0]).delete()
+        flushed += len(rows)
+    if flushed:
+        bump_version('car')
+    return flushed
+
+
+def save_registers(pending):
+    # {(id объявления, день): регистры} → по два UPSERT-пакета на дни, итоги и продавцов
+    sellers = dict(Car.objects.filter(pk__in={car_id for car_id, _ in pending}).values_list('pk', 'user_id'))
+    pending = {key: registers for key, registers in pending.items() if key[0] in sellers}
+    totals = {}
+    for (car_id, _), registers in pending.items():
+        merge(totals.setdefault(car_id, new_registers()), registers)
+    seller_totals = {}
+    for car_id, registers in totals.items():
+        merge(seller_totals.setdefault(sellers[car_id], new_registers()), registers)
+
+    days = {(sketch.car_id, sketch.day): sketch for sketch in VisitorSketch.objects.select_for_update().filter(
+        car_id__in=totals, day__in={day for _, day in pending},
+    )}
+    created, updated = [], []
+    for (car_id, day), registers in pending.items():
+        sketch = days.get((car_id, day))
+        if sketch is None:
+            created.append(VisitorSketch(car_id=car_id, day=day, registers=pack(registers)))
+        else:
+            sketch.registers = pack(merge(unpack(sketch.registers), registers))
+            updated.append(sketch)
+    VisitorSketch.objects.bulk_create(created)
+    VisitorSketch.objects.bulk_update(updated, ['registers'])
+    save_totals(VisitorTotal, 'car_id', totals)
+    save_totals(SellerVisitors, 'user_id', seller_totals)
+
+
+def save_totals(model, key, totals):
+    existing = {
+        getattr(row, key): row
+        for row in model.objects.select_for_update().filter(**{f'{key}__in': totals})
+    }
+    now = timezone.now()
+    created, updated = [], []
+    for pk, registers in totals.items():
+        row = existing.get(pk)
+        if row is None:
+            row = model(**{key: pk})
+            created.append(row)
+        else:
+            registers = merge(unpack(row.registers), registers)
+            updated.append(row)
+        row.registers, row.estimate, row.updated_at = pack(registers), estimate(registers), now
+    model.objects.bulk_create(created)
+    model.objects.bulk_update(updated, ['registers', 'estimate', 'updated_at'])
+
+
+def unique_viewers(car_id, start=None, end=None):
+    # Оценка за диапазон дат (включительно) объединением дневных скетчей
+    sketches = VisitorSketch.objects.filter(car_id=car_id)
+    if start:
+        sketches = sketches.filter(day__gte=start)
+    if end:
+        sketches = sketches.filter(day__lte=end)
+    registers = new_registers()
+    for data in sketches.values_list('registers', flat=True).iterator():
+        merge(registers, unpack(data))
+    return estimate(registers)
+
+
+def estimates(car_ids):
+    # {id объявления: оценка за всё время} одним запросом
+    return dict(VisitorTotal.objects.filter(car_id__in=list(car_ids)).values_list('car_id', 'estimate'))
+
+
+def car_estimate(car):
+    # Из select_related('visitor_total'), без него — отдельный запрос
+    try:
+        return car.visitor_total.estimate
+    except ObjectDoesNotExist:
+        return 0
+
+
+def seller_estimate(user_id):
+    # Уникальные посетители всех объявлений продавца (посетитель нескольких объявлений — один)
+    return SellerVisitors.objects.filter(user_id=user_id).values_list('estimate', flat=True).first() or 0
+
+
+def rebuild_sellers():
+    # Пересборка SellerVisitors из VisitorTotal и архива (после переноса объявлений между продавцами)
+    seller_totals = {}
+    rows = VisitorTotal.objects.values_list('car__user_id', 'registers').order_by('car__user_id')
+    archived = ArchivedCar.objects.exclude(visitor_registers=b'').values_list('user_id', 'visitor_registers')
+    for user_id, data in chain(rows.iterator(), archived.iterator()):
+        merge(seller_totals.setdefault(user_id, new_registers()), unpack(data))
+    with transaction.atomic():
+        SellerVisitors.objects.all().delete()
+        save_totals(SellerVisitors, 'user_id', seller_totals)
+    return len(seller_totals)